@@ -0,0 +1,90 @@
+import asyncio
+import functools
+
+from business.material_service import MaterialService
+from database.async_database import AsyncDatabase
+
+# Методы MaterialService, доступные как корутины
+ASYNC_METHODS = (
+    "get_all_material_types", "get_all_materials", "search_materials", "search_material_names",
+    "search_products", "get_material_by_id", "add_material", "update_material",
+    "calculate_required_quantity", "calculate_required_quantities", "product_quantities",
+    "set_material_link", "remove_material_link", "get_material_requirement", "get_material_requirements",
+    "get_products_for_material", "get_material_usage", "product_type_coefficients",
+    "calculate_product_quantities", "get_production_capacity", "calculate_product_quantity", "bom_graph",
+)
+
+# Методы, работающие со спецификацией в памяти (см. MaterialService.bom_graph) или
+# загружающие общие записи кэша сущностей, либо меняющие то и другое
+SHARED_STATE_METHODS = frozenset((
+    "bom_graph", "calculate_required_quantity", "calculate_required_quantities", "set_material_link",
+    "remove_material_link", "get_products_for_material", "get_production_capacity", "add_material",
+    "product_quantities", "product_type_coefficients", "calculate_product_quantities", "get_material_usage",
+))
+
+
+class AsyncMaterialService:
+    """Асинхронный вариант MaterialService с теми же методами-корутинами
+
+    Методы MaterialService выполняются в greenlet поверх асинхронного
+    движка AsyncDatabase: каждое обращение к базе ожидается через aiosqlite,
+    поэтому цикл событий не блокируется, а независимые запросы (например,
+    через asyncio.gather) выполняются на разных соединениях одновременно.
+    Кэш сущностей и спецификация в памяти общие для всех вызовов.
+
+    Все greenlet выполняются в потоке цикла событий, поэтому блокировки
+    threading внутри MaterialService не защищают от параллельных корутин -
+    методы из SHARED_STATE_METHODS выполняются по одному.
+    """
+
+    def __init__(self, db: AsyncDatabase):
+        self.db = db
+        self._service = None
+        self._start_lock = asyncio.Lock()
+        self._shared_lock = asyncio.Lock()
+
+    async def _sync_service(self) -> MaterialService:
+        """Синхронный сервис на движке AsyncDatabase (создается в greenlet при первом вызове)"""
+        async with self._start_lock:
+            if self._service is None:
+                # Кэш открывает выделенное соединение, поэтому сервис создается через run_sync
+                self._service = await self.db.run_sync(MaterialService, self.db.sync)
+        return self._service
+
+    async def _call(self, name, *args, **kwargs):
+        method = getattr(await self._sync_service(), name)
+        if name in SHARED_STATE_METHODS:
+            async with self._shared_lock:
+                return await self.db.run_sync(method, *args, **kwargs)
+        return await self.db.run_sync(method, *args, **kwargs)
+
+    def cache_stats(self):
+        """Статистика кэша сущностей (None до первого обращения к базе)"""
+        return self._service.cache_stats() if self._service is not None else None
+
+    async def get_overview(self, material_ids=None):
+        """Типы материалов, материалы и потребность одновременными запросами"""
+        return await asyncio.gather(
+            self.get_all_material_types(),
+            self.get_all_materials(),
+            self.get_material_requirements(material_ids),
+        )
+
+    async def close(self):
+        """Закрытие выделенного соединения кэша и пула соединений"""
+        if self._service is not None:
+            await self.db.run_sync(self._service.cache.close)
+            self._service = None
+        await self.db.dispose()
+
+
+def _coroutine(name):
+    """Корутина, вызывающая метод MaterialService с тем же именем"""
+    @functools.wraps(getattr(MaterialService, name))
+    async def call(self, *args, **kwargs):
+        return await self._call(name, *args, **kwargs)
+    return call
+
+
+for _name in ASYNC_METHODS:
+    setattr(AsyncMaterialService, _name, _coroutine(_name))
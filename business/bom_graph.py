@@ -0,0 +1,292 @@
+import threading
+
+import numpy as np
+
+from database.database import Database
+
+# Удаленная связь в списке изменений
+_REMOVED = None
+
+
+class BomGraph:
+    """Спецификация (material_product) в памяти в виде массивов индексов
+
+    Связи хранятся дважды: по материалам (CSR: material_ptr, material_products,
+    material_quantities) и по продукции (CSC: product_ptr, product_materials,
+    product_quantities). Индексы узлов - позиции в отсортированных массивах
+    material_ids и product_ids; внутри узла связи упорядочены по индексу
+    соседа. Количество NULL хранится как NaN. Одна связь занимает 24 байта.
+
+    Изменение количества существующей связи выполняется на месте в обоих
+    представлениях. Новые и удаленные связи копятся в списке изменений,
+    который учитывается при чтении и вливается в массивы, когда он
+    становится длиннее MERGE_THRESHOLD или перед агрегирующими расчетами.
+    """
+
+    # Размер списка изменений, после которого массивы перестраиваются
+    MERGE_THRESHOLD = 10000
+
+    def __init__(self, material_ids, product_ids, link_material_ids, link_product_ids, link_quantities):
+        self._lock = threading.RLock()
+        self._build(material_ids, product_ids, link_material_ids, link_product_ids, link_quantities)
+
+    @classmethod
+    def from_database(cls, db: Database):
+        """Загрузка узлов и связей тремя запросами без создания объектов ORM"""
+        with db.engine.connect() as conn:
+            materials = conn.exec_driver_sql("SELECT id FROM materials").fetchall()
+            products = conn.exec_driver_sql("SELECT id FROM products").fetchall()
+            links = conn.exec_driver_sql(
+                "SELECT material_id, product_id, quantity FROM material_product "
+                "WHERE material_id IS NOT NULL AND product_id IS NOT NULL"
+            ).fetchall()
+
+        def column(rows, i, dtype):
+            return np.fromiter((row[i] for row in rows), dtype=dtype, count=len(rows))
+
+        return cls(column(materials, 0, np.int64), column(products, 0, np.int64),
+                   column(links, 0, np.int64), column(links, 1, np.int64),
+                   np.array([row[2] for row in links], dtype=float))
+
+    def _build(self, material_ids, product_ids, link_material_ids, link_product_ids, link_quantities):
+        """Построение массивов по узлам и списку связей (узлы связей добавляются к узлам)"""
+        link_material_ids = np.asarray(link_material_ids, dtype=np.int64)
+        link_product_ids = np.asarray(link_product_ids, dtype=np.int64)
+        quantities = np.asarray(link_quantities, dtype=float)
+
+        self.material_ids, rows = self._node_index(material_ids, link_material_ids)
+        self.product_ids, cols = self._node_index(product_ids, link_product_ids)
+
+        # Сортировка по одному ключу (строка, столбец) быстрее lexsort по двум
+        by_material = np.argsort(rows.astype(np.int64) * len(self.product_ids) + cols)
+        self.material_ptr = self._pointers(rows, len(self.material_ids))
+        self.material_products = cols[by_material]
+        self.material_quantities = quantities[by_material]
+
+        by_product = np.argsort(cols.astype(np.int64) * len(self.material_ids) + rows)
+        self.product_ptr = self._pointers(cols, len(self.product_ids))
+        self.product_materials = rows[by_product]
+        self.product_quantities = quantities[by_product]
+
+        self._changes = {}  # (material_id, product_id) -> количество или _REMOVED
+        self._changed_materials = {}  # material_id -> множество product_id в списке изменений
+        self._changed_products = {}  # product_id -> множество material_id в списке изменений
+        self._new_materials = set()
+        self._new_products = set()
+
+    @classmethod
+    def _node_index(cls, node_ids, link_ids):
+        """Отсортированные ID узлов (с узлами связей) и индексы узлов связей (int32)"""
+        ids = np.unique(np.asarray(node_ids, dtype=np.int64))
+        index = cls._lookup(ids, link_ids)
+        if (index < 0).any():
+            # Связи с узлами, которых нет в таблицах материалов или продукции
+            ids = np.union1d(ids, link_ids[index < 0])
+            index = cls._lookup(ids, link_ids)
+        return ids, index.astype(np.int32)
+
+    @staticmethod
+    def _lookup(ids, values):
+        """Позиции values в отсортированном массиве ids (-1 для отсутствующих)"""
+        if not len(ids):
+            return np.full(len(values), -1, dtype=np.int64)
+        low, span = ids[0], ids[-1] - ids[0] + 1
+        if low >= 0 and span <= 4 * len(ids) + 1024:
+            # ID из автоинкремента плотные - таблица ID -> позиция быстрее двоичного поиска
+            table = np.full(span, -1, dtype=np.int64)
+            table[ids - low] = np.arange(len(ids))
+            inside = (values >= low) & (values < low + span)
+            index = np.full(len(values), -1, dtype=np.int64)
+            index[inside] = table[values[inside] - low]
+            return index
+        index = np.searchsorted(ids, values)
+        found = index < len(ids)
+        found[found] = ids[index[found]] == values[found]
+        return np.where(found, index, -1)
+
+    @staticmethod
+    def _pointers(index, size):
+        return np.concatenate(([0], np.cumsum(np.bincount(index, minlength=size)))).astype(np.int64)
+
+    @staticmethod
+    def _position(ids, node_id):
+        """Индекс узла в отсортированном массиве ID или -1"""
+        position = int(np.searchsorted(ids, node_id))
+        return position if position < len(ids) and ids[position] == node_id else -1
+
+    @staticmethod
+    def _link_position(ptr, neighbours, row, neighbour):
+        """Позиция связи row -> neighbour в массиве соседей или -1"""
+        if row < 0 or neighbour < 0:
+            return -1
+        start, end = int(ptr[row]), int(ptr[row + 1])
+        position = start + int(np.searchsorted(neighbours[start:end], neighbour))
+        return position if position < end and neighbours[position] == neighbour else -1
+
+    def _base_positions(self, material_id, product_id):
+        """Позиции связи в CSR и CSC (-1, если в массивах ее нет)"""
+        row = self._position(self.material_ids, material_id)
+        col = self._position(self.product_ids, product_id)
+        return (self._link_position(self.material_ptr, self.material_products, row, col),
+                self._link_position(self.product_ptr, self.product_materials, col, row))
+
+    @property
+    def link_count(self) -> int:
+        """Число связей с учетом списка изменений"""
+        with self._lock:
+            count = len(self.material_products)
+            for (material_id, product_id), quantity in self._changes.items():
+                in_base = self._base_positions(material_id, product_id)[0] >= 0
+                count += int(quantity is not _REMOVED) - int(in_base)
+            return count
+
+    @property
+    def nbytes(self) -> int:
+        """Объем массивов в байтах"""
+        return sum(array.nbytes for array in (
+            self.material_ids, self.product_ids, self.material_ptr, self.material_products,
+            self.material_quantities, self.product_ptr, self.product_materials, self.product_quantities))
+
+    def add_material(self, material_id: int):
+        """Регистрация нового материала без связей"""
+        with self._lock:
+            if self._position(self.material_ids, material_id) < 0:
+                self._new_materials.add(int(material_id))
+
+    def add_product(self, product_id: int):
+        """Регистрация новой продукции без связей"""
+        with self._lock:
+            if self._position(self.product_ids, product_id) < 0:
+                self._new_products.add(int(product_id))
+
+    def set_link(self, material_id: int, product_id: int, quantity):
+        """Добавление связи или изменение количества материала на единицу продукции"""
+        material_id, product_id = int(material_id), int(product_id)
+        quantity = np.nan if quantity is None else float(quantity)
+        with self._lock:
+            csr, csc = self._base_positions(material_id, product_id)
+            if csr >= 0:
+                # Связь есть в массивах - количество меняется на месте
+                self.material_quantities[csr] = quantity
+                self.product_quantities[csc] = quantity
+                self._forget_change(material_id, product_id)
+            else:
+                self._record_change(material_id, product_id, quantity)
+
+    def remove_link(self, material_id: int, product_id: int):
+        """Удаление связи"""
+        material_id, product_id = int(material_id), int(product_id)
+        with self._lock:
+            if self._base_positions(material_id, product_id)[0] >= 0:
+                self._record_change(material_id, product_id, _REMOVED)
+            else:
+                self._forget_change(material_id, product_id)
+
+    def _record_change(self, material_id, product_id, quantity):
+        self._changes[(material_id, product_id)] = quantity
+        self._changed_materials.setdefault(material_id, set()).add(product_id)
+        self._changed_products.setdefault(product_id, set()).add(material_id)
+        if len(self._changes) > self.MERGE_THRESHOLD:
+            self.compact()
+
+    def _forget_change(self, material_id, product_id):
+        if (material_id, product_id) not in self._changes:
+            return
+        del self._changes[(material_id, product_id)]
+        self._changed_materials[material_id].discard(product_id)
+        self._changed_products[product_id].discard(material_id)
+
+    def compact(self):
+        """Вливание списка изменений в массивы"""
+        with self._lock:
+            if not (self._changes or self._new_materials or self._new_products):
+                return
+            rows = np.repeat(np.arange(len(self.material_ids)), np.diff(self.material_ptr))
+            material_ids = self.material_ids[rows]
+            product_ids = self.product_ids[self.material_products]
+            quantities = self.material_quantities
+
+            if self._changes:
+                # Связи из списка изменений заменяют связи массивов
+                replaced = np.zeros(len(quantities), dtype=bool)
+                for material_id, product_id in self._changes:
+                    position = self._base_positions(material_id, product_id)[0]
+                    if position >= 0:
+                        replaced[position] = True
+                added = [(key, quantity) for key, quantity in self._changes.items() if quantity is not _REMOVED]
+                material_ids = np.concatenate((material_ids[~replaced],
+                                               np.array([m for (m, _), _ in added], dtype=np.int64)))
+                product_ids = np.concatenate((product_ids[~replaced],
+                                              np.array([p for (_, p), _ in added], dtype=np.int64)))
+                quantities = np.concatenate((quantities[~replaced], np.array([q for _, q in added], dtype=float)))
+
+            self._build(np.concatenate((self.material_ids, np.array(list(self._new_materials), dtype=np.int64))),
+                        np.concatenate((self.product_ids, np.array(list(self._new_products), dtype=np.int64))),
+                        material_ids, product_ids, quantities)
+
+    def _neighbours(self, node_id, ids, ptr, neighbours, quantities, other_ids, changed, key):
+        """Соседи узла и количества по массивам и списку изменений, упорядоченные по ID соседа"""
+        position = self._position(ids, node_id)
+        if position >= 0:
+            links = slice(ptr[position], ptr[position + 1])
+            result_ids, result_quantities = other_ids[neighbours[links]], quantities[links].copy()
+        else:
+            result_ids, result_quantities = np.empty(0, dtype=np.int64), np.empty(0)
+
+        pending = changed.get(node_id)
+        if pending:
+            keep = ~np.isin(result_ids, list(pending))
+            added = [(other, self._changes[key(node_id, other)]) for other in pending]
+            added = [(other, quantity) for other, quantity in added if quantity is not _REMOVED]
+            result_ids = np.concatenate((result_ids[keep], np.array([o for o, _ in added], dtype=np.int64)))
+            result_quantities = np.concatenate((result_quantities[keep], np.array([q for _, q in added], dtype=float)))
+            order = np.argsort(result_ids)
+            result_ids, result_quantities = result_ids[order], result_quantities[order]
+        return result_ids, result_quantities
+
+    def products_of(self, material_id: int):
+        """ID продукции, использующей материал, и количество материала на единицу продукции"""
+        with self._lock:
+            return self._neighbours(int(material_id), self.material_ids, self.material_ptr,
+                                    self.material_products, self.material_quantities, self.product_ids,
+                                    self._changed_materials, lambda node, other: (node, other))
+
+    def materials_of(self, product_id: int):
+        """ID материалов продукции и количество каждого на единицу продукции"""
+        with self._lock:
+            return self._neighbours(int(product_id), self.product_ids, self.product_ptr,
+                                    self.product_materials, self.product_quantities, self.material_ids,
+                                    self._changed_products, lambda node, other: (other, node))
+
+    def links(self):
+        """Все связи массивами (ID материала, ID продукции, количество), упорядоченные по продукции"""
+        with self._lock:
+            self.compact()
+            cols = np.repeat(np.arange(len(self.product_ids)), np.diff(self.product_ptr))
+            return (self.material_ids[self.product_materials], self.product_ids[cols],
+                    self.product_quantities.copy())
+
+    def product_vector(self, product_ids, values) -> np.ndarray:
+        """Значения по продукции, выровненные по product_ids графа (0 для отсутствующих)"""
+        with self._lock:
+            self.compact()
+            product_ids = np.asarray(product_ids, dtype=np.int64)
+            values = np.asarray(values, dtype=float)
+            positions = self._lookup(self.product_ids, product_ids)
+            known = positions >= 0
+            vector = np.zeros(len(self.product_ids))
+            vector[positions[known]] = values[known]
+            return vector
+
+    def material_sums(self, product_values) -> np.ndarray:
+        """Сумма количество * значение продукции по связям каждого материала
+
+        product_values выровнены по product_ids (см. product_vector);
+        NaN в количестве или значении не учитывается, как NULL в SUM.
+        Результат выровнен по material_ids.
+        """
+        with self._lock:
+            self.compact()
+            rows = np.repeat(np.arange(len(self.material_ids)), np.diff(self.material_ptr))
+            weights = self.material_quantities * np.asarray(product_values, dtype=float)[self.material_products]
+            return np.bincount(rows, weights=np.nan_to_num(weights, nan=0.0), minlength=len(self.material_ids))
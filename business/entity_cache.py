@@ -0,0 +1,157 @@
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+
+# Статистика кэша: попадания, промахи, вытеснения, сбросы и текущий объем
+CacheStats = namedtuple('CacheStats', ['hits', 'misses', 'evictions', 'invalidations', 'entries', 'size_bytes'])
+
+
+def estimate_size(value, limit: int = None, _depth: int = 0) -> int:
+    """Приблизительный размер значения в памяти (объекты, списки, их атрибуты)
+
+    Подсчет элементов коллекции прекращается, как только размер превысил limit.
+    """
+    size = sys.getsizeof(value)
+    if _depth > 2:
+        return size
+    if isinstance(value, dict):
+        items = (item for pair in value.items() for item in pair)
+    elif isinstance(value, (list, tuple, set)):
+        items = value
+    elif hasattr(value, '__dict__'):
+        # Служебное состояние SQLAlchemy не учитывается, связанные объекты - учитываются
+        items = (v for k, v in vars(value).items() if not k.startswith('_sa_'))
+    else:
+        return size
+    for item in items:
+        size += estimate_size(item, None, _depth + 1)
+        if limit is not None and size > limit:
+            break
+    return size
+
+
+class EntityCache:
+    """Кэш результатов чтения с ограничением по памяти и вытеснением LRU
+
+    Ключ - кортеж (форма запроса, параметры), например ("material", 5) или
+    ("materials", "all"). Записи сбрасываются явно при записи через сервис;
+    изменения, сделанные другими соединениями и процессами, обнаруживаются
+    по PRAGMA data_version на выделенном соединении - при его изменении кэш
+    очищается целиком.
+    """
+
+    def __init__(self, db=None, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # ключ -> (значение, размер)
+        self._size = 0
+        self._lock = threading.RLock()
+        self._epoch = 0  # растет при каждом сбросе, чтобы не сохранить устаревший результат
+        self._generation = 0  # растет при каждой полной очистке
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+        # Выделенное соединение для PRAGMA data_version (для базы в памяти не нужно)
+        self._version_connection = None
+        self._data_version = None
+        if db is not None and db.engine.url.database not in (None, "", ":memory:"):
+            self._version_connection = db.engine.raw_connection()
+            self._data_version = self._read_data_version()
+
+    def _read_data_version(self):
+        cursor = self._version_connection.cursor()
+        try:
+            cursor.execute("PRAGMA data_version")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    def _check_data_version(self):
+        """Очистка кэша, если база данных изменена другим соединением"""
+        if self._version_connection is None:
+            return
+        version = self._read_data_version()
+        if version != self._data_version:
+            self._data_version = version
+            self._clear()
+
+    def get_or_load(self, key, load):
+        """Значение из кэша или результат load() с сохранением в кэш"""
+        with self._lock:
+            self._check_data_version()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            epoch = self._epoch
+
+        value = load()
+        with self._lock:
+            # За время загрузки кэш могли сбросить - тогда результат мог устареть
+            if epoch == self._epoch:
+                self._put(key, value)
+        return value
+
+    def _put(self, key, value):
+        size = estimate_size(value, self.max_bytes)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= old[1]
+        self._entries[key] = (value, size)
+        self._size += size
+        while self._size > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+            self.evictions += 1
+
+    def invalidate(self, *keys):
+        """Сброс записей после записи через этот процесс"""
+        with self._lock:
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._size -= entry[1]
+                    self.invalidations += 1
+            self._epoch += 1
+            # Собственная запись уже учтена, поэтому новое значение data_version
+            # не должно очищать остальной кэш (запись другого процесса, закончившаяся
+            # одновременно с нашей, обнаружится только при следующем изменении)
+            if self._version_connection is not None:
+                self._data_version = self._read_data_version()
+
+    def clear(self):
+        """Полная очистка кэша"""
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._size = 0
+        self._epoch += 1
+        self._generation += 1
+
+    def generation(self) -> int:
+        """Номер полной очистки кэша (с проверкой изменения базы данных другим соединением)
+
+        Позволяет держать вне кэша данные, которые обновляются на месте при
+        записи через сервис и перестраиваются при внешних изменениях.
+        """
+        with self._lock:
+            self._check_data_version()
+            return self._generation
+
+    def stats(self) -> CacheStats:
+        """Статистика попаданий и промахов"""
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.evictions, self.invalidations,
+                              len(self._entries), self._size)
+
+    def close(self):
+        """Закрытие выделенного соединения"""
+        with self._lock:
+            if self._version_connection is not None:
+                self._version_connection.close()
+                self._version_connection = None
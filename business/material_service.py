@@ -1,44 +1,294 @@
+import logging
+import math
+import threading
+from collections import namedtuple
+
+import numpy as np
+from sqlalchemy import Float, delete, func, literal, literal_column, or_, select
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import contains_eager, joinedload
 
+from business.bom_graph import BomGraph
+from business.entity_cache import EntityCache
+from business.production_capacity import ProductionCapacity
 from database.database import Database
-from database.models import Material, Product, material_product, ProductType, MaterialType
+from database.instrumentation import profile_methods
+from database.models import (
+    Material, Product, material_product, ProductType, MaterialType, material_requirements, material_sort_expression
+)
+from database.search_index import (
+    MIN_QUERY_LENGTH, materials_fts, products_fts, match_phrase, search_index_installed
+)
+
+# Потребность в материале и нехватка относительно остатка на складе
+MaterialRequirement = namedtuple('MaterialRequirement', ['material_id', 'required_quantity', 'shortfall'])
+
+# Страница результатов поиска: материалы, общее число найденных и курсор следующей страницы
+MaterialPage = namedtuple('MaterialPage', ['materials', 'total', 'next_cursor'])
+
+# Продукция, использующая материал: связь, тип и рассчитанный выпуск продукции
+MaterialUsage = namedtuple('MaterialUsage', [
+    'product_id', 'product_name', 'article', 'type_name', 'coefficient', 'material_quantity', 'product_quantity'
+])
+
+logger = logging.getLogger(__name__)
+
+# Доля потерь материала при производстве
+MATERIAL_LOSS = 0.05
+
+
+def product_quantity(coefficient, material_quantity, param1, param2) -> float:
+    """Количество продукции из material_quantity материала; -1 при некорректных данных
+
+    Некорректны отсутствующие (None или NaN) значения и неположительный расход.
+    """
+    if coefficient is None or material_quantity is None or math.isnan(material_quantity):
+        return -1
+    # Расход материала на единицу продукции; NaN тоже не проходит сравнение
+    material_per_product = param1 * param2 * coefficient
+    if not material_per_product > 0:
+        return -1
+    # Учет потерь материала
+    effective_quantity = material_quantity * (1 - MATERIAL_LOSS)
+    return effective_quantity / material_per_product
+
+# Выражения сортировки материалов; NULL заменяется, чтобы работало сравнение курсора.
+# Для колонок materials есть индексы (выражение, id), см. MATERIAL_SORT_INDEXES
+MATERIAL_SORT_KEYS = {
+    "id": Material.id,
+    "name": Material.name,
+    "type": func.coalesce(MaterialType.name, ''),
+    "price": material_sort_expression('price'),
+    "unit": material_sort_expression('unit'),
+    "package_quantity": material_sort_expression('package_quantity'),
+    "stock_quantity": material_sort_expression('stock_quantity'),
+    "min_quantity": material_sort_expression('min_quantity'),
+}
 
 #Сервис прослойка между интерфейсом и базой данных
+@profile_methods
 class MaterialService:
+    # Максимальное число параметров в одном IN (...)
+    IN_BATCH_SIZE = 500
+    # Сколько совпадений полнотекстового поиска ранжируется (bm25 считается для каждого)
+    RANK_CANDIDATES = 2000
+    # Ограничение памяти кэша прочитанных сущностей
+    CACHE_MAX_BYTES = 64 * 1024 * 1024
+
     def __init__(self, db: Database):
         self.db = db
+        # Каждый открытый метод - область профиля MaterialService.<метод>
+        self.instrumentation = db.instrumentation
+        self._search_index = None
+        self.cache = EntityCache(db, self.CACHE_MAX_BYTES)
+        self._bom_graph = None
+        self._bom_generation = None
+        self._bom_lock = threading.Lock()
+
+    def cache_stats(self):
+        """Статистика кэша сущностей (попадания, промахи, вытеснения, объем)"""
+        return self.cache.stats()
+
+    def bom_graph(self) -> BomGraph:
+        """Спецификация в памяти (см. BomGraph)
+
+        Строится при первом обращении и обновляется на месте при изменении
+        связей через сервис; при изменении базы данных другим соединением
+        строится заново.
+        """
+        with self._bom_lock:
+            generation = self.cache.generation()
+            if self._bom_graph is None or self._bom_generation != generation:
+                self._bom_graph = BomGraph.from_database(self.db)
+                self._bom_generation = generation
+            return self._bom_graph
+
+    def _search_index_ready(self) -> bool:
+        """Есть ли в базе полнотекстовый индекс наименований (проверяется один раз)"""
+        if self._search_index is None:
+            try:
+                with self.db.engine.connect() as conn:
+                    self._search_index = search_index_installed(conn)
+            except SQLAlchemyError:
+                self._search_index = False
+        return self._search_index
+
+    def _fts_matches(self, index, needle: str, candidates: int = None):
+        """Подзапрос (id, rank) строк индекса, содержащих needle; None, если индекс неприменим"""
+        if len(needle) < MIN_QUERY_LENGTH or not self._search_index_ready():
+            return None
+        matches = select(index.c.rowid.label('id'), index.c.rank).where(
+            literal_column(index.name).match(match_phrase(needle))
+        )
+        return matches.limit(candidates).subquery()
 
     def get_all_material_types(self):
         """Получение всех типов материалов"""
-        try:
+        def load():
             with self.db.get_session() as session:
                 return session.query(MaterialType).all()
+
+        try:
+            return self.cache.get_or_load(("material_types", "all"), load)
         except SQLAlchemyError as e:
-            print(f"Ошибка при получении типов материалов: {e}")
+            logger.error(f"Ошибка при получении типов материалов: {e}")
             return []
 
     def get_all_materials(self):
         """Получение всех материалов"""
-        try:
+        def load():
             with self.db.get_session() as session:
                 materials = session.query(Material).options(joinedload(Material.type)).all()
-                print(f"Получено материалов из БД: {len(materials)}")  # Отладочная информация
-                for material in materials:
-                    print(f"Материал в БД: {material.name}, ID: {material.id}")  # Отладочная информация
+                logger.debug(f"Получено материалов из БД: {len(materials)}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    for material in materials:
+                        logger.debug("Материал в БД: %s, ID: %s", material.name, material.id)
                 return materials
+
+        try:
+            return self.cache.get_or_load(("materials", "all"), load)
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при получении материалов: {e}")
+            return []
+
+    def search_materials(self, name_substr: str = None, type_name: str = None, min_stock: float = None,
+                         max_stock: float = None, order_by: str = "id", limit: int = 100, cursor=None,
+                         offset: int = 0, count_total: bool = True):
+        """Поиск материалов с фильтрацией, сортировкой и постраничной выдачей в SQL
+
+        order_by - ключ из MATERIAL_SORT_KEYS, с префиксом "-" для сортировки
+        по убыванию. Пагинация по ключу: cursor - значение next_cursor
+        предыдущей страницы; без курсора страница начинается с позиции offset
+        (для перехода в произвольное место списка). При count_total=False
+        общее число не считается (total=None). Возвращает MaterialPage.
+        Размер страницы limit - не меньше 1, иначе ValueError.
+        """
+        if limit < 1:
+            raise ValueError(f"Некорректный размер страницы: {limit}")
+        descending = order_by.startswith("-")
+        sort_key = MATERIAL_SORT_KEYS[order_by.lstrip("-")]
+        try:
+            with self.db.get_session() as session:
+                query = session.query(Material).outerjoin(Material.type)
+
+                # Фильтры
+                name_substr = (name_substr or "").strip().lower()
+                matches = self._fts_matches(materials_fts, name_substr) if name_substr else None
+                if matches is not None:
+                    query = query.filter(Material.id.in_(select(matches.c.id)))
+                elif name_substr:
+                    # norm_name учитывает регистр кириллицы, в отличие от встроенных lower()/LIKE
+                    query = query.filter(func.instr(func.norm_name(Material.name), name_substr) > 0)
+                if type_name:
+                    query = query.filter(MaterialType.name == type_name)
+                if min_stock is not None:
+                    query = query.filter(Material.stock_quantity >= min_stock)
+                if max_stock is not None:
+                    query = query.filter(Material.stock_quantity <= max_stock)
+
+                total = query.order_by(None).count() if count_total else None
+
+                if descending:
+                    ordering = (sort_key.desc(), Material.id.desc())
+                else:
+                    ordering = (sort_key, Material.id)
+
+                # Позиция offset переводится в курсор запросом только по (значение сортировки, id):
+                # пропускаемые строки читаются из индекса, а не целиком
+                if cursor is None and offset:
+                    cursor = query.with_entities(sort_key, Material.id).order_by(*ordering) \
+                        .offset(offset - 1).limit(1).first()
+                    if cursor is None:
+                        return MaterialPage([], total, None)
+
+                # Страница после курсора (значение сортировки, id)
+                page = query.options(contains_eager(Material.type)).add_columns(sort_key)
+                if cursor is not None:
+                    # Условие записано без сравнения кортежей: так SQLite ищет начало страницы по индексу
+                    value, last_id = cursor
+                    if descending:
+                        page = page.filter(sort_key <= value, or_(sort_key < value, Material.id < last_id))
+                    else:
+                        page = page.filter(sort_key >= value, or_(sort_key > value, Material.id > last_id))
+                rows = page.order_by(*ordering).limit(limit).all()
+
+                materials = [material for material, _ in rows]
+                next_cursor = None
+                if len(rows) == limit:
+                    last_material, last_value = rows[-1]
+                    next_cursor = (last_value, last_material.id)
+                return MaterialPage(materials, total, next_cursor)
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при поиске материалов: {e}")
+            return MaterialPage([], 0, None)
+
+    def search_material_names(self, text: str, limit: int = 20, prefix: bool = False):
+        """Поиск материалов по подстроке или началу наименования с ранжированием
+
+        Запросы от MIN_QUERY_LENGTH символов выполняются по триграммному индексу
+        materials_fts, более короткие - просмотром таблицы. Сначала идут
+        наименования, начинающиеся с запроса, затем по релевантности (bm25).
+        При поиске подстроки ранжируются первые RANK_CANDIDATES совпадений,
+        чтобы короткий частый запрос не считал bm25 для всего каталога.
+        """
+        needle = (text or "").strip().lower()
+        if not needle:
+            return []
+        try:
+            with self.db.get_session() as session:
+                query = session.query(Material).options(joinedload(Material.type))
+                starts = func.instr(func.norm_name(Material.name), needle) == 1
+                matches = self._fts_matches(materials_fts, needle, None if prefix else self.RANK_CANDIDATES)
+                if matches is not None:
+                    query = query.join(matches, matches.c.id == Material.id)
+                    rank = matches.c.rank
+                else:
+                    query = query.filter(func.instr(func.norm_name(Material.name), needle) > 0)
+                    rank = func.length(Material.name)
+                if prefix:
+                    query = query.filter(starts)
+                return query.order_by(starts.desc(), rank, Material.name).limit(limit).all()
         except SQLAlchemyError as e:
-            print(f"Ошибка при получении материалов: {e}")
+            logger.error(f"Ошибка при поиске материалов: {e}")
+            return []
+
+    def search_products(self, text: str, limit: int = 20, prefix: bool = False):
+        """Поиск продукции по подстроке или началу наименования либо артикула с ранжированием"""
+        needle = (text or "").strip().lower()
+        if not needle:
+            return []
+        try:
+            with self.db.get_session() as session:
+                query = session.query(Product).options(joinedload(Product.type))
+                name_position = func.instr(func.norm_name(Product.name), needle)
+                article_position = func.instr(func.norm_name(Product.article), needle)
+                starts = or_(name_position == 1, article_position == 1)
+                matches = self._fts_matches(products_fts, needle, None if prefix else self.RANK_CANDIDATES)
+                if matches is not None:
+                    query = query.join(matches, matches.c.id == Product.id)
+                    rank = matches.c.rank
+                else:
+                    query = query.filter(or_(name_position > 0, article_position > 0))
+                    rank = func.length(Product.name)
+                if prefix:
+                    query = query.filter(starts)
+                return query.order_by(starts.desc(), rank, Product.name).limit(limit).all()
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при поиске продукции: {e}")
             return []
 
     def get_material_by_id(self, material_id: int):
         """Получение материала по ID"""
-        try:
+        def load():
             with self.db.get_session() as session:
                 return session.query(Material).options(joinedload(Material.type)).filter(
                     Material.id == material_id).first()
+
+        try:
+            return self.cache.get_or_load(("material", material_id), load)
         except SQLAlchemyError as e:
-            print(f"Ошибка при получении материала: {e}")
+            logger.error(f"Ошибка при получении материала: {e}")
             return None
 
     def add_material(self, material_data: dict):
@@ -66,9 +316,12 @@ class MaterialService:
 
                 session.add(material)
                 session.commit()
+                material_id = material.id
+                self.cache.invalidate(("materials", "all"), ("material", material_id))
+                self._bom_changed(lambda graph: graph.add_material(material_id))
                 return material
         except SQLAlchemyError as e:
-            print(f"Ошибка при добавлении материала: {e}")
+            logger.error(f"Ошибка при добавлении материала: {e}")
             return None
 
     def update_material(self, material_id: int, material_data: dict):
@@ -97,71 +350,234 @@ class MaterialService:
                 material.min_quantity = material_data['min_quantity']
 
                 session.commit()
+                self.cache.invalidate(("materials", "all"), ("material", material_id), ("production_capacity",))
                 return material
         except SQLAlchemyError as e:
-            print(f"Ошибка при обновлении материала: {e}")
+            logger.error(f"Ошибка при обновлении материала: {e}")
             return None
 
     def calculate_required_quantity(self, material_id: int) -> float:
         """Расчет требуемого количества материала"""
+        return self.calculate_required_quantities([material_id]).get(material_id, 0.0)
+
+    def calculate_required_quantities(self, material_ids=None) -> dict:
+        """Расчет требуемого количества для многих материалов
+
+        Сумма количество материала * количество продукции по связям
+        считается по спецификации в памяти (см. bom_graph) без обращения
+        к material_product. Возвращает словарь {material_id: количество};
+        при material_ids=None - для всех материалов (материалы без связей
+        получают 0.0).
+        """
+        try:
+            graph = self.bom_graph()
+            product_ids, quantities = self.product_quantities()
+            required = graph.material_sums(graph.product_vector(product_ids, quantities))
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при расчете требуемого количества: {e}")
+            return {}
+
+        if material_ids is None:
+            return dict(zip(graph.material_ids.tolist(), required.tolist()))
+        material_ids = np.asarray(list(material_ids), dtype=np.int64)
+        positions = np.searchsorted(graph.material_ids, material_ids)
+        known = positions < len(graph.material_ids)
+        known[known] = graph.material_ids[positions[known]] == material_ids[known]
+        return dict(zip(material_ids[known].tolist(), required[positions[known]].tolist()))
+
+    def product_quantities(self):
+        """ID продукции и количество продукции (NULL как NaN) массивами из кэша сущностей"""
+        def load():
+            with self.db.engine.connect() as conn:
+                rows = conn.exec_driver_sql("SELECT id, quantity FROM products").fetchall()
+            return (np.array([row[0] for row in rows], dtype=np.int64),
+                    np.array([row[1] for row in rows], dtype=float))
+
+        return self.cache.get_or_load(("products", "quantities"), load)
+
+    def set_material_link(self, material_id: int, product_id: int, quantity) -> bool:
+        """Добавление связи материала с продукцией или изменение количества материала
+
+        Внешние ключи в SQLite не проверяются, поэтому строка вставляется выборкой
+        из materials с проверкой наличия продукции: для несуществующего материала или продукции
+        ничего не записывается и возбуждается ValueError.
+        """
         try:
             with self.db.get_session() as session:
-                material = session.query(Material).filter(Material.id == material_id).first()
-                if not material:
-                    return 0.0
+                statement = insert(material_product).from_select(
+                    ['material_id', 'product_id', 'quantity'],
+                    select(Material.id, literal(product_id), literal(quantity, Float)).where(
+                        Material.id == material_id, select(Product.id).where(Product.id == product_id).exists()
+                    )
+                )
+                result = session.execute(statement.on_conflict_do_update(
+                    index_elements=[material_product.c.material_id, material_product.c.product_id],
+                    set_={'quantity': statement.excluded.quantity}
+                ))
+                if result.rowcount == 0:
+                    raise ValueError(f"Материал ID={material_id} или продукция ID={product_id} не найдены")
+                session.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при сохранении связи материала с продукцией: {e}")
+            return False
+        self._bom_changed(lambda graph: graph.set_link(material_id, product_id, quantity))
+        return True
 
-                # Получаем все связи материала с продуктами
-                material_products = session.query(material_product).filter(
-                    material_product.c.material_id == material_id
-                ).all()
+    def remove_material_link(self, material_id: int, product_id: int) -> bool:
+        """Удаление связи материала с продукцией"""
+        try:
+            with self.db.get_session() as session:
+                session.execute(delete(material_product).where(
+                    material_product.c.material_id == material_id, material_product.c.product_id == product_id
+                ))
+                session.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при удалении связи материала с продукцией: {e}")
+            return False
+        self._bom_changed(lambda graph: graph.remove_link(material_id, product_id))
+        return True
 
-                total_required = 0.0
-                for mp in material_products:
-                    # Получаем продукт
-                    product = session.query(Product).filter(Product.id == mp.product_id).first()
-                    if product and product.quantity:
-                        # Умножаем количество материала на количество продукта
-                        total_required += mp.quantity * product.quantity
+    def _bom_changed(self, update):
+        """Обновление спецификации в памяти и сброс зависящих от нее записей кэша"""
+        with self._bom_lock:
+            self.cache.invalidate(("production_capacity",))
+            if self._bom_graph is not None:
+                update(self._bom_graph)
 
-                return total_required
+    def get_material_requirement(self, material_id: int):
+        """Потребность в материале из материализованной таблицы (чтение по ключу)"""
+        return self.get_material_requirements([material_id]).get(material_id)
+
+    def get_material_requirements(self, material_ids=None) -> dict:
+        """Потребность и нехватка материалов из таблицы material_requirements
+
+        Значения поддерживаются триггерами при изменении связей и количества
+        продукции, поэтому чтение не пересчитывает сумму по связям.
+        Возвращает словарь {material_id: MaterialRequirement}.
+        """
+        try:
+            with self.db.get_session() as session:
+                query = session.query(material_requirements)
+                if material_ids is None:
+                    rows = query.all()
+                else:
+                    material_ids = list(material_ids)
+                    rows = []
+                    for i in range(0, len(material_ids), self.IN_BATCH_SIZE):
+                        batch = material_ids[i:i + self.IN_BATCH_SIZE]
+                        rows.extend(query.filter(material_requirements.c.material_id.in_(batch)).all())
+                return {row.material_id: MaterialRequirement(*row) for row in rows}
         except SQLAlchemyError as e:
-            print(f"Ошибка при расчете требуемого количества: {e}")
-            return 0.0
+            logger.error(f"Ошибка при получении потребности в материалах: {e}")
+            return {}
 
     def get_products_for_material(self, material_id: int):
-        """Получение списка продуктов, использующих материал"""
+        """Получение списка продуктов, использующих материал
+
+        Связи берутся из спецификации в памяти, продукция загружается по ID.
+        """
         try:
+            product_ids = self.bom_graph().products_of(material_id)[0].tolist()
+            products = []
             with self.db.get_session() as session:
-                # Отладочная информация
-                print(f"\nПроверка связей для материала ID={material_id}")
+                query = session.query(Product).options(joinedload(Product.type))
+                for i in range(0, len(product_ids), self.IN_BATCH_SIZE):
+                    batch = product_ids[i:i + self.IN_BATCH_SIZE]
+                    products.extend(query.filter(Product.id.in_(batch)).order_by(Product.id).all())
+            return products
 
-                # Проверяем связи напрямую
-                material_products = session.query(material_product).filter(
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при получении продуктов: {e}")
+            return []
+
+    def get_material_usage(self, material_id: int) -> list:
+        """Продукция, использующая материал, одним запросом
+
+        Возвращает список MaterialUsage: продукция, тип и его коэффициент,
+        количество материала на единицу продукции и количество продукции,
+        получаемое из этого количества материала (параметры 1 x 1, см.
+        calculate_product_quantity).
+        """
+        try:
+            with self.db.get_session() as session:
+                rows = session.query(
+                    Product.id, Product.name, Product.article, ProductType.name, ProductType.coefficient,
+                    material_product.c.quantity
+                ).join(
+                    material_product, material_product.c.product_id == Product.id
+                ).outerjoin(
+                    ProductType, ProductType.id == Product.type_id
+                ).filter(
                     material_product.c.material_id == material_id
-                ).all()
-                print(f"Найдено связей в таблице material_product: {len(material_products)}")
-                for mp in material_products:
-                    print(f"Связь: material_id={mp.material_id}, product_id={mp.product_id}, quantity={mp.quantity}")
+                ).order_by(Product.id).all()
+                return [MaterialUsage(*row, product_quantity(row.coefficient, row.quantity, 1, 1)) for row in rows]
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при получении продукции материала: {e}")
+            return []
 
-                # Проверяем сам материал
-                material = session.query(Material).filter(Material.id == material_id).first()
-                if material:
-                    print(f"Материал найден: {material.name}")
-                    print(f"Количество связанных продуктов: {len(material.products)}")
-                else:
-                    print("Материал не найден!")
+    def product_type_coefficients(self) -> np.ndarray:
+        """Коэффициенты типов продукции, индексированные ID типа (NaN для отсутствующих ID)
 
-                # Получаем продукты
-                products = session.query(Product).options(
-                    joinedload(Product.type)
-                ).join(Product.materials).filter(Material.id == material_id).all()
+        Вектор хранится в кэше сущностей и сбрасывается при изменении базы данных.
+        """
+        def load():
+            with self.db.get_session() as session:
+                rows = session.query(ProductType.id, ProductType.coefficient).all()
+            size = max((type_id for type_id, _ in rows), default=-1) + 1
+            coefficients = np.full(size, np.nan)
+            for type_id, coefficient in rows:
+                if type_id >= 0 and coefficient is not None:
+                    coefficients[type_id] = coefficient
+            return coefficients
+
+        return self.cache.get_or_load(("product_types", "coefficients"), load)
 
-                print(f"Запрос вернул продуктов: {len(products)}")
-                return products
+    def calculate_product_quantities(self, product_type_ids, material_quantities, param1, param2) -> np.ndarray:
+        """Расчет количества продукции для массивов входных данных (векторно)
 
+        Аргументы - массивы или скаляры одинаковой (или совместимой для
+        broadcasting) формы. Результат совпадает с calculate_product_quantity
+        поэлементно: -1 для неизвестного типа продукции, неположительного
+        расхода материала и отсутствующих (NaN) значений.
+        """
+        try:
+            coefficients = self.product_type_coefficients()
         except SQLAlchemyError as e:
-            print(f"Ошибка при получении продуктов: {e}")
-            return []
+            logger.error(f"Ошибка при получении коэффициентов типов продукции: {e}")
+            coefficients = np.empty(0)
+
+        type_ids, quantities, param1, param2 = np.broadcast_arrays(
+            np.asarray(product_type_ids, dtype=np.int64),
+            np.asarray(material_quantities, dtype=float),
+            np.asarray(param1, dtype=float),
+            np.asarray(param2, dtype=float),
+        )
+
+        # Коэффициент по ID типа; неизвестные ID дают NaN
+        known = (type_ids >= 0) & (type_ids < len(coefficients))
+        coefficient = np.full(type_ids.shape, np.nan)
+        coefficient[known] = coefficients[type_ids[known]]
+
+        # Расход материала на единицу продукции и учет потерь, как в product_quantity
+        material_per_product = param1 * param2 * coefficient
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = quantities * (1 - MATERIAL_LOSS) / material_per_product
+        invalid = ~(material_per_product > 0) | np.isnan(quantities)
+        return np.where(invalid, -1.0, result)
+
+    def get_production_capacity(self):
+        """Расчет выпуска продукции по текущим остаткам (см. ProductionCapacity)
+
+        Связи берутся из спецификации в памяти, остатки загружаются одним
+        запросом; результат хранится в кэше сущностей до изменения остатков
+        или связей. None при ошибке чтения.
+        """
+        try:
+            return self.cache.get_or_load(("production_capacity",),
+                                          lambda: ProductionCapacity.from_graph(self.db, self.bom_graph()))
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при расчете выпуска продукции: {e}")
+            return None
 
     def calculate_product_quantity(self, product_type_id, material_quantity, param1, param2):
         """Расчет количества получаемой продукции"""
@@ -175,18 +591,7 @@ class MaterialService:
                 if not product_type:
                     return -1
 
-                # Расчет количества продукции
-                material_per_product = param1 * param2 * product_type.coefficient
-                if material_per_product <= 0:
-                    return -1
-
-                # Учет потерь материала
-                loss_percentage = 0.05
-                effective_quantity = material_quantity * (1 - loss_percentage)
-
-                # Расчет итогового количества продукции
-                product_quantity = effective_quantity / material_per_product
-                return product_quantity
+                return product_quantity(product_type.coefficient, material_quantity, param1, param2)
 
         except Exception:
-            return -1
\ No newline at end of file
+            return -1
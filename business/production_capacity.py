@@ -0,0 +1,145 @@
+from collections import namedtuple
+
+import numpy as np
+
+from database.database import Database
+from database.models import Material, Product, material_product
+
+# Сколько единиц продукции позволяет склад и какой материал ограничивает выпуск
+ProductCapacity = namedtuple('ProductCapacity', ['product_id', 'quantity', 'bottleneck_material_id'])
+
+# Результат распределения склада: запрошено, выделено и ограничивающий материал
+Allocation = namedtuple('Allocation', ['product_id', 'requested', 'allocated', 'bottleneck_material_id'])
+
+# Относительный допуск при округлении вниз (0.3 / 0.1 = 2.9999999999999996)
+_EPSILON = 1e-9
+
+
+class ProductionCapacity:
+    """Расчет выпуска продукции по остаткам материалов на складе
+
+    Спецификация (material_product) хранится как разреженная матрица
+    материал x продукция в формате COO: массивы индексов материала и
+    продукции и количество материала на единицу продукции. Связи с
+    неположительным количеством не расходуют материал и не учитываются.
+    Продукция без связей ничем не ограничена (количество inf).
+    """
+
+    def __init__(self, material_ids, stock, product_ids, link_material_ids, link_product_ids, link_quantities):
+        self.material_ids = np.asarray(material_ids, dtype=np.int64)
+        self.product_ids = np.asarray(product_ids, dtype=np.int64)
+        # Отрицательный или неизвестный остаток считается нулевым
+        self.stock = np.clip(np.nan_to_num(np.asarray(stock, dtype=float), nan=0.0), 0, None)
+
+        material_order = np.argsort(self.material_ids)
+        product_order = np.argsort(self.product_ids)
+        self.material_ids, self.stock = self.material_ids[material_order], self.stock[material_order]
+        self.product_ids = self.product_ids[product_order]
+
+        link_material_ids = np.asarray(link_material_ids, dtype=np.int64)
+        link_product_ids = np.asarray(link_product_ids, dtype=np.int64)
+        quantities = np.asarray(link_quantities, dtype=float)
+        keep = (quantities > 0) \
+            & np.isin(link_material_ids, self.material_ids) & np.isin(link_product_ids, self.product_ids)
+
+        # Строки и столбцы матрицы - индексы в отсортированных массивах ID; связи упорядочены по продукции
+        rows = np.searchsorted(self.material_ids, link_material_ids[keep])
+        cols = np.searchsorted(self.product_ids, link_product_ids[keep])
+        order = np.argsort(cols, kind='stable')
+        self.rows, self.cols, self.quantities = rows[order], cols[order], quantities[keep][order]
+        # Границы связей каждой продукции (как indptr в CSC)
+        self.product_ptr = np.concatenate(([0], np.cumsum(np.bincount(self.cols, minlength=len(self.product_ids)))))
+
+    @classmethod
+    def from_database(cls, db: Database):
+        """Загрузка остатков и спецификации тремя запросами"""
+        with db.get_session() as session:
+            materials = session.query(Material.id, Material.stock_quantity).all()
+            products = session.query(Product.id).all()
+            links = session.query(material_product.c.material_id, material_product.c.product_id,
+                                  material_product.c.quantity).all()
+
+        def column(rows, i, dtype):
+            return np.array([row[i] if row[i] is not None else np.nan for row in rows], dtype=dtype)
+
+        return cls(column(materials, 0, np.int64), column(materials, 1, float), column(products, 0, np.int64),
+                   column(links, 0, np.int64), column(links, 1, np.int64), column(links, 2, float))
+
+    @classmethod
+    def from_graph(cls, db: Database, graph):
+        """Построение по спецификации в памяти (BomGraph) и остаткам из одного запроса"""
+        with db.get_session() as session:
+            materials = session.query(Material.id, Material.stock_quantity).all()
+        stock = np.array([quantity if quantity is not None else np.nan for _, quantity in materials], dtype=float)
+        return cls(np.array([material_id for material_id, _ in materials], dtype=np.int64), stock,
+                   graph.product_ids, *graph.links())
+
+    def _limits(self, stock):
+        """Выпуск и индекс ограничивающего материала для каждой продукции (-1, если ограничения нет)"""
+        ratios = stock[self.rows] / self.quantities
+        quantity = np.full(len(self.product_ids), np.inf)
+        bottleneck = np.full(len(self.product_ids), -1, dtype=np.int64)
+        counts = np.diff(self.product_ptr)
+        linked = counts > 0
+        if linked.any():
+            # Связи упорядочены по продукции: минимум отношения остаток / расход по отрезкам
+            starts = self.product_ptr[:-1][linked]
+            minimums = np.minimum.reduceat(ratios, starts)
+            # Первая связь отрезка, на которой достигается минимум
+            hits = np.flatnonzero(ratios == np.repeat(minimums, counts[linked]))
+            first = hits[np.searchsorted(hits, starts)]
+            quantity[linked] = np.floor(minimums * (1 + _EPSILON))
+            bottleneck[linked] = self.rows[first]
+        return quantity, bottleneck
+
+    def buildable(self):
+        """Максимальный выпуск всей продукции за один векторный проход
+
+        Возвращает (ID продукции, количество, ID ограничивающего материала или -1).
+        """
+        quantity, bottleneck = self._limits(self.stock)
+        bottleneck_ids = np.where(bottleneck >= 0, self.material_ids[np.maximum(bottleneck, 0)], -1)
+        return self.product_ids, quantity, bottleneck_ids
+
+    def capacities(self) -> list:
+        """Максимальный выпуск продукции списком ProductCapacity"""
+        return [ProductCapacity(int(product_id), float(quantity), int(material_id) if material_id >= 0 else None)
+                for product_id, quantity, material_id in zip(*self.buildable())]
+
+    def allocate(self, priorities) -> list:
+        """Жадное распределение общего склада по списку продукции в порядке приоритета
+
+        priorities - список (ID продукции, желаемое количество или None - сколько возможно).
+        Каждая продукция получает максимум, который позволяет остаток после
+        предыдущих; склад объекта не изменяется. Возвращает список Allocation.
+        Отрицательное (или NaN) желаемое количество - ValueError.
+        """
+        priorities = list(priorities)
+        for product_id, requested in priorities:
+            if requested is not None and not float(requested) >= 0:
+                raise ValueError(f"Некорректное количество продукции ID={product_id}: {requested}")
+
+        stock = self.stock.copy()
+        allocations = []
+        for product_id, requested in priorities:
+            position = np.searchsorted(self.product_ids, product_id)
+            if position >= len(self.product_ids) or self.product_ids[position] != product_id:
+                allocations.append(Allocation(product_id, requested, 0.0, None))
+                continue
+
+            links = slice(self.product_ptr[position], self.product_ptr[position + 1])
+            rows, quantities = self.rows[links], self.quantities[links]
+            bottleneck = None
+            if len(rows):
+                ratios = stock[rows] / quantities
+                limit = np.argmin(ratios)
+                available = np.floor(ratios[limit] * (1 + _EPSILON))
+                bottleneck = int(self.material_ids[rows[limit]])
+            else:
+                available = np.inf
+
+            allocated = available if requested is None else min(float(requested), available)
+            if len(rows) and allocated > 0 and np.isfinite(allocated):
+                stock[rows] = np.maximum(stock[rows] - quantities * allocated, 0)
+            allocations.append(Allocation(product_id, requested, float(allocated), bottleneck))
+        return allocations
@@ -43,10 +43,68 @@ create table products
 
 create table material_product
 (
-    material_id INTEGER
+    material_id INTEGER not null
         references materials,
-    product_id  INTEGER
+    product_id  INTEGER not null
         references products,
-    quantity    FLOAT
+    quantity    FLOAT,
+    primary key (material_id, product_id)
 );
 
+create index ix_material_product_product_id
+    on material_product (product_id);
+
+create index ix_material_types_name
+    on material_types (name);
+
+create index ix_materials_sort_price
+    on materials (coalesce(price, -1e308), id);
+
+create index ix_materials_sort_unit
+    on materials (coalesce(unit, ''), id);
+
+create index ix_materials_sort_package_quantity
+    on materials (coalesce(package_quantity, -1e308), id);
+
+create index ix_materials_sort_stock_quantity
+    on materials (coalesce(stock_quantity, -1e308), id);
+
+create index ix_materials_sort_min_quantity
+    on materials (coalesce(min_quantity, -1e308), id);
+
+create index ix_product_types_name
+    on product_types (name);
+
+create table material_requirements
+(
+    material_id       INTEGER not null
+        primary key
+        references materials,
+    required_quantity FLOAT   not null,
+    shortfall         FLOAT   not null
+);
+
+create table material_requirements_suspended
+(
+    reason VARCHAR
+);
+
+create table import_files
+(
+    path         VARCHAR not null
+        primary key,
+    content_hash VARCHAR not null
+);
+
+create table import_rows
+(
+    source   VARCHAR not null,
+    key      VARCHAR not null,
+    row_hash VARCHAR not null,
+    primary key (source, key)
+);
+
+
+create virtual table materials_fts using fts5(name, content='materials', content_rowid='id', tokenize='trigram');
+
+create virtual table products_fts using fts5(name, article, content='products', content_rowid='id', tokenize='trigram');
@@ -0,0 +1,60 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.util import greenlet_spawn
+
+from .database import ENGINE_PRESETS, Database, configure_connection
+from .models import Base
+
+
+class AsyncDatabase:
+    """Асинхронный доступ к базе данных через aiosqlite
+
+    Соединения настраиваются теми же наборами ENGINE_PRESETS, что и в
+    Database. Обычный URL sqlite:/// переводится на драйвер aiosqlite.
+    """
+
+    def __init__(self, db_path="sqlite+aiosqlite:///materials.db", config="interactive"):
+        self.config = ENGINE_PRESETS[config] if isinstance(config, str) else config
+        url = make_url(db_path).set(drivername="sqlite+aiosqlite")
+        pool_options = {}
+        if url.database not in (None, "", ":memory:"):
+            # Пул асинхронного движка - асинхронный вариант того же класса
+            pool_class = AsyncAdaptedQueuePool if self.config.pool_class is QueuePool else self.config.pool_class
+            pool_options["poolclass"] = pool_class
+            if issubclass(pool_class, QueuePool):
+                pool_options.update(pool_size=self.config.pool_size, max_overflow=self.config.max_overflow)
+        self.engine = create_async_engine(url, **pool_options)
+        event.listen(self.engine.sync_engine, "connect", self._on_connect)
+        # Объекты остаются доступными после фиксации: ленивая загрузка в asyncio невозможна
+        self.Session = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        # Синхронный интерфейс к тому же движку для кода, вызываемого через run_sync
+        self.sync = Database.for_engine(self.engine.sync_engine, self.config)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        """Настройка каждого нового соединения: PRAGMA из config и SQL-функции"""
+        configure_connection(dbapi_connection, self.config)
+
+    async def create_tables(self):
+        """Создание всех таблиц и применение миграций"""
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        from .migrations import upgrade
+        await self.run_sync(upgrade, self.sync)
+
+    def get_session(self):
+        """Получение асинхронной сессии (async with db.get_session() as session)"""
+        return self.Session()
+
+    async def run_sync(self, func, *args, **kwargs):
+        """Выполнение синхронного кода, работающего с self.sync, без блокировки цикла событий
+
+        Код выполняется в greenlet: каждое обращение к базе внутри него
+        передается в aiosqlite и ожидается асинхронно.
+        """
+        return await greenlet_spawn(func, *args, **kwargs)
+
+    async def dispose(self):
+        """Закрытие всех соединений пула"""
+        await self.engine.dispose()
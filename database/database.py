@@ -1,18 +1,110 @@
-from sqlalchemy import create_engine
+from collections import namedtuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
+from .instrumentation import Instrumentation
 from .models import Base
 
+# Настройки соединений SQLite (применяются через PRAGMA при подключении) и пула соединений
+EngineConfig = namedtuple('EngineConfig', [
+    'journal_mode', 'synchronous', 'cache_size_kb', 'mmap_size', 'temp_store', 'busy_timeout_ms',
+    'pool_class', 'pool_size', 'max_overflow'
+])
+
+ENGINE_PRESETS = {
+    # Интерфейс: WAL, чтобы чтение в фоновом потоке не ждало записи, и надежная фиксация
+    "interactive": EngineConfig(
+        journal_mode="WAL", synchronous="NORMAL", cache_size_kb=64 * 1024, mmap_size=256 * 1024 * 1024,
+        temp_store="MEMORY", busy_timeout_ms=5000, pool_class=QueuePool, pool_size=5, max_overflow=10
+    ),
+    # Массовый импорт: без fsync при фиксации и с большим кэшем страниц; база создается заново
+    # из Excel-файлов, поэтому потеря последних транзакций при сбое питания допустима
+    "bulk_import": EngineConfig(
+        journal_mode="WAL", synchronous="OFF", cache_size_kb=512 * 1024, mmap_size=1024 * 1024 * 1024,
+        temp_store="MEMORY", busy_timeout_ms=60000, pool_class=QueuePool, pool_size=2, max_overflow=4
+    ),
+    # Инкрементальная загрузка: пишет в рабочую базу с правками пользователей, поэтому
+    # фиксация надежная, как в интерфейсе; кэш и ожидание блокировки - как при массовом импорте
+    "incremental_import": EngineConfig(
+        journal_mode="WAL", synchronous="NORMAL", cache_size_kb=512 * 1024, mmap_size=1024 * 1024 * 1024,
+        temp_store="MEMORY", busy_timeout_ms=60000, pool_class=QueuePool, pool_size=2, max_overflow=4
+    ),
+}
+
+
+def normalize_name(value):
+    """Нормализация наименования для сопоставления: без пробелов по краям, нижний регистр"""
+    if value is None:
+        return None
+    return str(value).strip().lower()
+
+
+def configure_connection(dbapi_connection, config: EngineConfig):
+    """PRAGMA из config и SQL-функции на новом соединении DB-API"""
+    cursor = dbapi_connection.cursor()
+    try:
+        # Таймаут первым: переключение в WAL ждет, пока другие соединения освободят базу
+        cursor.execute(f"PRAGMA busy_timeout = {int(config.busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA journal_mode = {config.journal_mode}")
+        cursor.execute(f"PRAGMA synchronous = {config.synchronous}")
+        # Отрицательное значение cache_size - размер в КиБ, а не в страницах
+        cursor.execute(f"PRAGMA cache_size = {-int(config.cache_size_kb)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(config.mmap_size)}")
+        cursor.execute(f"PRAGMA temp_store = {config.temp_store}")
+    finally:
+        cursor.close()
+    # Встроенная lower() в SQLite работает только с ASCII, а наименования на кириллице
+    dbapi_connection.create_function("norm_name", 1, normalize_name, deterministic=True)
+
 
 class Database:
-    def __init__(self, db_path="sqlite:///materials.db"):
-        self.engine = create_engine(db_path)
+    def __init__(self, db_path="sqlite:///materials.db", config="interactive"):
+        """config - имя набора из ENGINE_PRESETS или EngineConfig"""
+        self.config = ENGINE_PRESETS[config] if isinstance(config, str) else config
+        pool_options = {}
+        # База в памяти живет в одном соединении, поэтому пул для нее не настраивается
+        if make_url(db_path).database not in (None, "", ":memory:"):
+            pool_options["poolclass"] = self.config.pool_class
+            if issubclass(self.config.pool_class, QueuePool):
+                pool_options.update(pool_size=self.config.pool_size, max_overflow=self.config.max_overflow)
+        self.engine = create_engine(db_path, **pool_options)
+        event.listen(self.engine, "connect", self._on_connect)
         self.Session = sessionmaker(bind=self.engine)
+        # Счетчики запросов и времени (включаются через instrumentation.enabled)
+        self.instrumentation = Instrumentation(self.engine)
+
+    @classmethod
+    def for_engine(cls, engine, config="interactive"):
+        """Обертка над уже созданным движком (например, sync_engine асинхронного движка)
+
+        Обработчик подключения не регистрируется: его регистрирует владелец движка.
+        """
+        db = cls.__new__(cls)
+        db.config = ENGINE_PRESETS[config] if isinstance(config, str) else config
+        db.engine = engine
+        db.Session = sessionmaker(bind=engine)
+        db.instrumentation = Instrumentation(engine)
+        return db
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        """Настройка каждого нового соединения: PRAGMA из config и SQL-функции"""
+        configure_connection(dbapi_connection, self.config)
+
+    def pragmas(self) -> dict:
+        """Текущие настройки соединения (для диагностики)"""
+        names = ("journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store", "busy_timeout")
+        with self.engine.connect() as conn:
+            return {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in names}
 
     def create_tables(self):
         """Создание всех таблиц в базе данных"""
         Base.metadata.create_all(self.engine)
+        from .migrations import upgrade
+        upgrade(self)
 
     def get_session(self):
         """Получение сессии для работы с базой данных"""
@@ -0,0 +1,196 @@
+import logging
+import os
+
+import pandas as pd
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .database import Database
+from .load_data import (
+    MATERIAL_TYPES_FILE, MATERIALS_FILE, PRODUCT_TYPES_FILE, PRODUCTS_FILE, MATERIAL_PRODUCTS_FILE,
+    MATERIAL_UPDATE_COLUMNS, PRODUCT_UPDATE_COLUMNS,
+    _read_sheet, _float_column, _type_ids, _upsert, _material_frame, _product_frame,
+    _replace_relations, _print_unmatched
+)
+from .models import MaterialType, Material, ProductType, Product, ImportFile, ImportRow, material_product
+from .sheet_cache import file_hash
+
+logger = logging.getLogger(__name__)
+
+# Ограничение числа параметров в одном IN (...)
+_IN_BATCH = 500
+
+
+def _row_hashes(frame: pd.DataFrame) -> pd.Series:
+    """Отпечатки нормализованных строк (векторно)"""
+    return pd.util.hash_pandas_object(frame, index=False).map('{:016x}'.format)
+
+
+def _batches(items: list):
+    """Разбиение списка ключей на части для IN (...)"""
+    for i in range(0, len(items), _IN_BATCH):
+        yield items[i:i + _IN_BATCH]
+
+
+def _sync_rows(conn, source: str, table, key: str, frame: pd.DataFrame, file_keys: set,
+               update_columns: tuple, link_column: str):
+    """Применение к таблице только новых, измененных и удаленных строк
+
+    file_keys - все ключи файла, включая строки с неизвестным типом: такие
+    строки не загружаются, но и не считаются удаленными.
+    Возвращает (новых, измененных, удаленных).
+    """
+    frame = frame.drop_duplicates(key, keep='last')
+    hashes = _row_hashes(frame[[key, *update_columns]])
+    stored = dict(conn.execute(
+        select(ImportRow.key, ImportRow.row_hash).where(ImportRow.source == source)
+    ).all())
+
+    previous = frame[key].map(stored)
+    changed = (previous != hashes.values).to_numpy()
+    inserted = int(previous[changed].isna().sum())
+    deleted = [k for k in stored if k not in file_keys]
+
+    _upsert(conn, table, key, frame[changed].to_dict('records'), update_columns)
+    for keys in _batches(deleted):
+        ids = select(table.c.id).where(table.c[key].in_(keys))
+        conn.execute(delete(material_product).where(material_product.c[link_column].in_(ids)))
+        conn.execute(delete(table).where(table.c[key].in_(keys)))
+        conn.execute(delete(ImportRow.__table__).where(ImportRow.source == source, ImportRow.key.in_(keys)))
+
+    fingerprints = [
+        {'source': source, 'key': k, 'row_hash': h}
+        for k, h in zip(frame[key][changed], hashes[changed])
+    ]
+    if fingerprints:
+        stmt = sqlite_insert(ImportRow.__table__)
+        stmt = stmt.on_conflict_do_update(index_elements=['source', 'key'],
+                                          set_={'row_hash': stmt.excluded.row_hash})
+        conn.execute(stmt, fingerprints)
+    return inserted, int(changed.sum()) - inserted, len(deleted)
+
+
+def _sync_material_types(conn, df: pd.DataFrame) -> set:
+    """Добавление новых типов материалов (существующие не дублируются)
+
+    Строки материалов с неизвестным типом не загружались и не получили
+    отпечатков, поэтому при новых типах файл материалов применяется заново.
+    """
+    existing = _type_ids(conn, MaterialType)
+    names = df['Тип материала'].astype(str).str.strip().drop_duplicates()
+    new = [{'name': name} for name in names if name not in existing]
+    if new:
+        conn.execute(insert(MaterialType.__table__), new)
+    logger.info(f"Новых типов материалов: {len(new)}")
+    return {MATERIALS_FILE} if new else set()
+
+
+def _sync_product_types(conn, df: pd.DataFrame) -> set:
+    """Добавление новых типов продукции и обновление измененных коэффициентов
+
+    При новых типах файл продукции применяется заново (как для материалов).
+    """
+    frame = pd.DataFrame({
+        'name': df['Тип продукции'].astype(str).str.strip(),
+        'coefficient': _float_column(df['Коэффициент типа продукции']),
+    }).drop_duplicates('name', keep='last')
+    existing = dict(conn.execute(select(ProductType.name, ProductType.coefficient)).all())
+    new = frame[~frame['name'].isin(existing)]
+    changed = frame[frame['name'].isin(existing) & (frame['name'].map(existing) != frame['coefficient'])]
+    if len(new):
+        conn.execute(insert(ProductType.__table__), new.to_dict('records'))
+    if len(changed):
+        conn.execute(
+            update(ProductType.__table__)
+            .where(ProductType.name == bindparam('b_name'))
+            .values(coefficient=bindparam('b_coefficient')),
+            [{'b_name': n, 'b_coefficient': c} for n, c in zip(changed['name'], changed['coefficient'])]
+        )
+    logger.info(f"Типов продукции: новых {len(new)}, изменено {len(changed)}")
+    return {PRODUCTS_FILE} if len(new) else set()
+
+
+def _sync_materials(conn, df: pd.DataFrame) -> set:
+    """Применение изменений файла материалов"""
+    frame = _material_frame(df, _type_ids(conn, MaterialType))
+    file_keys = set(df['Наименование материала'].astype(str).str.strip())
+    inserted, updated, deleted = _sync_rows(conn, 'materials', Material.__table__, 'name', frame, file_keys,
+                                            MATERIAL_UPDATE_COLUMNS, 'material_id')
+    logger.info(f"Материалы: новых {inserted}, изменено {updated}, удалено {deleted}")
+    # Новые материалы могут быть нужны связям из неизменного файла
+    return {MATERIAL_PRODUCTS_FILE} if inserted else set()
+
+
+def _sync_products(conn, df: pd.DataFrame) -> set:
+    """Применение изменений файла продукции"""
+    frame = _product_frame(df, _type_ids(conn, ProductType))
+    file_keys = set(df['Артикул'].astype(str).str.strip())
+    names_before = dict(conn.execute(select(Product.article, Product.name)).all())
+    inserted, updated, deleted = _sync_rows(conn, 'products', Product.__table__, 'article', frame, file_keys,
+                                            PRODUCT_UPDATE_COLUMNS, 'product_id')
+    logger.info(f"Продукция: новых {inserted}, изменено {updated}, удалено {deleted}")
+    # Связи сопоставляются по наименованию продукции, поэтому важны и переименования
+    renamed = any(names_before.get(a, n) != n for a, n in zip(frame['article'], frame['name']))
+    return {MATERIAL_PRODUCTS_FILE} if inserted or renamed else set()
+
+
+def _sync_relations(conn, df: pd.DataFrame) -> set:
+    """Полная замена связей (набором SQL-операций через временную таблицу)"""
+    total, invalid, unmatched, inserted = _replace_relations(conn, [df])
+    if invalid:
+        logger.warning(f"Пропущено строк с некорректным количеством материала: {invalid}")
+    _print_unmatched(unmatched)
+    logger.info(f"Загружено связей материалов с продукцией: {inserted} из {total}")
+    return set()
+
+
+# Этапы в порядке зависимостей: (файл, функция применения); функция возвращает
+# файлы следующих этапов, которые нужно применить заново, даже если они не изменились
+_STAGES = (
+    (MATERIAL_TYPES_FILE, _sync_material_types),
+    (PRODUCT_TYPES_FILE, _sync_product_types),
+    (MATERIALS_FILE, _sync_materials),
+    (PRODUCTS_FILE, _sync_products),
+    (MATERIAL_PRODUCTS_FILE, _sync_relations),
+)
+
+
+def incremental_import(db: Database = None):
+    """Инкрементальная загрузка данных из Excel-файлов
+
+    Неизменные файлы (по SHA-256 содержимого) пропускаются целиком, в
+    остальных применяются только новые, измененные и удаленные строки
+    (по отпечатку строки, ключ - наименование материала или артикул).
+    Неизменный файл применяется заново, если от предыдущих этапов зависят
+    его строки: материалы и продукция - при новых типах (строки с
+    неизвестным типом раньше пропускались), связи - при новых материалах
+    или продукции, которые могли не сопоставиться раньше.
+    """
+    db = db or Database(config="incremental_import")
+    db.create_tables()
+    with db.get_session() as session:
+        stored = dict(session.query(ImportFile.path, ImportFile.content_hash).all())
+
+    reapply = set()
+    for file_path, apply in _STAGES:
+        if not os.path.exists(file_path):
+            logger.warning(f"Файл {file_path} не найден!")
+            continue
+        digest = file_hash(file_path)
+        if stored.get(file_path) == digest and file_path not in reapply:
+            logger.info(f"Файл {file_path} не изменился, пропуск")
+            continue
+        try:
+            df = _read_sheet(file_path)
+            with db.engine.begin() as conn:
+                reapply |= apply(conn, df)
+                stmt = sqlite_insert(ImportFile.__table__).values(path=file_path, content_hash=digest)
+                conn.execute(stmt.on_conflict_do_update(index_elements=['path'],
+                                                        set_={'content_hash': digest}))
+        except Exception as e:
+            logger.exception(f"Ошибка при инкрементальной загрузке {file_path}: {e}")
+    logger.info("Инкрементальная загрузка завершена!")
+
+
+if __name__ == "__main__":
+    incremental_import()
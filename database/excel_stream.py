@@ -0,0 +1,37 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+# Размер блока строк при потоковом чтении
+CHUNK_SIZE = 10000
+
+
+def read_excel_chunks(file_path: str, chunk_size: int = CHUNK_SIZE):
+    """Потоковое чтение первого листа Excel блоками DataFrame
+
+    Файл читается через openpyxl в режиме read_only, поэтому в памяти
+    находится только текущий блок строк независимо от размера файла.
+    Заголовки столбцов совпадают с теми, что дает pd.read_excel.
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [name if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        width = len(columns)
+
+        chunk = []
+        for row in rows:
+            # Пустые строки pd.read_excel тоже не возвращает
+            if all(value is None for value in row):
+                continue
+            row = tuple(row[:width]) + (None,) * (width - len(row))
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield pd.DataFrame(chunk, columns=columns)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns)
+    finally:
+        workbook.close()
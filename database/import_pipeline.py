@@ -0,0 +1,88 @@
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from graphlib import TopologicalSorter
+
+import pandas as pd
+
+from .database import Database
+from .sheet_cache import read_excel_cached
+from .load_data import (
+    MATERIAL_TYPES_FILE, MATERIALS_FILE, PRODUCT_TYPES_FILE, PRODUCTS_FILE, MATERIAL_PRODUCTS_FILE,
+    load_material_types, load_materials_bulk, load_product_types, load_products_bulk,
+    load_material_product_relations_staged
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ImportStage:
+    """Этап импорта: файл, функция загрузки и этапы, от которых он зависит"""
+
+    def __init__(self, name: str, file_path: str, loader, depends_on=(), title: str = None):
+        self.name = name
+        self.file_path = file_path
+        self.loader = loader  # loader(db, file_path, df=...)
+        self.depends_on = tuple(depends_on)
+        self.title = title or name
+
+
+def default_stages():
+    """Стандартный граф импорта: типы -> материалы и продукция -> связи"""
+    return [
+        ImportStage("material_types", MATERIAL_TYPES_FILE, load_material_types,
+                    title="типов материалов"),
+        ImportStage("product_types", PRODUCT_TYPES_FILE, load_product_types,
+                    title="типов продукции"),
+        ImportStage("materials", MATERIALS_FILE, load_materials_bulk,
+                    depends_on=("material_types",), title="материалов"),
+        ImportStage("products", PRODUCTS_FILE, load_products_bulk,
+                    depends_on=("product_types",), title="продукции"),
+        ImportStage("material_product", MATERIAL_PRODUCTS_FILE, load_material_product_relations_staged,
+                    depends_on=("materials", "products"), title="связей материалов с продукцией"),
+    ]
+
+
+def _parse_workbook(file_path: str) -> pd.DataFrame:
+    """Разбор Excel-файла в отдельном процессе"""
+    return read_excel_cached(file_path)
+
+
+def run_stages(db: Database, stages, max_workers: int = None):
+    """Параллельный разбор файлов и последовательная запись в порядке зависимостей
+
+    Все файлы разбираются одновременно в пуле процессов, а загрузчики
+    вызываются в текущем процессе через одно подключение db, как только
+    готов файл этапа и применены все этапы, от которых он зависит.
+    """
+    stages_by_name = {stage.name: stage for stage in stages}
+    graph = {stage.name: stage.depends_on for stage in stages}
+    sorter = TopologicalSorter(graph)
+    sorter.prepare()  # CycleError при циклических зависимостях
+
+    existing = [stage for stage in stages if os.path.exists(stage.file_path)]
+    workers = max_workers or min(len(existing), os.cpu_count() or 1) or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {stage.name: pool.submit(_parse_workbook, stage.file_path) for stage in existing}
+        ready = set()
+        while sorter.is_active():
+            ready.update(sorter.get_ready())
+            # Применяем первый этап, чей файл уже разобран
+            done = [name for name in ready if name not in futures or futures[name].done()]
+            if not done:
+                wait([futures[name] for name in ready], return_when=FIRST_COMPLETED)
+                continue
+            for name in done:
+                stage = stages_by_name[name]
+                if name in futures:
+                    logger.info(f"Загрузка {stage.title}...")
+                    try:
+                        df = futures[name].result()
+                    except Exception as e:
+                        logger.error(f"Ошибка при чтении файла {stage.file_path}: {e}")
+                    else:
+                        stage.loader(db, stage.file_path, df=df)
+                else:
+                    logger.warning(f"Файл {stage.file_path} не найден!")
+                ready.discard(name)
+                sorter.done(name)
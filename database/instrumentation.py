@@ -0,0 +1,266 @@
+"""Профилирование: число SQL-запросов, строк и время по областям
+
+Область - метод сервиса или действие интерфейса. Запросы считаются через
+события движка SQLAlchemy (before/after_cursor_execute) и относятся ко всем
+областям, открытым в момент выполнения (вложенные области входят во
+внешние). Стек областей хранится в contextvars, поэтому корректен в потоках,
+задачах asyncio и greenlet асинхронного слоя.
+
+Профилирование по умолчанию выключено (enabled=False) и тогда почти ничего
+не стоит; подробный журнал (каждый запрос, каждая строка импорта) пишется
+только на уровне DEBUG.
+"""
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Поля счетчика области или запроса
+CALLS, SECONDS, STATEMENTS, ROWS, SQL_SECONDS = range(5)
+
+# Служебные области: весь сеанс и запросы вне областей
+SESSION = "(сеанс)"
+UNSCOPED = "(вне областей)"
+
+ScopeProfile = namedtuple('ScopeProfile', ['name', 'calls', 'seconds', 'statements', 'rows', 'sql_seconds'])
+StatementProfile = namedtuple('StatementProfile', ['statement', 'executions', 'rows', 'sql_seconds'])
+
+_scopes = contextvars.ContextVar("instrumentation_scopes", default=())
+
+
+def _new_record():
+    return [0, 0.0, 0, 0, 0.0]
+
+
+def _row_counter(clock, records):
+    """row_factory курсора sqlite3: считает выбранные строки и время их выборки
+
+    clock - [время предыдущего события запроса]; SQLite выполняет запрос по
+    мере чтения строк, поэтому время до каждой строки тоже время запроса.
+    """
+    def count(cursor, row):
+        now = time.perf_counter()
+        elapsed, clock[0] = now - clock[0], now
+        for record in records:
+            record[ROWS] += 1
+            record[SQL_SECONDS] += elapsed
+        return row
+    return count
+
+
+class Instrumentation:
+    """Счетчики запросов и времени одного движка
+
+    Счетчики каждого потока хранятся отдельно (увеличиваются без
+    блокировок) и суммируются при построении отчета. Время запроса - от
+    execute до чтения последней строки (строки считаются только для
+    драйвера sqlite3, для остальных - только execute).
+    """
+    # Запросы дольше этого времени пишутся в журнал с уровнем WARNING, мс
+    SLOW_QUERY_MS = 100.0
+    # Сколько самых долгих запросов выводится в отчете
+    TOP_STATEMENTS = 15
+
+    def __init__(self, engine=None, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tables = []  # (области, запросы) каждого потока
+        self.started = time.perf_counter()
+        if engine is not None:
+            self.attach(engine)
+
+    def attach(self, engine):
+        """Подписка на события выполнения запросов движка"""
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+        event.listen(engine, "handle_error", self._on_error)
+
+    def reset(self):
+        """Обнуление счетчиков и начало нового сеанса"""
+        with self._lock:
+            for scopes, statements in self._tables:
+                scopes.clear()
+                statements.clear()
+            self.started = time.perf_counter()
+
+    def _thread_tables(self):
+        tables = getattr(self._local, "tables", None)
+        if tables is None:
+            tables = self._local.tables = ({}, {})
+            with self._lock:
+                self._tables.append(tables)
+        return tables
+
+    @staticmethod
+    def _record(table: dict, name: str) -> list:
+        record = table.get(name)
+        if record is None:
+            record = table[name] = _new_record()
+        return record
+
+    @contextlib.contextmanager
+    def scope(self, name: str):
+        """Область профиля: время, число вызовов и запросы внутри блока with"""
+        if not self.enabled:
+            yield
+            return
+        outer = _scopes.get()
+        token = _scopes.set(outer + (name,))
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _scopes.reset(token)
+            record = self._record(self._thread_tables()[0], name)
+            record[CALLS] += 1
+            # При рекурсивном вызове время уже учитывается внешним вызовом
+            if name not in outer:
+                record[SECONDS] += elapsed
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%s: %.2f мс", name, elapsed * 1000)
+
+    def wrap(self, name: str, func):
+        """Функция, выполняющая func в области name (например, для фонового потока)"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.scope(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not self.enabled:
+            return
+        scopes, statements = self._thread_tables()
+        names = set(_scopes.get()) or {UNSCOPED}
+        records = [self._record(scopes, name) for name in names]
+        records.append(self._record(scopes, SESSION))
+        records.append(self._record(statements, statement))
+        clock = [0.0]
+        # Строки SELECT считаются при чтении результата (только драйвер sqlite3)
+        if isinstance(cursor, sqlite3.Cursor):
+            cursor.row_factory = _row_counter(clock, records)
+        conn.info.setdefault("instrumentation", []).append((clock, records))
+        clock[0] = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        pending = conn.info.get("instrumentation")
+        if not pending:
+            return
+        clock, records = pending.pop()
+        now = time.perf_counter()
+        elapsed, clock[0] = now - clock[0], now
+        # Для INSERT/UPDATE/DELETE строки - число измененных
+        affected = cursor.rowcount if cursor.description is None and cursor.rowcount > 0 else 0
+        for record in records:
+            record[STATEMENTS] += 1
+            record[ROWS] += affected
+            record[SQL_SECONDS] += elapsed
+        if elapsed * 1000 >= self.SLOW_QUERY_MS:
+            logger.warning("Медленный запрос (%.1f мс): %s", elapsed * 1000, statement)
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Запрос (%.2f мс): %s", elapsed * 1000, statement)
+
+    def _on_error(self, exception_context):
+        connection = exception_context.connection
+        pending = connection.info.get("instrumentation") if connection is not None else None
+        if pending:
+            pending.pop()
+
+    def _merged(self, index: int) -> dict:
+        with self._lock:
+            tables = [tables[index] for tables in self._tables]
+        merged = {}
+        for table in tables:
+            for name, record in list(table.items()):
+                total = merged.setdefault(name, _new_record())
+                for field, value in enumerate(record):
+                    total[field] += value
+        return merged
+
+    def scopes(self) -> list:
+        """Профиль по областям (ScopeProfile), по убыванию времени"""
+        merged = self._merged(0)
+        session = merged.setdefault(SESSION, _new_record())
+        session[CALLS], session[SECONDS] = 1, time.perf_counter() - self.started
+        profiles = [ScopeProfile(name, *record) for name, record in merged.items()]
+        return sorted(profiles, key=lambda p: (p.seconds, p.sql_seconds), reverse=True)
+
+    def statements(self, limit: int = None) -> list:
+        """Самые долгие запросы (StatementProfile), по убыванию суммарного времени"""
+        profiles = [StatementProfile(statement, record[STATEMENTS], record[ROWS], record[SQL_SECONDS])
+                    for statement, record in self._merged(1).items()]
+        profiles.sort(key=lambda p: p.sql_seconds, reverse=True)
+        return profiles[:limit or self.TOP_STATEMENTS]
+
+    def report(self) -> dict:
+        """Отчет сеанса в виде словаря (для JSON)"""
+        return {
+            "seconds": time.perf_counter() - self.started,
+            "scopes": [profile._asdict() for profile in self.scopes()],
+            "statements": [profile._asdict() for profile in self.statements()],
+        }
+
+    def format_report(self) -> str:
+        """Отчет сеанса в виде текстовых таблиц"""
+        scopes = self.scopes()
+        session = next(p.seconds for p in scopes if p.name == SESSION)
+        lines = [f"Профиль сеанса: {session:.2f} с",
+                 f"{'область':<55} {'вызовов':>8} {'всего, мс':>11} {'среднее, мс':>12} {'доля':>6} "
+                 f"{'запросов':>9} {'строк':>9} {'SQL, мс':>10}"]
+        for p in scopes:
+            average = p.seconds / p.calls * 1000 if p.calls else 0.0
+            share = p.seconds / session * 100 if session else 0.0
+            lines.append(f"{p.name[:55]:<55} {p.calls:>8} {p.seconds * 1000:>11.1f} {average:>12.2f} "
+                         f"{share:>5.1f}% {p.statements:>9} {p.rows:>9} {p.sql_seconds * 1000:>10.1f}")
+        lines += ["", "Самые долгие запросы:", f"{'SQL, мс':>10} {'раз':>7} {'строк':>9}  запрос"]
+        for p in self.statements():
+            statement = " ".join(p.statement.split())
+            lines.append(f"{p.sql_seconds * 1000:>10.1f} {p.executions:>7} {p.rows:>9}  {statement[:120]}")
+        return "\n".join(lines)
+
+    def export(self, path: str):
+        """Запись отчета в файл: JSON для .json, иначе текст"""
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                json.dump(self.report(), f, ensure_ascii=False, indent=2)
+            else:
+                f.write(self.format_report() + "\n")
+
+
+def profiled(name: str):
+    """Декоратор метода: вызов выполняется в области name профиля self.instrumentation"""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            instrumentation = self.instrumentation
+            if not instrumentation.enabled:
+                return method(self, *args, **kwargs)
+            with instrumentation.scope(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def profile_methods(cls):
+    """Декоратор класса: каждый открытый метод - область <Класс>.<метод>"""
+    for name, value in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.isfunction(value):
+            setattr(cls, name, profiled(f"{cls.__name__}.{name}")(value))
+    return cls
+
+
+def configure_logging(level="WARNING"):
+    """Настройка журнала приложения (уровень - имя, например "DEBUG", или число)"""
+    logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
@@ -1,17 +1,38 @@
+import logging
 import os
+import time
 
 import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from .database import Database
+from .excel_stream import CHUNK_SIZE, read_excel_chunks
 from .models import MaterialType, Material, ProductType, Product, material_product
+from .requirements import suspended_requirements
+from .sheet_cache import read_excel_cached
 
+logger = logging.getLogger(__name__)
 
-def load_material_types(db: Database, file_path: str):
+# Пути к файлам
+MATERIAL_TYPES_FILE = "resources/Material_type_import.xlsx"
+MATERIALS_FILE = "resources/Materials_import.xlsx"
+PRODUCT_TYPES_FILE = "resources/Product_type_import.xlsx"
+PRODUCTS_FILE = "resources/Products_import.xlsx"
+MATERIAL_PRODUCTS_FILE = "resources/Material_products__import.xlsx"
+
+
+def _read_sheet(file_path: str) -> pd.DataFrame:
+    """Чтение листа Excel в DataFrame (через кэш разобранных файлов)"""
+    logger.info(f"Чтение файла {file_path}...")
+    return read_excel_cached(file_path)
+
+
+def load_material_types(db: Database, file_path: str, df: pd.DataFrame = None):
     """Загрузка типов материалов из Excel"""
     try:
-        print(f"Чтение файла {file_path}...")
-        df = pd.read_excel(file_path)
-        print(f"Столбцы в файле: {df.columns.tolist()}")
+        df = _read_sheet(file_path) if df is None else df
+        logger.debug(f"Столбцы в файле: {df.columns.tolist()}")
         with db.get_session() as session:
             for _, row in df.iterrows():
                 material_type = MaterialType(
@@ -19,24 +40,21 @@ def load_material_types(db: Database, file_path: str):
                 )
                 session.merge(material_type)
             session.commit()
-        print(f"Загружено типов материалов: {len(df)}")
+        logger.info(f"Загружено типов материалов: {len(df)}")
     except Exception as e:
-        print(f"Ошибка при загрузке типов материалов: {e}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Ошибка при загрузке типов материалов: {e}")
 
 
-def load_materials(db: Database, file_path: str):
+def load_materials(db: Database, file_path: str, df: pd.DataFrame = None):
     """Загрузка материалов из Excel"""
     try:
-        print(f"Чтение файла {file_path}...")
-        df = pd.read_excel(file_path)
-        print(f"Столбцы в файле: {df.columns.tolist()}")
+        df = _read_sheet(file_path) if df is None else df
+        logger.debug(f"Столбцы в файле: {df.columns.tolist()}")
         with db.get_session() as session:
             for _, row in df.iterrows():
                 material_type = session.query(MaterialType).filter_by(name=str(row['Тип материала']).strip()).first()
                 if not material_type:
-                    print(f"Тип материала '{row['Тип материала']}' не найден!")
+                    logger.warning(f"Тип материала '{row['Тип материала']}' не найден!")
                     continue
                 material_name = str(row['Наименование материала']).strip()
                 material = session.query(Material).filter_by(name=material_name).first()
@@ -71,19 +89,16 @@ def load_materials(db: Database, file_path: str):
                     )
                     session.add(material)
             session.commit()
-        print(f"Загружено материалов: {len(df)}")
+        logger.info(f"Загружено материалов: {len(df)}")
     except Exception as e:
-        print(f"Ошибка при загрузке материалов: {e}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Ошибка при загрузке материалов: {e}")
 
 
-def load_product_types(db: Database, file_path: str):
+def load_product_types(db: Database, file_path: str, df: pd.DataFrame = None):
     """Загрузка типов продукции из Excel"""
     try:
-        print(f"Чтение файла {file_path}...")
-        df = pd.read_excel(file_path)
-        print(f"Столбцы в файле: {df.columns.tolist()}")
+        df = _read_sheet(file_path) if df is None else df
+        logger.debug(f"Столбцы в файле: {df.columns.tolist()}")
         with db.get_session() as session:
             for _, row in df.iterrows():
                 product_type = ProductType(
@@ -93,24 +108,21 @@ def load_product_types(db: Database, file_path: str):
                 )
                 session.merge(product_type)
             session.commit()
-        print(f"Загружено типов продукции: {len(df)}")
+        logger.info(f"Загружено типов продукции: {len(df)}")
     except Exception as e:
-        print(f"Ошибка при загрузке типов продукции: {e}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Ошибка при загрузке типов продукции: {e}")
 
 
-def load_products(db: Database, file_path: str):
+def load_products(db: Database, file_path: str, df: pd.DataFrame = None):
     """Загрузка продукции из Excel"""
     try:
-        print(f"Чтение файла {file_path}...")
-        df = pd.read_excel(file_path)
-        print(f"Столбцы в файле: {df.columns.tolist()}")
+        df = _read_sheet(file_path) if df is None else df
+        logger.debug(f"Столбцы в файле: {df.columns.tolist()}")
         with db.get_session() as session:
             for _, row in df.iterrows():
                 product_type = session.query(ProductType).filter_by(name=str(row['Тип продукции']).strip()).first()
                 if not product_type:
-                    print(f"Тип продукции '{row['Тип продукции']}' не найден!")
+                    logger.warning(f"Тип продукции '{row['Тип продукции']}' не найден!")
                     continue
                 product_article = str(row['Артикул']).strip()
                 product = session.query(Product).filter_by(article=product_article).first()
@@ -133,21 +145,130 @@ def load_products(db: Database, file_path: str):
                     )
                     session.add(product)
             session.commit()
-        print(f"Загружено продукции: {len(df)}")
+        logger.info(f"Загружено продукции: {len(df)}")
     except Exception as e:
-        print(f"Ошибка при загрузке продукции: {e}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Ошибка при загрузке продукции: {e}")
+
+
+def _float_column(series: pd.Series) -> pd.Series:
+    """Разбор числового столбца целиком: запятая как разделитель, пропуски -> None"""
+    if not pd.api.types.is_numeric_dtype(series):
+        values = series.astype(str).str.replace(',', '.', regex=False)
+        series = pd.to_numeric(values.where(series.notna()), errors='raise')
+    series = series.astype(float)
+    return series.astype(object).where(series.notna(), None)
+
+
+def _str_column(series: pd.Series) -> pd.Series:
+    """Приведение столбца к строкам без пробелов по краям, пропуски -> None"""
+    values = series.astype(str).str.strip()
+    return values.astype(object).where(series.notna(), None)
+
+
+def _type_ids(conn, type_model) -> dict:
+    """Словарь имя типа -> id (при дублях берется первый, как в filter_by().first())"""
+    type_ids = {}
+    for type_id, name in conn.execute(select(type_model.id, type_model.name).order_by(type_model.id)):
+        type_ids.setdefault(name, type_id)
+    return type_ids
+
+
+def _resolve_types(names: pd.Series, type_ids: dict, label: str) -> pd.Series:
+    """Сопоставление имен типов с id; строки с неизвестным типом отбрасываются"""
+    ids = names.map(type_ids)
+    missing = names[ids.isna()]
+    for name, count in missing.value_counts(sort=False).items():
+        logger.warning(f"{label} '{name}' не найден! Пропущено строк: {count}")
+    return ids
+
+
+def _upsert(conn, table, key: str, records: list, update_columns: tuple):
+    """Множественная вставка с ON CONFLICT DO UPDATE по уникальному ключу"""
+    if not records:
+        return
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={column: stmt.excluded[column] for column in update_columns}
+    )
+    conn.execute(stmt, records)
 
 
-def load_material_product_relations(db: Database, file_path: str):
+# Столбцы, обновляемые при upsert
+MATERIAL_UPDATE_COLUMNS = ('type_id', 'price', 'unit', 'package_quantity', 'stock_quantity', 'min_quantity')
+PRODUCT_UPDATE_COLUMNS = ('name', 'type_id', 'min_partner_price')
+
+
+def _material_frame(df: pd.DataFrame, type_ids: dict) -> pd.DataFrame:
+    """Нормализованные строки материалов для пакетного upsert"""
+    type_column = df['Тип материала'].astype(str).str.strip()
+    frame = pd.DataFrame({
+        'name': df['Наименование материала'].astype(str).str.strip(),
+        'type_id': _resolve_types(type_column, type_ids, 'Тип материала'),
+        'price': _float_column(df['Цена единицы материала']),
+        'unit': _str_column(df['Единица измерения']),
+        'package_quantity': _float_column(df['Количество в упаковке']),
+        'stock_quantity': _float_column(df['Количество на складе']),
+        'min_quantity': _float_column(df['Минимальное количество']),
+    })
+    frame = frame[frame['type_id'].notna()]
+    frame['type_id'] = frame['type_id'].astype(int).astype(object)
+    return frame
+
+
+def _product_frame(df: pd.DataFrame, type_ids: dict) -> pd.DataFrame:
+    """Нормализованные строки продукции для пакетного upsert"""
+    type_column = df['Тип продукции'].astype(str).str.strip()
+    frame = pd.DataFrame({
+        'name': df['Наименование продукции'].astype(str).str.strip(),
+        'article': df['Артикул'].astype(str).str.strip(),
+        'type_id': _resolve_types(type_column, type_ids, 'Тип продукции'),
+        'min_partner_price': _float_column(df['Минимальная стоимость для партнера']),
+    })
+    frame = frame[frame['type_id'].notna()]
+    frame['type_id'] = frame['type_id'].astype(int).astype(object)
+    return frame
+
+
+def load_materials_bulk(db: Database, file_path: str, df: pd.DataFrame = None):
+    """Пакетная загрузка материалов из Excel (векторный разбор и upsert по name)"""
+    try:
+        df = _read_sheet(file_path) if df is None else df
+        logger.debug(f"Столбцы в файле: {df.columns.tolist()}")
+        start = time.perf_counter()
+        with db.engine.begin() as conn:
+            records = _material_frame(df, _type_ids(conn, MaterialType)).to_dict('records')
+            _upsert(conn, Material.__table__, 'name', records, MATERIAL_UPDATE_COLUMNS)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Загружено материалов: {len(records)} за {elapsed:.2f} с "
+                    f"({len(df) / max(elapsed, 1e-9):.0f} строк/с)")
+    except Exception as e:
+        logger.exception(f"Ошибка при загрузке материалов: {e}")
+
+
+def load_products_bulk(db: Database, file_path: str, df: pd.DataFrame = None):
+    """Пакетная загрузка продукции из Excel (векторный разбор и upsert по article)"""
+    try:
+        df = _read_sheet(file_path) if df is None else df
+        logger.debug(f"Столбцы в файле: {df.columns.tolist()}")
+        start = time.perf_counter()
+        with db.engine.begin() as conn:
+            records = _product_frame(df, _type_ids(conn, ProductType)).to_dict('records')
+            _upsert(conn, Product.__table__, 'article', records, PRODUCT_UPDATE_COLUMNS)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Загружено продукции: {len(records)} за {elapsed:.2f} с "
+                    f"({len(df) / max(elapsed, 1e-9):.0f} строк/с)")
+    except Exception as e:
+        logger.exception(f"Ошибка при загрузке продукции: {e}")
+
+
+def load_material_product_relations(db: Database, file_path: str, df: pd.DataFrame = None):
     """Загрузка связей между материалами и продукцией из Excel"""
     try:
-        print(f"Чтение файла {file_path}...")
-        df = pd.read_excel(file_path)
-        # Удаляем пробелы и приводим к нижнему регистру заголовки
-        df.columns = [col.strip().lower() for col in df.columns]
-        print(f"Столбцы в файле: {df.columns.tolist()}")
+        df = _read_sheet(file_path) if df is None else df
+        # Удаляем пробелы и приводим к нижнему регистру заголовки (в копии: кадр может быть общим)
+        df = df.rename(columns=lambda col: col.strip().lower())
+        logger.debug(f"Столбцы в файле: {df.columns.tolist()}")
 
         with db.get_session() as session:
             # Очищаем существующие связи
@@ -167,21 +288,21 @@ def load_material_product_relations(db: Database, file_path: str):
                 material_name = str(row['наименование материала']).strip().lower()
                 material = material_dict.get(material_name)
                 if not material:
-                    print(f"Материал '{material_name}' не найден!")
+                    logger.warning(f"Материал '{material_name}' не найден!")
                     continue
 
                 # Найти продукт по наименованию (без учета регистра и пробелов)
                 product_name = str(row['продукция']).strip().lower()
                 product = product_dict.get(product_name)
                 if not product:
-                    print(f"Продукция '{product_name}' не найдена!")
+                    logger.warning(f"Продукция '{product_name}' не найдена!")
                     continue
 
                 # Получаем количество материала
                 try:
                     quantity = float(str(row['необходимое количество материала']).replace(',', '.'))
                 except (ValueError, TypeError):
-                    print(f"Некорректное количество материала для связи {material_name} - {product_name}")
+                    logger.warning(f"Некорректное количество материала для связи {material_name} - {product_name}")
                     continue
 
                 # Добавляем связь
@@ -193,60 +314,211 @@ def load_material_product_relations(db: Database, file_path: str):
                             quantity=quantity
                         )
                     )
-                    print(f"Добавлена связь: {material.name} - {product.name} ({quantity})")
+                    logger.debug("Добавлена связь: %s - %s (%s)", material.name, product.name, quantity)
                 except Exception as e:
-                    print(f"Ошибка при добавлении связи {material_name} - {product_name}: {e}")
+                    logger.error(f"Ошибка при добавлении связи {material_name} - {product_name}: {e}")
 
             session.commit()
-            print(f"Загружено связей материалов с продукцией: {len(df)}")
+            logger.info(f"Загружено связей материалов с продукцией: {len(df)}")
 
             # Проверяем загруженные связи
             total_relations = session.query(material_product).count()
-            print(f"Всего связей в базе данных: {total_relations}")
+            logger.info(f"Всего связей в базе данных: {total_relations}")
+
+    except Exception as e:
+        logger.exception(f"Ошибка при загрузке связей: {e}")
+
+
+def _relation_quantities(series: pd.Series):
+    """Разбор количества материала; возвращает значения и маску некорректных строк"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float), pd.Series(False, index=series.index)
+    values = series.astype(str).str.strip().str.replace(',', '.', regex=False)
+    parsed = pd.to_numeric(values, errors='coerce')
+    # float('nan') в исходном загрузчике проходит, поэтому пустые ячейки не считаются ошибкой
+    invalid = parsed.isna() & series.notna() & (values.str.lower() != 'nan')
+    return parsed, invalid
+
+
+def _print_unmatched(rows):
+    """Вывод сводной таблицы не найденных наименований"""
+    if not rows:
+        return
+    width = max(len(name) for _, name, _ in rows)
+    lines = ["Не найдены наименования:", f"{'Сущность':<10} | {'Наименование':<{width}} | Строк"]
+    lines += [f"{kind:<10} | {name:<{width}} | {count}" for kind, name, count in rows]
+    logger.warning("\n".join(lines))
+
+
+def _stage_relations(conn, df: pd.DataFrame) -> int:
+    """Запись блока строк связей во временную таблицу; возвращает число некорректных строк"""
+    # Удаляем пробелы и приводим к нижнему регистру заголовки (в копии: кадр может быть общим)
+    df = df.rename(columns=lambda col: col.strip().lower())
+    quantities, invalid = _relation_quantities(df['необходимое количество материала'])
+    stage = pd.DataFrame({
+        'material_key': df['наименование материала'].astype(str).str.strip().str.lower(),
+        'product_key': df['продукция'].astype(str).str.strip().str.lower(),
+        'quantity': quantities.astype(object).where(quantities.notna(), None),
+    })[~invalid]
+    if len(stage):
+        conn.exec_driver_sql(
+            "INSERT INTO material_product_stage (material_key, product_key, quantity) VALUES (?, ?, ?)",
+            list(stage.itertuples(index=False, name=None))
+        )
+    return int(invalid.sum())
+
+
+def _replace_relations(conn, frames):
+    """Замена содержимого material_product строками из блоков frames
+
+    Выполняется внутри транзакции conn; возвращает (всего строк,
+    некорректных строк, не найденные наименования, вставлено связей).
+    """
+    total = invalid = 0
+    conn.exec_driver_sql(
+        "CREATE TEMP TABLE material_product_stage "
+        "(row_no INTEGER PRIMARY KEY, material_key TEXT, product_key TEXT, quantity FLOAT)"
+    )
+    conn.exec_driver_sql("CREATE TEMP TABLE material_keys (key TEXT PRIMARY KEY, id INTEGER)")
+    conn.exec_driver_sql("CREATE TEMP TABLE product_keys (key TEXT PRIMARY KEY, id INTEGER)")
+    try:
+        for frame in frames:
+            invalid += _stage_relations(conn, frame)
+            total += len(frame)
+        # При совпадении нормализованных имен выигрывает последняя запись, как в словаре
+        conn.exec_driver_sql(
+            "INSERT OR REPLACE INTO material_keys SELECT norm_name(name), id FROM materials ORDER BY id"
+        )
+        conn.exec_driver_sql(
+            "INSERT OR REPLACE INTO product_keys SELECT norm_name(name), id FROM products ORDER BY id"
+        )
+
+        unmatched = conn.exec_driver_sql(
+            "SELECT 'Материал', s.material_key, COUNT(*) FROM material_product_stage s "
+            "LEFT JOIN material_keys mk ON mk.key = s.material_key "
+            "WHERE mk.id IS NULL GROUP BY s.material_key "
+            "UNION ALL "
+            "SELECT 'Продукция', s.product_key, COUNT(*) FROM material_product_stage s "
+            "LEFT JOIN product_keys pk ON pk.key = s.product_key "
+            "WHERE pk.id IS NULL GROUP BY s.product_key"
+        ).fetchall()
+
+        # Удаление и вставка в одной транзакции: читатели видят либо старые связи, либо новые.
+        # Построчные триггеры потребности заменяются одним пересчетом в конце
+        with suspended_requirements(conn, "material_product"):
+            conn.exec_driver_sql("DELETE FROM material_product")
+            # Из повторных пар материал-продукция остается первая, как в построчной загрузке
+            inserted = conn.exec_driver_sql(
+                "INSERT OR IGNORE INTO material_product (material_id, product_id, quantity) "
+                "SELECT mk.id, pk.id, s.quantity FROM material_product_stage s "
+                "JOIN material_keys mk ON mk.key = s.material_key "
+                "JOIN product_keys pk ON pk.key = s.product_key "
+                "ORDER BY s.row_no"
+            ).rowcount
+    finally:
+        conn.exec_driver_sql("DROP TABLE temp.material_product_stage")
+        conn.exec_driver_sql("DROP TABLE temp.material_keys")
+        conn.exec_driver_sql("DROP TABLE temp.product_keys")
+    return total, invalid, unmatched, inserted
+
+
+def load_material_product_relations_staged(db: Database, file_path: str, df: pd.DataFrame = None,
+                                           chunk_size: int = None):
+    """Загрузка связей через временную таблицу с заменой material_product в одной транзакции
+
+    При заданном chunk_size файл читается потоково блоками по chunk_size строк.
+    """
+    try:
+        if chunk_size:
+            logger.info(f"Потоковое чтение файла {file_path}...")
+            frames = read_excel_chunks(file_path, chunk_size)
+        else:
+            frames = [_read_sheet(file_path) if df is None else df]
+        start = time.perf_counter()
+        with db.engine.begin() as conn:
+            total, invalid, unmatched, inserted = _replace_relations(conn, frames)
+        elapsed = time.perf_counter() - start
+
+        if invalid:
+            logger.warning(f"Пропущено строк с некорректным количеством материала: {invalid}")
+        _print_unmatched(unmatched)
+        logger.info(f"Загружено связей материалов с продукцией: {inserted} из {total} за {elapsed:.2f} с")
 
     except Exception as e:
-        print(f"Ошибка при загрузке связей: {e}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception(f"Ошибка при загрузке связей: {e}")
+
+
+# Загрузчики, которые можно вызывать для частей файла (добавление/обновление строк)
+STREAMING_LOADERS = (load_materials, load_materials_bulk, load_products, load_products_bulk)
+
+
+def load_streaming(db: Database, file_path: str, loader, chunk_size: int = CHUNK_SIZE):
+    """Потоковая загрузка большого файла блоками фиксированного размера
+
+    loader - загрузчик с добавлением/обновлением строк (load_materials,
+    load_materials_bulk, load_products, load_products_bulk); каждый блок
+    фиксируется отдельно, поэтому память не растет с размером файла.
+    Загрузчики связей при каждом вызове заменяют все связи (осталась бы
+    только последняя часть файла), поэтому для них вызывается
+    load_material_product_relations_staged(chunk_size=...): все блоки
+    заменяют связи одной транзакцией. Для других загрузчиков - ValueError.
+    """
+    if loader in (load_material_product_relations, load_material_product_relations_staged):
+        load_material_product_relations_staged(db, file_path, chunk_size=chunk_size)
+        return
+    if loader not in STREAMING_LOADERS:
+        raise ValueError(f"Загрузчик {getattr(loader, '__name__', loader)} не поддерживает загрузку по частям")
+    logger.info(f"Потоковое чтение файла {file_path}...")
+    total = 0
+    for chunk in read_excel_chunks(file_path, chunk_size):
+        loader(db, file_path, df=chunk)
+        total += len(chunk)
+    logger.info(f"Обработано строк файла {file_path}: {total}")
+
 
+def load_all_data(bulk: bool = False, parallel: bool = False):
+    """Загрузка всех данных из Excel-файлов
 
-def load_all_data():
-    """Загрузка всех данных из Excel-файлов"""
-    db = Database()
+    bulk=True включает пакетный режим для материалов, продукции и связей.
+    parallel=True разбирает все файлы одновременно в пуле процессов
+    (всегда в пакетном режиме), см. database.import_pipeline.
+    """
+    db = Database(config="bulk_import")
     db.create_tables()  # Создаём таблицы с нуля
-    # Пути к файлам
-    material_types_file = "resources/Material_type_import.xlsx"
-    materials_file = "resources/Materials_import.xlsx"
-    product_types_file = "resources/Product_type_import.xlsx"
-    products_file = "resources/Products_import.xlsx"
-    material_products_file = "resources/Material_products__import.xlsx"
-    print("Начинаем загрузку данных...")
-    if os.path.exists(material_types_file):
-        print("Загрузка типов материалов...")
-        load_material_types(db, material_types_file)
+    if parallel:
+        from .import_pipeline import default_stages, run_stages
+        logger.info("Начинаем параллельную загрузку данных...")
+        run_stages(db, default_stages())
+        logger.info("Загрузка данных завершена!")
+        return
+    logger.info("Начинаем загрузку данных...")
+    if os.path.exists(MATERIAL_TYPES_FILE):
+        logger.info("Загрузка типов материалов...")
+        load_material_types(db, MATERIAL_TYPES_FILE)
     else:
-        print(f"Файл {material_types_file} не найден!")
-    if os.path.exists(materials_file):
-        print("Загрузка материалов...")
-        load_materials(db, materials_file)
+        logger.warning(f"Файл {MATERIAL_TYPES_FILE} не найден!")
+    if os.path.exists(MATERIALS_FILE):
+        logger.info("Загрузка материалов...")
+        (load_materials_bulk if bulk else load_materials)(db, MATERIALS_FILE)
     else:
-        print(f"Файл {materials_file} не найден!")
-    if os.path.exists(product_types_file):
-        print("Загрузка типов продукции...")
-        load_product_types(db, product_types_file)
+        logger.warning(f"Файл {MATERIALS_FILE} не найден!")
+    if os.path.exists(PRODUCT_TYPES_FILE):
+        logger.info("Загрузка типов продукции...")
+        load_product_types(db, PRODUCT_TYPES_FILE)
     else:
-        print(f"Файл {product_types_file} не найден!")
-    if os.path.exists(products_file):
-        print("Загрузка продукции...")
-        load_products(db, products_file)
+        logger.warning(f"Файл {PRODUCT_TYPES_FILE} не найден!")
+    if os.path.exists(PRODUCTS_FILE):
+        logger.info("Загрузка продукции...")
+        (load_products_bulk if bulk else load_products)(db, PRODUCTS_FILE)
     else:
-        print(f"Файл {products_file} не найден!")
-    if os.path.exists(material_products_file):
-        print("Загрузка связей материалов с продукцией...")
-        load_material_product_relations(db, material_products_file)
+        logger.warning(f"Файл {PRODUCTS_FILE} не найден!")
+    if os.path.exists(MATERIAL_PRODUCTS_FILE):
+        logger.info("Загрузка связей материалов с продукцией...")
+        (load_material_product_relations_staged if bulk else load_material_product_relations)(
+            db, MATERIAL_PRODUCTS_FILE)
     else:
-        print(f"Файл {material_products_file} не найден!")
-    print("Загрузка данных завершена!")
+        logger.warning(f"Файл {MATERIAL_PRODUCTS_FILE} не найден!")
+    logger.info("Загрузка данных завершена!")
 
 
 if __name__ == "__main__":
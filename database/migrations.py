@@ -0,0 +1,149 @@
+import logging
+
+from sqlalchemy.schema import CreateIndex
+
+from .database import Database
+from .instrumentation import configure_logging
+from .models import MATERIAL_SORT_INDEXES
+from .requirements import install_requirements
+from .search_index import install_search_index
+
+logger = logging.getLogger(__name__)
+
+
+def _material_product_has_key(conn) -> bool:
+    """Есть ли у material_product составной первичный ключ"""
+    columns = conn.exec_driver_sql("PRAGMA table_info(material_product)").fetchall()
+    return sorted(column[1] for column in columns if column[5]) == ['material_id', 'product_id']
+
+
+def _migration_1(conn):
+    """Первичный ключ (material_id, product_id) и индексы для поиска связей и типов"""
+    if not _material_product_has_key(conn):
+        conn.exec_driver_sql("""
+            CREATE TABLE material_product_new (
+                material_id INTEGER NOT NULL REFERENCES materials (id),
+                product_id INTEGER NOT NULL REFERENCES products (id),
+                quantity FLOAT,
+                PRIMARY KEY (material_id, product_id)
+            )
+        """)
+        # Из дублирующихся связей остается первая добавленная, как при загрузке из Excel
+        duplicates = conn.exec_driver_sql(
+            "SELECT COUNT(*) - COUNT(DISTINCT material_id || ':' || product_id) FROM material_product "
+            "WHERE material_id IS NOT NULL AND product_id IS NOT NULL"
+        ).scalar()
+        conn.exec_driver_sql(
+            "INSERT OR IGNORE INTO material_product_new (material_id, product_id, quantity) "
+            "SELECT material_id, product_id, quantity FROM material_product "
+            "WHERE material_id IS NOT NULL AND product_id IS NOT NULL ORDER BY rowid"
+        )
+        conn.exec_driver_sql("DROP TABLE material_product")
+        conn.exec_driver_sql("ALTER TABLE material_product_new RENAME TO material_product")
+        if duplicates:
+            logger.info(f"Удалено дублирующихся связей материалов с продукцией: {duplicates}")
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_material_product_product_id ON material_product (product_id)"
+    )
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_material_types_name ON material_types (name)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_product_types_name ON product_types (name)")
+
+
+def _migration_2(conn):
+    """Таблица потребности в материалах и ее триггеры"""
+    # Пересоздание material_product в миграции 1 удаляет триггеры на ней
+    install_requirements(conn)
+
+
+def _migration_3(conn):
+    """Полнотекстовый (триграммный) индекс наименований материалов и продукции"""
+    install_search_index(conn)
+
+
+def _migration_4(conn):
+    """Индексы для сортировки и постраничной выдачи материалов по колонкам таблицы"""
+    for index in MATERIAL_SORT_INDEXES:
+        conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+# Версии схемы по порядку: (версия, описание, функция)
+MIGRATIONS = (
+    (1, "Первичный ключ и индексы material_product, индексы имен типов", _migration_1),
+    (2, "Материализованная потребность в материалах", _migration_2),
+    (3, "Полнотекстовый поиск по наименованиям", _migration_3),
+    (4, "Индексы сортировки материалов", _migration_4),
+)
+
+# Основные запросы сервиса и окон для проверки плана выполнения
+HOT_QUERIES = {
+    # Продукция окна ProductsWindow одним запросом
+    "get_material_usage": (
+        "SELECT products.id, products.name, products.article, product_types.name, product_types.coefficient, "
+        "material_product.quantity FROM products "
+        "JOIN material_product ON material_product.product_id = products.id "
+        "LEFT OUTER JOIN product_types ON product_types.id = products.type_id "
+        "WHERE material_product.material_id = ? ORDER BY products.id", (1,)),
+    # Продукция по ID из спецификации в памяти (BomGraph)
+    "get_products_for_material": (
+        "SELECT products.*, product_types.* FROM products "
+        "LEFT OUTER JOIN product_types ON product_types.id = products.type_id "
+        "WHERE products.id IN (?) ORDER BY products.id", (1,)),
+    # Загрузка спецификации в память (BomGraph.from_database) и количества продукции
+    "BomGraph.from_database": (
+        "SELECT material_id, product_id, quantity FROM material_product "
+        "WHERE material_id IS NOT NULL AND product_id IS NOT NULL", ()),
+    "product_quantities": (
+        "SELECT id, quantity FROM products", ()),
+    "get_material_requirements": (
+        "SELECT material_id, required_quantity, shortfall FROM material_requirements "
+        "WHERE material_id IN (?)", (1,)),
+    "materials_for_product": (
+        "SELECT material_id, quantity FROM material_product WHERE product_id = ?", (1,)),
+    "material_type_by_name": (
+        "SELECT id FROM material_types WHERE name = ?", ("",)),
+    "product_type_by_name": (
+        "SELECT id FROM product_types WHERE name = ?", ("",)),
+    "search_materials(order_by=price)": (
+        "SELECT id FROM materials WHERE (coalesce(price, -1e308), id) > (?, ?) "
+        "ORDER BY coalesce(price, -1e308), id LIMIT 200", (0.0, 0)),
+}
+
+
+def schema_version(conn) -> int:
+    """Текущая версия схемы базы данных"""
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def upgrade(db: Database):
+    """Применение недостающих миграций к существующей базе данных
+
+    Каждая миграция выполняется в своей транзакции вместе с записью
+    новой версии в PRAGMA user_version.
+    """
+    with db.engine.connect() as conn:
+        version = schema_version(conn)
+    for target, description, migrate in MIGRATIONS:
+        if target <= version:
+            continue
+        with db.engine.begin() as conn:
+            # pysqlite не открывает транзакцию перед DDL, поэтому открываем ее явно
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            migrate(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {int(target)}")
+        logger.info(f"Применена миграция {target}: {description}")
+        version = target
+
+
+def explain_hot_queries(db: Database):
+    """Вывод EXPLAIN QUERY PLAN для основных запросов"""
+    with db.engine.connect() as conn:
+        for name, (sql, params) in HOT_QUERIES.items():
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+            logger.info("%s:\n%s", name, "\n".join(f"    {row[-1]}" for row in plan))
+
+
+if __name__ == "__main__":
+    configure_logging("INFO")
+    database = Database()
+    upgrade(database)
+    explain_hot_queries(database)
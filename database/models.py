@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index, Table, func, literal_column
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -6,17 +6,30 @@ Base = declarative_base()
 
 # Таблица связи между материалами и продукцией
 material_product = Table('material_product', Base.metadata,
-                         Column('material_id', Integer, ForeignKey('materials.id')),
-                         Column('product_id', Integer, ForeignKey('products.id')),
-                         Column('quantity', Float)  # Количество материала на единицу продукции
+                         Column('material_id', Integer, ForeignKey('materials.id'), primary_key=True),
+                         Column('product_id', Integer, ForeignKey('products.id'), primary_key=True),
+                         Column('quantity', Float),  # Количество материала на единицу продукции
+                         Index('ix_material_product_product_id', 'product_id')
                          )
 
+# Материализованная потребность в материалах (поддерживается триггерами, см. database/requirements.py)
+material_requirements = Table('material_requirements', Base.metadata,
+                              Column('material_id', Integer, ForeignKey('materials.id'), primary_key=True),
+                              Column('required_quantity', Float, nullable=False, default=0.0),
+                              Column('shortfall', Float, nullable=False, default=0.0)  # Нехватка до потребности
+                              )
+
+# Непустая таблица отключает триггеры material_requirements на время массовых операций
+material_requirements_suspended = Table('material_requirements_suspended', Base.metadata,
+                                        Column('reason', String)
+                                        )
+
 
 class MaterialType(Base):
     __tablename__ = 'material_types'
 
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, index=True)
     materials = relationship("Material", back_populates="type")
 
 
@@ -36,11 +49,34 @@ class Material(Base):
     products = relationship("Product", secondary=material_product, back_populates="materials")
 
 
+# Замена NULL в колонках сортировки списка материалов (см. MATERIAL_SORT_KEYS в сервисе);
+# константа пишется в SQL литералом, чтобы запрос совпадал с выражением индекса
+MATERIAL_SORT_NULLS = {
+    'price': '-1e308',
+    'unit': "''",
+    'package_quantity': '-1e308',
+    'stock_quantity': '-1e308',
+    'min_quantity': '-1e308',
+}
+
+
+def material_sort_expression(column: str):
+    """Выражение сортировки материалов по колонке с заменой NULL"""
+    return func.coalesce(Material.__table__.c[column], literal_column(MATERIAL_SORT_NULLS[column]))
+
+
+# Индексы (выражение сортировки, id) для постраничной выдачи в любом порядке
+MATERIAL_SORT_INDEXES = [
+    Index(f'ix_materials_sort_{column}', material_sort_expression(column), Material.__table__.c.id)
+    for column in MATERIAL_SORT_NULLS
+]
+
+
 class ProductType(Base):
     __tablename__ = 'product_types'
 
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, index=True)
     coefficient = Column(Float, nullable=False)  # Коэффициент типа продукции
     products = relationship("Product", back_populates="type")
 
@@ -56,4 +92,20 @@ class Product(Base):
     quantity = Column(Float, nullable=True, default=0.0)
 
     type = relationship("ProductType", back_populates="products")
-    materials = relationship("Material", secondary=material_product, back_populates="products")
\ No newline at end of file
+    materials = relationship("Material", secondary=material_product, back_populates="products")
+
+class ImportFile(Base):
+    """Отпечаток исходного файла для инкрементального импорта"""
+    __tablename__ = 'import_files'
+
+    path = Column(String, primary_key=True)
+    content_hash = Column(String, nullable=False)  # SHA-256 содержимого файла
+
+
+class ImportRow(Base):
+    """Отпечаток строки исходного файла (по наименованию материала или артикулу)"""
+    __tablename__ = 'import_rows'
+
+    source = Column(String, primary_key=True)  # materials / products
+    key = Column(String, primary_key=True)
+    row_hash = Column(String, nullable=False)
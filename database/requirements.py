@@ -0,0 +1,225 @@
+import logging
+from contextlib import contextmanager
+
+from .database import Database
+from .instrumentation import configure_logging
+from .models import material_requirements, material_requirements_suspended
+
+logger = logging.getLogger(__name__)
+
+# Триггеры выполняются, только пока массовая операция их не приостановила
+_ACTIVE = "NOT EXISTS (SELECT 1 FROM material_requirements_suspended)"
+
+# Вклад связи в потребность: количество материала на единицу * количество продукции
+_LINK_DELTA = "COALESCE({row}.quantity * (SELECT quantity FROM products WHERE id = {row}.product_id), 0)"
+
+# Суммарное количество материала material_id на единицу продукции product_id
+_LINK_SUM = ("(SELECT COALESCE(SUM(mp.quantity), 0) FROM material_product mp "
+             "WHERE mp.material_id = material_requirements.material_id AND mp.product_id = {product})")
+
+_TRIGGERS = {
+    "material_requirements_material_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS material_requirements_material_insert
+        AFTER INSERT ON materials WHEN {_ACTIVE}
+        BEGIN
+            INSERT OR IGNORE INTO material_requirements (material_id, required_quantity, shortfall)
+            VALUES (NEW.id, 0, MAX(-COALESCE(NEW.stock_quantity, 0), 0));
+        END""",
+    "material_requirements_material_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS material_requirements_material_delete
+        AFTER DELETE ON materials WHEN {_ACTIVE}
+        BEGIN
+            DELETE FROM material_requirements WHERE material_id = OLD.id;
+        END""",
+    "material_requirements_material_stock": f"""
+        CREATE TRIGGER IF NOT EXISTS material_requirements_material_stock
+        AFTER UPDATE OF stock_quantity ON materials WHEN {_ACTIVE}
+        BEGIN
+            UPDATE material_requirements
+            SET shortfall = MAX(required_quantity - COALESCE(NEW.stock_quantity, 0), 0)
+            WHERE material_id = NEW.id;
+        END""",
+    "material_requirements_link_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS material_requirements_link_insert
+        AFTER INSERT ON material_product WHEN {_ACTIVE}
+        BEGIN
+            UPDATE material_requirements SET required_quantity = required_quantity + {_LINK_DELTA.format(row="NEW")}
+            WHERE material_id = NEW.material_id;
+        END""",
+    "material_requirements_link_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS material_requirements_link_delete
+        AFTER DELETE ON material_product WHEN {_ACTIVE}
+        BEGIN
+            UPDATE material_requirements SET required_quantity = required_quantity - {_LINK_DELTA.format(row="OLD")}
+            WHERE material_id = OLD.material_id;
+        END""",
+    "material_requirements_link_update": f"""
+        CREATE TRIGGER IF NOT EXISTS material_requirements_link_update
+        AFTER UPDATE ON material_product WHEN {_ACTIVE}
+        BEGIN
+            UPDATE material_requirements SET required_quantity = required_quantity - {_LINK_DELTA.format(row="OLD")}
+            WHERE material_id = OLD.material_id;
+            UPDATE material_requirements SET required_quantity = required_quantity + {_LINK_DELTA.format(row="NEW")}
+            WHERE material_id = NEW.material_id;
+        END""",
+    "material_requirements_product_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS material_requirements_product_insert
+        AFTER INSERT ON products WHEN {_ACTIVE} AND COALESCE(NEW.quantity, 0) != 0
+        BEGIN
+            UPDATE material_requirements
+            SET required_quantity = required_quantity + {_LINK_SUM.format(product="NEW.id")} * NEW.quantity
+            WHERE material_id IN (SELECT material_id FROM material_product WHERE product_id = NEW.id);
+        END""",
+    "material_requirements_product_quantity": f"""
+        CREATE TRIGGER IF NOT EXISTS material_requirements_product_quantity
+        AFTER UPDATE OF quantity ON products
+        WHEN {_ACTIVE} AND COALESCE(OLD.quantity, 0) != COALESCE(NEW.quantity, 0)
+        BEGIN
+            UPDATE material_requirements
+            SET required_quantity = required_quantity + {_LINK_SUM.format(product="NEW.id")}
+                * (COALESCE(NEW.quantity, 0) - COALESCE(OLD.quantity, 0))
+            WHERE material_id IN (SELECT material_id FROM material_product WHERE product_id = NEW.id);
+        END""",
+    "material_requirements_product_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS material_requirements_product_delete
+        AFTER DELETE ON products WHEN {_ACTIVE} AND COALESCE(OLD.quantity, 0) != 0
+        BEGIN
+            UPDATE material_requirements
+            SET required_quantity = required_quantity - {_LINK_SUM.format(product="OLD.id")} * OLD.quantity
+            WHERE material_id IN (SELECT material_id FROM material_product WHERE product_id = OLD.id);
+        END""",
+    "material_requirements_shortfall": f"""
+        CREATE TRIGGER IF NOT EXISTS material_requirements_shortfall
+        AFTER UPDATE OF required_quantity ON material_requirements WHEN {_ACTIVE}
+        BEGIN
+            UPDATE material_requirements
+            SET shortfall = MAX(NEW.required_quantity
+                                - COALESCE((SELECT stock_quantity FROM materials WHERE id = NEW.material_id), 0), 0)
+            WHERE material_id = NEW.material_id;
+        END""",
+}
+
+# Потребность, рассчитанная с нуля по material_product и products
+_EXPECTED = """
+    SELECT m.id AS material_id,
+           COALESCE(SUM(mp.quantity * p.quantity), 0) AS required_quantity,
+           MAX(COALESCE(SUM(mp.quantity * p.quantity), 0) - COALESCE(m.stock_quantity, 0), 0) AS shortfall
+    FROM materials m
+    LEFT JOIN material_product mp ON mp.material_id = m.id
+    LEFT JOIN products p ON p.id = mp.product_id
+    GROUP BY m.id
+"""
+
+# Допустимое накопленное расхождение при пошаговом обновлении
+_TOLERANCE = 1e-6
+
+
+def requirements_installed(conn) -> bool:
+    """Проверка наличия таблицы и всех триггеров material_requirements"""
+    names = {row[0] for row in conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE 'material_requirements%'"
+    )}
+    return material_requirements.name in names and set(_TRIGGERS) <= names
+
+
+def _rebuild(conn):
+    """Полный пересчет material_requirements одним набором SQL-операций"""
+    conn.exec_driver_sql("DELETE FROM material_requirements")
+    conn.exec_driver_sql(
+        f"INSERT INTO material_requirements (material_id, required_quantity, shortfall) {_EXPECTED}"
+    )
+
+
+@contextmanager
+def suspended_requirements(conn, reason: str = "bulk"):
+    """Приостановка триггеров на время массовой операции с пересчетом в конце
+
+    Используется внутри транзакции conn, поэтому другие соединения не видят
+    ни приостановленного состояния, ни промежуточных значений.
+    """
+    if not requirements_installed(conn):
+        yield
+        return
+    conn.execute(material_requirements_suspended.insert().values(reason=reason))
+    try:
+        yield
+    finally:
+        conn.execute(material_requirements_suspended.delete())
+    _rebuild(conn)
+
+
+def install_requirements(conn) -> bool:
+    """Создание таблицы material_requirements и недостающих триггеров в транзакции conn
+
+    Возвращает True, если что-то было создано (в этом случае таблица пересчитана).
+    """
+    if requirements_installed(conn):
+        return False
+    material_requirements.create(conn, checkfirst=True)
+    material_requirements_suspended.create(conn, checkfirst=True)
+    for sql in _TRIGGERS.values():
+        conn.exec_driver_sql(sql)
+    _rebuild(conn)
+    return True
+
+
+def install_material_requirements(db: Database):
+    """Создание таблицы material_requirements и триггеров (идемпотентно)"""
+    with db.engine.begin() as conn:
+        if install_requirements(conn):
+            logger.info("Таблица потребности в материалах создана")
+
+
+def check_material_requirements(conn) -> list:
+    """Сравнение материализованных значений с пересчетом с нуля
+
+    Возвращает список (material_id, сохранено, ожидается) для расхождений;
+    None вместо значения означает отсутствующую или лишнюю строку.
+    """
+    rows = conn.exec_driver_sql(f"""
+        SELECT e.material_id, r.required_quantity, e.required_quantity, r.shortfall, e.shortfall
+        FROM ({_EXPECTED}) e
+        LEFT JOIN material_requirements r ON r.material_id = e.material_id
+    """).fetchall()
+
+    mismatches = []
+    for material_id, stored, expected, stored_shortfall, expected_shortfall in rows:
+        if stored is None:
+            mismatches.append((material_id, None, expected))
+            continue
+        scale = max(1.0, abs(expected))
+        if abs(stored - expected) > _TOLERANCE * scale or \
+                abs(stored_shortfall - expected_shortfall) > _TOLERANCE * scale:
+            mismatches.append((material_id, stored, expected))
+
+    # Строки удаленных материалов
+    mismatches.extend(conn.exec_driver_sql("""
+        SELECT r.material_id, r.required_quantity, NULL FROM material_requirements r
+        LEFT JOIN materials m ON m.id = r.material_id WHERE m.id IS NULL
+    """).fetchall())
+    return mismatches
+
+
+def rebuild_material_requirements(db: Database, check: bool = True) -> list:
+    """Полный пересчет material_requirements с проверкой согласованности
+
+    Возвращает найденные до пересчета расхождения (см. check_material_requirements).
+    """
+    install_material_requirements(db)
+    with db.engine.begin() as conn:
+        mismatches = check_material_requirements(conn) if check else []
+        _rebuild(conn)
+    if check:
+        if mismatches:
+            logger.warning(f"Найдено расхождений в потребности материалов: {len(mismatches)}")
+            for material_id, stored, expected in mismatches[:20]:
+                logger.warning(f"Материал ID={material_id}: сохранено {stored}, ожидается {expected}")
+        else:
+            logger.info("Потребность в материалах согласована")
+    logger.info("Потребность в материалах пересчитана")
+    return mismatches
+
+
+if __name__ == "__main__":
+    configure_logging("INFO")
+    rebuild_material_requirements(Database())
@@ -0,0 +1,89 @@
+import logging
+
+from sqlalchemy import column, table
+from sqlalchemy.exc import OperationalError
+
+from .database import Database
+
+logger = logging.getLogger(__name__)
+
+# Индексируемые таблицы: имя индекса -> (таблица, столбцы)
+SEARCH_INDEXES = {
+    "materials_fts": ("materials", ("name",)),
+    "products_fts": ("products", ("name", "article")),
+}
+
+# Виртуальные таблицы для запросов через SQLAlchemy (rank - релевантность bm25, меньше - лучше)
+materials_fts = table("materials_fts", column("rowid"), column("name"), column("rank"))
+products_fts = table("products_fts", column("rowid"), column("name"), column("article"), column("rank"))
+
+# Триграммный токенизатор находит подстроки от 3 символов
+MIN_QUERY_LENGTH = 3
+
+
+def _index_ddl(index: str, source: str, fields: tuple) -> list:
+    """Виртуальная таблица FTS5 и триггеры синхронизации с исходной таблицей"""
+    names = ", ".join(fields)
+    new_values = ", ".join(f"NEW.{field}" for field in fields)
+    old_values = ", ".join(f"OLD.{field}" for field in fields)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+        f"{names}, content='{source}', content_rowid='id', tokenize='trigram')",
+        f"""CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {source}
+        BEGIN
+            INSERT INTO {index} (rowid, {names}) VALUES (NEW.id, {new_values});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {source}
+        BEGIN
+            INSERT INTO {index} ({index}, rowid, {names}) VALUES ('delete', OLD.id, {old_values});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF {names} ON {source}
+        BEGIN
+            INSERT INTO {index} ({index}, rowid, {names}) VALUES ('delete', OLD.id, {old_values});
+            INSERT INTO {index} (rowid, {names}) VALUES (NEW.id, {new_values});
+        END""",
+        f"INSERT INTO {index} ({index}) VALUES ('rebuild')",
+    ]
+
+
+def install_search_index(conn) -> bool:
+    """Создание полнотекстовых индексов по наименованиям в транзакции conn
+
+    Возвращает False, если SQLite собран без FTS5 или триграммного токенизатора
+    (поиск тогда работает полным просмотром таблицы).
+    """
+    try:
+        conn.exec_driver_sql("SAVEPOINT search_index")
+        for index, (source, fields) in SEARCH_INDEXES.items():
+            for sql in _index_ddl(index, source, fields):
+                conn.exec_driver_sql(sql)
+        conn.exec_driver_sql("RELEASE SAVEPOINT search_index")
+        return True
+    except OperationalError as e:
+        conn.exec_driver_sql("ROLLBACK TO SAVEPOINT search_index")
+        conn.exec_driver_sql("RELEASE SAVEPOINT search_index")
+        logger.warning(f"Полнотекстовый индекс недоступен: {e}")
+        return False
+
+
+def search_index_installed(conn) -> bool:
+    """Есть ли в базе данных полнотекстовые индексы"""
+    placeholders = ", ".join("?" for _ in SEARCH_INDEXES)
+    found = conn.exec_driver_sql(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})",
+        tuple(SEARCH_INDEXES)
+    ).scalar()
+    return found == len(SEARCH_INDEXES)
+
+
+def match_phrase(query: str) -> str:
+    """Запрос FTS5, ищущий строку как подстроку (фраза в кавычках)"""
+    return '"' + query.replace('"', '""') + '"'
+
+
+def rebuild_search_index(db: Database):
+    """Полное перестроение полнотекстовых индексов"""
+    with db.engine.begin() as conn:
+        for index in SEARCH_INDEXES:
+            conn.exec_driver_sql(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+    logger.info("Полнотекстовый индекс перестроен")
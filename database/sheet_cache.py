@@ -0,0 +1,134 @@
+import glob
+import hashlib
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Каталог кэша рядом с исходным файлом
+CACHE_DIR_NAME = ".sheet_cache"
+# Максимальный суммарный размер кэша в одном каталоге
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_ENABLED = True
+
+
+def file_hash(file_path: str) -> str:
+    """SHA-256 содержимого файла"""
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _cache_dir(file_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(file_path)), CACHE_DIR_NAME)
+
+
+def _cache_path(file_path: str) -> str:
+    """Путь к записи кэша: имя файла, размер, mtime и хэш содержимого"""
+    stat = os.stat(file_path)
+    name = os.path.basename(file_path)
+    key = f"{name}-{stat.st_size}-{stat.st_mtime_ns}-{file_hash(file_path)[:16]}.npz"
+    return os.path.join(_cache_dir(file_path), key)
+
+
+def _encode(df: pd.DataFrame):
+    """Разложение DataFrame на массивы NumPy; None, если столбцы не поддерживаются"""
+    if not all(isinstance(column, str) for column in df.columns):
+        return None
+    arrays = {'columns': np.array(df.columns, dtype=str)}
+    for i, column in enumerate(df.columns):
+        series = df[column]
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            arrays[f"c{i}"] = series.to_numpy()
+            continue
+        mask = series.isna().to_numpy()
+        values = series[~mask]
+        # Кэшируются только чисто строковые столбцы, остальное читается заново
+        if not values.map(type).eq(str).all():
+            return None
+        strings = np.full(len(series), '', dtype=object)
+        strings[~mask] = values.to_numpy()
+        arrays[f"s{i}"] = strings.astype(str)
+        arrays[f"m{i}"] = mask
+    return arrays
+
+
+def _decode(data) -> pd.DataFrame:
+    """Сборка DataFrame из массивов записи кэша"""
+    columns = list(data['columns'])
+    frame = {}
+    for i, column in enumerate(columns):
+        if f"c{i}" in data:
+            frame[column] = data[f"c{i}"]
+        else:
+            values = data[f"s{i}"].astype(object)
+            values[data[f"m{i}"]] = np.nan
+            frame[column] = values
+    return pd.DataFrame(frame, columns=columns)
+
+
+def _evict(cache_dir: str, max_bytes: int):
+    """Удаление давно не использованных записей сверх лимита размера"""
+    entries = []
+    for path in glob.glob(os.path.join(cache_dir, "*.npz")):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def read_excel_cached(file_path: str, max_bytes: int = CACHE_MAX_BYTES) -> pd.DataFrame:
+    """Чтение листа Excel через кэш разобранных данных
+
+    Запись кэша действительна, пока совпадают размер, mtime и хэш файла.
+    При промахе файл разбирается pd.read_excel и сохраняется в .npz;
+    суммарный размер каталога кэша ограничен max_bytes (вытесняются
+    записи, к которым дольше всего не обращались).
+    """
+    if not CACHE_ENABLED:
+        return pd.read_excel(file_path)
+
+    cache_path = _cache_path(file_path)
+    if os.path.exists(cache_path):
+        try:
+            with np.load(cache_path, allow_pickle=False) as data:
+                df = _decode(data)
+            os.utime(cache_path)  # отметка последнего использования для вытеснения
+            return df
+        except (OSError, ValueError, KeyError):
+            pass  # поврежденная запись перезаписывается ниже
+
+    df = pd.read_excel(file_path)
+    arrays = _encode(df)
+    if arrays is None:
+        return df
+    cache_dir = os.path.dirname(cache_path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Старые версии этого же файла больше не понадобятся
+        prefix = os.path.basename(file_path) + "-"
+        for stale in glob.glob(os.path.join(cache_dir, glob.escape(prefix) + "*.npz")):
+            os.remove(stale)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, cache_path)
+        _evict(cache_dir, max_bytes)
+    except OSError as e:
+        logger.warning(f"Не удалось сохранить кэш для {file_path}: {e}")
+    return df
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBridge:
+    """Выполнение корутин из интерфейса Tk
+
+    Цикл событий asyncio работает в отдельном потоке; корутина
+    отправляется в него через submit, а результат передается в обработчик
+    в потоке Tk (через after), поэтому главный цикл Tk не блокируется
+    ожиданием. В отличие от QueryRunner, результаты всех отправленных
+    корутин доставляются, а сами корутины выполняются одновременно.
+    """
+
+    def __init__(self, root, poll_ms: int = 20):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.poll_job = None
+        self.pending = 0  # число корутин, результат которых еще не доставлен
+        self.closed = False
+
+        self.loop = asyncio.new_event_loop()
+        self._results = queue.Queue()
+        self._thread = threading.Thread(target=self._run_loop, name="async-bridge", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine, on_result, on_error=None):
+        """Запуск корутины с обработчиком результата on_result(результат)
+
+        Возвращает concurrent.futures.Future, через который корутину можно отменить.
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        self.pending += 1
+        future.add_done_callback(lambda done: self._results.put((done, on_result, on_error)))
+        self._schedule_poll()
+        return future
+
+    def run(self, coroutine, timeout: float = None):
+        """Выполнение корутины с ожиданием результата (не для потока Tk)"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def close(self):
+        """Остановка цикла событий"""
+        self.closed = True
+        if self.poll_job is not None:
+            self.root.after_cancel(self.poll_job)
+            self.poll_job = None
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def _schedule_poll(self):
+        if self.poll_job is None and not self.closed:
+            self.poll_job = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        """Доставка готовых результатов в потоке Tk"""
+        self.poll_job = None
+        while True:
+            try:
+                future, on_result, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if error is None:
+                on_result(future.result())
+            elif on_error is not None:
+                on_error(error)
+            else:
+                logger.error(f"Ошибка при выполнении запроса: {error}")
+        if self.pending:
+            self._schedule_poll()
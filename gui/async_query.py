@@ -0,0 +1,99 @@
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRunner:
+    """Выполнение запросов к базе данных в фоновом потоке
+
+    Запросы выполняются по одному в рабочем потоке; если пока выполняется
+    запрос, пришло несколько новых, выполняется только последний. Результат
+    передается в обработчик в потоке Tk (через after), причем только для
+    последнего отправленного запроса - результаты устаревших отбрасываются.
+    Каждый вызов сервиса открывает свою сессию, поэтому рабочий поток не
+    делит сессии с потоком интерфейса.
+    """
+
+    def __init__(self, root, poll_ms: int = 20):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.generation = 0  # номер последнего отправленного запроса
+        self.waiting = False  # ожидается результат последнего запроса
+        self.poll_job = None
+        self.closed = False
+
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._pending = None  # последний еще не начатый запрос
+        self._results = queue.Queue()
+        self._thread = threading.Thread(target=self._work, name="query-runner", daemon=True)
+        self._thread.start()
+
+    def submit(self, func, on_result, on_error=None):
+        """Отправка запроса func() с обработчиком результата on_result(результат)"""
+        with self._lock:
+            self.generation += 1
+            self._pending = (self.generation, func, on_result, on_error)
+            self._wake.notify()
+        self.waiting = True
+        self._schedule_poll()
+
+    def cancel(self):
+        """Отмена ожидающего запроса и отбрасывание результата выполняемого"""
+        with self._lock:
+            self.generation += 1
+            self._pending = None
+        self.waiting = False
+
+    def close(self):
+        """Остановка рабочего потока"""
+        with self._lock:
+            self.closed = True
+            self._pending = None
+            self._wake.notify()
+        if self.poll_job is not None:
+            self.root.after_cancel(self.poll_job)
+            self.poll_job = None
+
+    def _work(self):
+        """Цикл рабочего потока"""
+        while True:
+            with self._lock:
+                while self._pending is None and not self.closed:
+                    self._wake.wait()
+                if self.closed:
+                    return
+                request, self._pending = self._pending, None
+
+            generation, func, on_result, on_error = request
+            try:
+                result, error = func(), None
+            except Exception as e:
+                result, error = None, e
+            self._results.put((generation, result, error, on_result, on_error))
+
+    def _schedule_poll(self):
+        if self.poll_job is None and not self.closed:
+            self.poll_job = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        """Доставка готовых результатов в потоке Tk"""
+        self.poll_job = None
+        while True:
+            try:
+                generation, result, error, on_result, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.generation:
+                continue  # результат запроса, который уже заменен новым
+            self.waiting = False
+            if error is None:
+                on_result(result)
+            elif on_error is not None:
+                on_error(error)
+            else:
+                logger.error(f"Ошибка при выполнении запроса: {error}")
+        if self.waiting:
+            self._schedule_poll()
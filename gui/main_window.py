@@ -1,17 +1,33 @@
+import logging
 import os
 import tkinter as tk
 from tkinter import ttk
 
 from PIL import Image, ImageTk
 
+from business.material_service import MATERIAL_SORT_KEYS
+from database.instrumentation import profiled
+from gui.async_query import QueryRunner
 from gui.material_dialog import MaterialDialog
 from gui.products_window import ProductsWindow
+from gui.virtual_table import PagedRows, VirtualTable
+
+logger = logging.getLogger(__name__)
 
 
 class MainWindow:
+    # Количество материалов, загружаемых за один запрос
+    PAGE_SIZE = 200
+    # Сколько страниц материалов хранится в памяти при прокрутке
+    MAX_PAGES = 10
+    # Пауза после последнего изменения фильтра перед запуском поиска, мс
+    FILTER_DELAY_MS = 250
+
     def __init__(self, root, material_service):
         self.root = root
         self.material_service = material_service
+        # Действия окна - области профиля gui.MainWindow.<действие>
+        self.instrumentation = material_service.instrumentation
 
         # Настройка шрифта для всего приложения
         self.configure_fonts()
@@ -46,6 +62,16 @@ class MainWindow:
         self.min_quantity_var = tk.StringVar()
         self.max_quantity_var = tk.StringVar()
 
+        # Фильтры и сортировка показанного списка материалов
+        self.filters = {}
+        self.order_by = "id"
+        # Сортировка, выбранная пользователем (применяется со следующим результатом поиска)
+        self.sort_order = "id"
+
+        # Поиск выполняется в фоновом потоке, запуск откладывается до паузы в вводе
+        self.query_runner = QueryRunner(self.root)
+        self.filter_job = None
+
         # Создание панели поиска
         self.create_search_panel()
 
@@ -109,36 +135,33 @@ class MainWindow:
                                                                                            pady=5)
 
     def create_materials_table(self):
-        # Создание фрейма для таблицы
-        table_frame = ttk.Frame(self.main_frame)
-        table_frame.pack(fill=tk.BOTH, expand=True)
-
-        # Создание таблицы
-        columns = ("id", "type", "name", "price", "unit", "package_quantity",
-                   "stock_quantity", "min_quantity")
-        self.tree = ttk.Treeview(table_frame, columns=columns, show="headings")
-
-        # Настройка заголовков
-        self.tree.heading("id", text="ID")
-        self.tree.heading("type", text="Тип")
-        self.tree.heading("name", text="Наименование")
-        self.tree.heading("price", text="Цена")
-        self.tree.heading("unit", text="Ед. изм.")
-        self.tree.heading("package_quantity", text="Кол-во в упаковке")
-        self.tree.heading("stock_quantity", text="На складе")
-        self.tree.heading("min_quantity", text="Мин. кол-во")
+        # Колонки таблицы и их заголовки
+        columns = {
+            "id": "ID",
+            "type": "Тип",
+            "name": "Наименование",
+            "price": "Цена",
+            "unit": "Ед. изм.",
+            "package_quantity": "Кол-во в упаковке",
+            "stock_quantity": "На складе",
+            "min_quantity": "Мин. кол-во",
+            "required": "Требуется",
+            "shortfall": "Нехватка",
+        }
+
+        # Таблица с виртуальной прокруткой: в Treeview только видимые строки,
+        # сортировка по заголовку выполняется в базе данных
+        self.table = VirtualTable(self.main_frame, columns, sortable=MATERIAL_SORT_KEYS,
+                                  on_sort=self.sort_materials)
+        self.table.frame.pack(fill=tk.BOTH, expand=True)
+        self.tree = self.table.tree
 
         # Настройка ширины колонок
         for col in columns:
             self.tree.column(col, width=100)
 
-        # Добавление скроллбара
-        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-
-        # Размещение таблицы и скроллбара
-        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # Строки загружаются страницами по мере прокрутки
+        self.material_rows = PagedRows(self.fetch_material_rows, self.PAGE_SIZE, self.MAX_PAGES)
 
         # Привязка событий
         self.tree.bind("<Double-1>", self.on_material_double_click)
@@ -153,9 +176,13 @@ class MainWindow:
         add_button = tk.Button(button_frame, text="Добавить", font=("Constantia", 10), command=self.add_material, bg="#BFD6F6")
         add_button.pack(side=tk.LEFT, padx=5)
 
-        refresh_button = tk.Button(button_frame, text="Обновить", font=("Constantia", 10), command=self.load_materials, bg="#BFD6F6")
+        refresh_button = tk.Button(button_frame, text="Обновить", font=("Constantia", 10), command=self.refresh_materials, bg="#BFD6F6")
         refresh_button.pack(side=tk.LEFT, padx=5)
 
+        self.status_label = ttk.Label(button_frame, text="")
+        self.status_label.pack(side=tk.RIGHT, padx=5)
+
+    @profiled("gui.MainWindow.load_material_types")
     def load_material_types(self):
         """Загрузка типов материалов в выпадающий список"""
         material_types = self.material_service.get_all_material_types()
@@ -163,63 +190,114 @@ class MainWindow:
         self.type_combo.current(0)
 
     def load_materials(self):
-        """Загрузка материалов с учетом фильтров"""
-        # Очистка таблицы
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        # Загрузка материалов
-        materials = self.material_service.get_all_materials()
-        print(f"Загружено материалов: {len(materials)}")  # Отладочная информация
-
-        # Применение фильтров
-        filtered_materials = self.filter_materials(materials)
-        print(f"Отфильтровано материалов: {len(filtered_materials)}")  # Отладочная информация
-
-        # Отображение отфильтрованных материалов
-        for material in filtered_materials:
-            self.tree.insert("", tk.END, values=(
-                material.id,
-                material.type.name,
-                material.name,
-                f"{material.price:.2f}",
-                material.unit,
-                f"{material.package_quantity:.2f}",
-                f"{material.stock_quantity:.2f}",
-                f"{material.min_quantity:.2f}"
-            ))
-
-    def filter_materials(self, materials):
-        """Фильтрация материалов по заданным критериям"""
-        filtered = materials
-
-        # Фильтр по наименованию
-        name_filter = self.name_search_var.get().strip().lower()
-        if name_filter:
-            filtered = [m for m in filtered if name_filter in m.name.lower()]
-
-        # Фильтр по типу
-        type_filter = self.type_search_var.get()
-        if type_filter:
-            filtered = [m for m in filtered if m.type.name == type_filter]
+        """Загрузка материалов с учетом фильтров и сортировки (с начала списка)
+
+        Первая страница и общее число загружаются в фоновом потоке; если
+        за это время фильтры изменились, результат отбрасывается.
+        """
+        if self.filter_job is not None:
+            self.root.after_cancel(self.filter_job)
+            self.filter_job = None
+
+        filters, order_by = self.get_filters(), self.sort_order
+        self.status_label.configure(text="Поиск...")
+        self.query_runner.submit(
+            self.instrumentation.wrap(
+                "gui.MainWindow.load_materials",
+                lambda: self.query_material_rows(filters, order_by, 0, self.PAGE_SIZE, None, True)
+            ),
+            lambda first_page: self.show_materials(filters, order_by, first_page),
+            self.show_query_error
+        )
+
+    def show_materials(self, filters, order_by, first_page):
+        """Отображение результата поиска (в потоке Tk)"""
+        self.filters, self.order_by = filters, order_by
+        if self.table.rows is None:
+            self.table.set_rows(self.material_rows, first_page)
+        else:
+            self.table.refresh(to_start=True, first_page=first_page)
+        self.update_status()
+
+    def show_query_error(self, error):
+        """Сообщение об ошибке фонового поиска"""
+        logger.error(f"Ошибка при загрузке материалов: {error}")
+        self.status_label.configure(text="Ошибка при загрузке материалов")
+
+    @profiled("gui.MainWindow.refresh_materials")
+    def refresh_materials(self):
+        """Перечитывание материалов с сохранением позиции прокрутки"""
+        self.table.refresh()
+        self.update_status()
+
+    def sort_materials(self, column, descending):
+        """Сортировка по колонке (вызывается щелчком по заголовку)"""
+        self.sort_order = ("-" if descending else "") + column
+        self.load_materials()
+
+    def update_status(self):
+        """Вывод числа найденных материалов"""
+        self.status_label.configure(text=f"Найдено материалов: {self.table.count()}")
+
+    @profiled("gui.MainWindow.fetch_material_rows")
+    def fetch_material_rows(self, offset, limit, cursor, count):
+        """Страница строк таблицы по текущим фильтрам (при прокрутке)"""
+        return self.query_material_rows(self.filters, self.order_by, offset, limit, cursor, count)
+
+    def query_material_rows(self, filters, order_by, offset, limit, cursor, count):
+        """Страница строк таблицы: фильтрация, сортировка и ограничение выполняются в базе данных
+
+        Не обращается к виджетам, поэтому может выполняться в фоновом потоке.
+        """
+        page = self.material_service.search_materials(**filters, order_by=order_by, limit=limit,
+                                                      cursor=cursor, offset=offset, count_total=count)
+        # Потребность и нехватка из материализованной таблицы
+        requirements = self.material_service.get_material_requirements(m.id for m in page.materials)
+        rows = [self.format_material_row(material, requirements.get(material.id)) for material in page.materials]
+        return rows, page.total, page.next_cursor
+
+    def format_material_row(self, material, requirement):
+        """Значения колонок строки материала"""
+        return (
+            material.id,
+            material.type.name,
+            material.name,
+            f"{material.price:.2f}",
+            material.unit,
+            f"{material.package_quantity:.2f}",
+            f"{material.stock_quantity:.2f}",
+            f"{material.min_quantity:.2f}",
+            *self.format_requirement(requirement)
+        )
+
+    @staticmethod
+    def format_requirement(requirement):
+        """Значения колонок потребности и нехватки"""
+        if requirement is None:
+            return "", ""
+        return f"{requirement.required_quantity:.2f}", f"{requirement.shortfall:.2f}"
+
+    def get_filters(self):
+        """Параметры поиска материалов из полей фильтрации"""
+        filters = {
+            "name_substr": self.name_search_var.get(),
+            "type_name": self.type_search_var.get() or None,
+        }
 
         # Фильтр по количеству на складе
         try:
-            min_qty = float(self.min_quantity_var.get()) if self.min_quantity_var.get() else None
-            max_qty = float(self.max_quantity_var.get()) if self.max_quantity_var.get() else None
-
-            if min_qty is not None:
-                filtered = [m for m in filtered if m.stock_quantity >= min_qty]
-            if max_qty is not None:
-                filtered = [m for m in filtered if m.stock_quantity <= max_qty]
+            filters["min_stock"] = float(self.min_quantity_var.get()) if self.min_quantity_var.get() else None
+            filters["max_stock"] = float(self.max_quantity_var.get()) if self.max_quantity_var.get() else None
         except ValueError:
-            pass
+            filters["min_stock"] = filters["max_stock"] = None
 
-        return filtered
+        return filters
 
     def apply_filters(self, *args):
-        """Применение фильтров при изменении значений"""
-        self.load_materials()
+        """Применение фильтров после паузы в изменении значений"""
+        if self.filter_job is not None:
+            self.root.after_cancel(self.filter_job)
+        self.filter_job = self.root.after(self.FILTER_DELAY_MS, self.load_materials)
 
     def reset_filters(self):
         """Сброс всех фильтров"""
@@ -233,18 +311,54 @@ class MainWindow:
         """Открытие окна добавления материала"""
         dialog = MaterialDialog(self.root, self.material_service)
         self.root.wait_window(dialog.dialog)
-        self.load_materials()
+        if dialog.saved_material_id is not None:
+            # Новая строка сдвигает позиции остальных: перечитываются видимые страницы,
+            # в Treeview обновляются только изменившиеся строки
+            self.refresh_materials()
 
     def on_material_double_click(self, event):
         """Обработка двойного клика по материалу"""
         item = self.tree.selection()[0]
         material_id = self.tree.item(item)["values"][0]
-        material = self.material_service.get_material_by_id(material_id)
+        with self.instrumentation.scope("gui.MainWindow.open_material"):
+            material = self.material_service.get_material_by_id(material_id)
 
         if material:
             dialog = MaterialDialog(self.root, self.material_service, material)
             self.root.wait_window(dialog.dialog)
-            self.load_materials()
+            if dialog.saved_material_id is not None:
+                self.update_material_row(dialog.saved_material_id, material)
+
+    @profiled("gui.MainWindow.update_material_row")
+    def update_material_row(self, material_id, before):
+        """Обновление строки материала после редактирования
+
+        Если изменение не влияет на фильтры и порядок сортировки, меняется
+        одна строка таблицы; иначе перечитываются видимые страницы.
+        """
+        material = self.material_service.get_material_by_id(material_id)
+        if material is None or self.changes_position(before, material):
+            self.refresh_materials()
+            return
+        requirement = self.material_service.get_material_requirement(material_id)
+        self.table.update_row(material_id, self.format_material_row(material, requirement))
+
+    def changes_position(self, before, after):
+        """Может ли изменение материала изменить состав или порядок списка"""
+        columns = {self.order_by.lstrip("-")}
+        if self.filters.get("name_substr"):
+            columns.add("name")
+        if self.filters.get("type_name"):
+            columns.add("type")
+        if self.filters.get("min_stock") is not None or self.filters.get("max_stock") is not None:
+            columns.add("stock_quantity")
+
+        def value(material, column):
+            if column == "type":
+                return material.type.name if material.type else None
+            return getattr(material, column)
+
+        return any(value(before, column) != value(after, column) for column in columns)
 
     def show_context_menu(self, event):
         """Показ контекстного меню"""
@@ -252,7 +366,8 @@ class MainWindow:
         if item:
             self.tree.selection_set(item)
             material_id = self.tree.item(item)["values"][0]
-            material = self.material_service.get_material_by_id(material_id)
+            with self.instrumentation.scope("gui.MainWindow.context_menu"):
+                material = self.material_service.get_material_by_id(material_id)
 
             menu = tk.Menu(self.root, tearoff=0)
             menu.add_command(label="Редактировать", command=lambda: self.on_material_double_click(None))
@@ -8,6 +8,8 @@ class MaterialDialog:
         self.dialog = tk.Toplevel(parent)
         self.material_service = material_service
         self.material = material
+        # ID сохраненного материала (None, если окно закрыто без сохранения)
+        self.saved_material_id = None
 
         # Настройка шрифта для диалогового окна
         self.configure_fonts()
@@ -127,9 +129,12 @@ class MaterialDialog:
 
             # Сохранение материала
             if self.material:
-                self.material_service.update_material(self.material.id, material_data)
+                if self.material_service.update_material(self.material.id, material_data):
+                    self.saved_material_id = self.material.id
             else:
-                self.material_service.add_material(material_data)
+                material = self.material_service.add_material(material_data)
+                if material:
+                    self.saved_material_id = material.id
 
             self.dialog.destroy()
 
@@ -1,7 +1,10 @@
+import logging
 import tkinter as tk
 from tkinter import ttk
 
-from database.models import material_product
+from database.instrumentation import profiled
+
+logger = logging.getLogger(__name__)
 
 
 class ProductsWindow:
@@ -9,6 +12,7 @@ class ProductsWindow:
         self.window = tk.Toplevel(parent)
         self.material_service = material_service
         self.material = material
+        self.instrumentation = material_service.instrumentation
 
         # Настройка шрифта для окна продуктов
         self.configure_fonts()
@@ -63,33 +67,22 @@ class ProductsWindow:
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
+    @profiled("gui.ProductsWindow.load_products")
     def load_products(self):
         # Очистка таблицы
         for item in self.tree.get_children():
             self.tree.delete(item)
 
-        # Загрузка продукции
-        products = self.material_service.get_products_for_material(self.material.id)
-        print(f"Загружено продуктов для материала {self.material.name}: {len(products)}")
-
-        with self.material_service.db.get_session() as session:
-            for product in products:
-                print(f"Обработка продукта: {product.name}, ID: {product.id}")
-                # Получение количества материала для данной продукции
-                material_quantity = session.query(
-                    material_product.c.quantity
-                ).filter(
-                    material_product.c.material_id == self.material.id,
-                    material_product.c.product_id == product.id
-                ).scalar()
-
-                print(f"Количество материала для продукта {product.name}: {material_quantity}")
-
-                self.tree.insert("", tk.END, values=(
-                    product.id,
-                    product.name,
-                    product.article,
-                    product.type.name if product.type else "Не указан",
-                    f"{self.material_service.calculate_product_quantity(product.type.id, material_quantity, 1, 1):.2f}",
-                    f"{material_quantity:.2f} {self.material.unit}"
-                ))
\ No newline at end of file
+        # Продукция, количество материала и выпуск - одним запросом
+        usage = self.material_service.get_material_usage(self.material.id)
+        logger.debug(f"Загружено продуктов для материала {self.material.name}: {len(usage)}")
+
+        for row in usage:
+            self.tree.insert("", tk.END, values=(
+                row.product_id,
+                row.product_name,
+                row.article,
+                row.type_name if row.type_name else "Не указан",
+                f"{row.product_quantity:.2f}",
+                f"{row.material_quantity:.2f} {self.material.unit}"
+            ))
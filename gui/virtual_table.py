@@ -0,0 +1,266 @@
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import ttk
+
+
+class PagedRows:
+    """Постраничный доступ к строкам источника данных по номеру строки
+
+    fetch(offset, limit, cursor, count) возвращает (строки, всего, курсор
+    следующей страницы). cursor - курсор конца предыдущей страницы, если он
+    уже известен (тогда источник продолжает выборку по ключу, а не по OFFSET);
+    count - нужно ли считать общее число строк (только для первой загрузки).
+    В памяти хранится не более max_pages последних использованных страниц.
+    key(строка) - идентификатор строки (по умолчанию первая колонка).
+    """
+
+    def __init__(self, fetch, page_size: int = 200, max_pages: int = 10, key=None):
+        self.fetch = fetch
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.key = key or (lambda row: row[0])
+        self.reset()
+
+    def reset(self, first_page=None):
+        """Сброс загруженных страниц (после изменения фильтров или данных)
+
+        first_page - уже полученный результат fetch для первой страницы
+        (например, загруженный в фоновом потоке).
+        """
+        self.pages = OrderedDict()
+        self.cursors = {}  # номер страницы -> курсор конца предыдущей страницы
+        self.total = None
+        if first_page is not None:
+            self._store(0, *first_page)
+
+    def count(self) -> int:
+        """Общее число строк"""
+        if self.total is None:
+            self._load(0)
+        return self.total
+
+    def row(self, index: int):
+        """Строка по номеру; None за пределами данных"""
+        page_number, position = divmod(index, self.page_size)
+        page = self.pages.get(page_number)
+        if page is None:
+            page = self._load(page_number)
+        else:
+            self.pages.move_to_end(page_number)
+        return page[position] if position < len(page) else None
+
+    def replace(self, key, row) -> bool:
+        """Замена строки с идентификатором key в загруженных страницах"""
+        for page in self.pages.values():
+            for i, current in enumerate(page):
+                if self.key(current) == key:
+                    page[i] = row
+                    return True
+        return False
+
+    def _load(self, page_number: int) -> list:
+        rows, total, next_cursor = self.fetch(page_number * self.page_size, self.page_size,
+                                              self.cursors.get(page_number), self.total is None)
+        return self._store(page_number, rows, total, next_cursor)
+
+    def _store(self, page_number: int, rows: list, total, next_cursor) -> list:
+        if total is not None:
+            self.total = total
+        if next_cursor is not None:
+            self.cursors[page_number + 1] = next_cursor
+        self.pages[page_number] = rows
+        while len(self.pages) > self.max_pages:
+            self.pages.popitem(last=False)
+        return rows
+
+
+class VirtualTable:
+    """Таблица с виртуальной прокруткой
+
+    В Treeview находятся только строки, видимые на экране; при прокрутке
+    их значения заменяются строками источника PagedRows. Щелчок по заголовку
+    сортируемой колонки вызывает on_sort(колонка, по_убыванию) - сортировка
+    выполняется источником данных.
+    """
+
+    # Стрелки направления сортировки в заголовках
+    SORT_MARKS = {False: " ▲", True: " ▼"}
+
+    def __init__(self, parent, columns: dict, sortable=(), on_sort=None, style: str = "Treeview"):
+        self.columns = columns
+        self.sortable = set(sortable)
+        self.on_sort = on_sort
+        self.style = style
+
+        self.rows = None
+        self.top = 0  # номер первой видимой строки
+        self.visible = 1  # число строк, помещающихся в окне
+        self.selected_index = None  # номер выбранной строки в источнике
+        self.sort_column = None
+        self.sort_descending = False
+        self.shown_values = {}  # элемент Treeview -> показанные значения
+        self.items_by_key = {}  # идентификатор строки -> элемент Treeview
+
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=tuple(columns), show="headings",
+                                 selectmode="browse", style=style)
+        for column, text in columns.items():
+            if column in self.sortable:
+                self.tree.heading(column, text=text, command=lambda c=column: self.toggle_sort(c))
+            else:
+                self.tree.heading(column, text=text)
+
+        # Скроллбар управляет номером первой строки, а не прокруткой Treeview
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # Привязка событий
+        self.tree.bind("<Configure>", self.on_configure)
+        self.tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        for key, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page"),
+                          ("<Home>", "home"), ("<End>", "end")):
+            self.tree.bind(key, lambda event, s=step: self.move_selection(s))
+
+    def set_rows(self, rows: PagedRows, first_page=None):
+        """Подключение источника строк и отображение с начала"""
+        self.rows = rows
+        self.refresh(to_start=True, first_page=first_page)
+
+    def refresh(self, to_start: bool = False, first_page=None):
+        """Перезагрузка данных источника (с сохранением позиции или с начала)"""
+        if self.rows is None:
+            return
+        self.rows.reset(first_page)
+        if to_start:
+            self.top = 0
+            self.selected_index = None
+        self.scroll_to(self.top)
+
+    def count(self) -> int:
+        return self.rows.count() if self.rows is not None else 0
+
+    def scroll_to(self, top: int):
+        """Прокрутка к строке с номером top"""
+        self.top = max(0, min(top, self.count() - self.visible))
+        self.render()
+
+    def scroll(self, rows: int):
+        self.scroll_to(self.top + rows)
+        return "break"
+
+    def render(self):
+        """Заполнение видимых строк Treeview значениями из источника"""
+        total = self.count()
+        shown = max(0, min(self.visible, total - self.top))
+        items = self.tree.get_children()
+
+        # Число элементов Treeview равно числу видимых строк
+        for item in items[shown:]:
+            self.tree.delete(item)
+            self.shown_values.pop(item, None)
+        for i in range(len(items), shown):
+            self.tree.insert("", tk.END, iid=f"row{i}")
+
+        # Обновляются только элементы, значения которых изменились
+        self.items_by_key = {}
+        for i in range(shown):
+            item = f"row{i}"
+            values = self.rows.row(self.top + i)
+            values = values if values is not None else ()
+            if self.shown_values.get(item) != values:
+                self.tree.item(item, values=values)
+                self.shown_values[item] = values
+            if values:
+                self.items_by_key[self.rows.key(values)] = item
+
+        if self.selected_index is not None and self.top <= self.selected_index < self.top + shown:
+            item = f"row{self.selected_index - self.top}"
+            if self.tree.selection() != (item,):
+                self.tree.selection_set(item)
+            self.tree.focus(item)
+        elif self.tree.selection():
+            self.tree.selection_set(())
+
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + shown) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def update_row(self, key, values) -> bool:
+        """Замена одной строки без перезагрузки источника
+
+        Возвращает False, если строки нет среди загруженных страниц
+        (тогда она будет прочитана заново при прокрутке к ней).
+        """
+        if self.rows is None or not self.rows.replace(key, values):
+            return False
+        item = self.items_by_key.get(key)
+        if item is not None and self.shown_values.get(item) != values:
+            self.tree.item(item, values=values)
+            self.shown_values[item] = values
+        return True
+
+    def on_configure(self, event):
+        """Пересчет числа видимых строк при изменении размера"""
+        row_height = int(ttk.Style().lookup(self.style, "rowheight") or 20)
+        # Одна строка занята заголовками
+        visible = max(1, event.height // row_height - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.scroll_to(self.top)
+
+    def on_scrollbar(self, action, *args):
+        """Обработка команд скроллбара (moveto/scroll)"""
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * self.count()))
+        elif action == "scroll":
+            amount, unit = int(args[0]), args[1]
+            self.scroll(amount * (self.visible if unit == "pages" else 1))
+
+    def on_mouse_wheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def on_select(self, event):
+        """Запоминание номера выбранной строки в источнике"""
+        selection = self.tree.selection()
+        if selection:
+            self.selected_index = self.top + self.tree.index(selection[0])
+
+    def move_selection(self, step):
+        """Перемещение выделения клавиатурой с прокруткой"""
+        total = self.count()
+        if not total:
+            return "break"
+        current = self.selected_index if self.selected_index is not None else self.top
+        if step == "home":
+            index = 0
+        elif step == "end":
+            index = total - 1
+        elif step in ("page", "-page"):
+            index = current + (self.visible if step == "page" else -self.visible)
+        else:
+            index = current + step
+        self.selected_index = max(0, min(index, total - 1))
+
+        if self.selected_index < self.top:
+            self.top = self.selected_index
+        elif self.selected_index >= self.top + self.visible:
+            self.top = self.selected_index - self.visible + 1
+        self.render()
+        return "break"
+
+    def toggle_sort(self, column):
+        """Смена сортировки по колонке: по возрастанию, затем по убыванию"""
+        if self.sort_column == column:
+            self.sort_descending = not self.sort_descending
+        else:
+            if self.sort_column is not None:
+                self.tree.heading(self.sort_column, text=self.columns[self.sort_column])
+            self.sort_column, self.sort_descending = column, False
+        self.tree.heading(column, text=self.columns[column] + self.SORT_MARKS[self.sort_descending])
+        if self.on_sort:
+            self.on_sort(column, self.sort_descending)
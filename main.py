@@ -1,35 +1,55 @@
+import argparse
+import logging
 import os
 import tkinter as tk
 
 from business.material_service import MaterialService
 from database.database import Database
+from database.instrumentation import configure_logging
 from database.load_data import load_all_data
+from database.migrations import upgrade
 from gui.main_window import MainWindow
 
+logger = logging.getLogger(__name__)
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Система учета материалов")
+    parser.add_argument("--log-level", default="INFO",
+                        help="уровень журнала (DEBUG выводит каждый запрос и каждую строку импорта)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="собирать профиль запросов и записать отчет при выходе (.json или текст)")
+    args = parser.parse_args()
+    configure_logging(args.log_level.upper())
+
     # Проверка существует ли база данных
     if not os.path.exists("materials.db"):
-        print("База данных не найдена. Начинаем загрузку данных...")
-        load_all_data()
+        logger.info("База данных не найдена. Начинаем загрузку данных...")
+        load_all_data(parallel=True)
 
     # Инициализация базы данных
     db = Database()
-    print("База данных инициализирована")
+    upgrade(db)  # Обновление схемы существующей базы данных
+    db.instrumentation.enabled = bool(args.profile)
+    logger.info("База данных инициализирована")
 
     # Создание сервиса для работы с материалами
     material_service = MaterialService(db)
-    print("Сервис материалов создан")
+    logger.info("Сервис материалов создан")
 
     # Создание главного окна
     root = tk.Tk()
     app = MainWindow(root, material_service)
-    print("Главное окно создано")
+    logger.info("Главное окно создано")
 
     # Запуск главного цикла приложения
     root.app = app
     root.mainloop()
 
+    if args.profile:
+        db.instrumentation.export(args.profile)
+        logger.info(f"Профиль записан в {args.profile}")
+
 # Точка входа в программу
 if __name__ == "__main__":
     main()
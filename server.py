@@ -0,0 +1,395 @@
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from business.material_service import MATERIAL_SORT_KEYS, MaterialService
+from database.database import Database
+from database.instrumentation import configure_logging
+from database.migrations import upgrade
+
+logger = logging.getLogger(__name__)
+
+# Ответы меньше этого размера не сжимаются: gzip не окупается
+GZIP_MIN_SIZE = 1024
+
+
+class APIError(Exception):
+    """Ошибка запроса с кодом ответа HTTP"""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def material_to_dict(material) -> dict:
+    """Материал в виде словаря для JSON"""
+    return {
+        "id": material.id,
+        "type": material.type.name if material.type else None,
+        "name": material.name,
+        "price": material.price,
+        "unit": material.unit,
+        "package_quantity": material.package_quantity,
+        "stock_quantity": material.stock_quantity,
+        "min_quantity": material.min_quantity,
+    }
+
+
+def product_to_dict(product) -> dict:
+    """Продукция в виде словаря для JSON"""
+    return {
+        "id": product.id,
+        "type": product.type.name if product.type else None,
+        "name": product.name,
+        "article": product.article,
+        "min_partner_price": product.min_partner_price,
+        "quantity": product.quantity,
+    }
+
+
+def _json_value(value):
+    """Замена inf и NaN (недопустимых в JSON) на null"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_value(item) for item in value]
+    return value
+
+
+class WorkerPoolHTTPServer(HTTPServer):
+    """HTTP-сервер, обрабатывающий соединения в пуле из workers потоков
+
+    В отличие от ThreadingHTTPServer число потоков ограничено: при
+    нагрузке новые соединения ждут в очереди пула, а не создают потоки.
+    """
+
+    def __init__(self, address, service: MaterialService, workers: int = 8):
+        super().__init__(address, APIRequestHandler)
+        self.service = service
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    """Обработчик HTTP/JSON API над MaterialService
+
+    GET-ответы получают ETag (хэш тела); при совпадении If-None-Match
+    возвращается 304 без тела. Ответы сжимаются gzip, если клиент его
+    принимает.
+    """
+
+    protocol_version = "HTTP/1.1"  # постоянные соединения
+    timeout = 30  # чтение начатого запроса
+    # Ожидание следующего запроса постоянного соединения занимает поток пула:
+    # простаивающее дольше этого соединение закрывается, освобождая поток
+    IDLE_TIMEOUT = 1.0
+    # Заголовки и тело уходят отдельными записями: с алгоритмом Нейгла второй пакет
+    # ждал бы подтверждения первого (задержка ~40 мс на каждый ответ)
+    disable_nagle_algorithm = True
+
+    # (метод, шаблон пути, имя метода обработчика)
+    ROUTES = [
+        ("GET", r"/materials", "list_materials"),
+        ("POST", r"/materials", "create_material"),
+        ("GET", r"/materials/(\d+)", "get_material"),
+        ("PUT", r"/materials/(\d+)", "update_material"),
+        ("GET", r"/materials/(\d+)/products", "material_products"),
+        ("PUT", r"/materials/(\d+)/products/(\d+)", "set_link"),
+        ("DELETE", r"/materials/(\d+)/products/(\d+)", "remove_link"),
+        ("GET", r"/materials/(\d+)/requirement", "material_requirement"),
+        ("GET", r"/material-types", "list_material_types"),
+        ("GET", r"/requirements", "list_requirements"),
+        ("GET", r"/products", "search_products"),
+        ("GET", r"/capacity", "production_capacity"),
+        ("GET", r"/product-quantity", "product_quantity"),
+        ("GET", r"/profile", "profile"),
+    ]
+    _ROUTES = [(method, re.compile(pattern + "$"), name) for method, pattern, name in ROUTES]
+
+    @property
+    def service(self) -> MaterialService:
+        return self.server.service
+
+    def handle_one_request(self):
+        self.connection.settimeout(self.IDLE_TIMEOUT)
+        super().handle_one_request()
+
+    def parse_request(self):
+        # Строка запроса получена: остальное читается с обычным таймаутом
+        self.connection.settimeout(self.timeout)
+        return super().parse_request()
+
+    def log_message(self, format, *args):
+        pass  # журнал каждого запроса замедляет сервер под нагрузкой
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method: str):
+        """Поиск обработчика по пути и отправка ответа"""
+        url = urlsplit(self.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        # Тело читается сразу: непрочитанное тело сломало бы следующий запрос постоянного соединения
+        self.body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            allowed = False
+            for route_method, pattern, name in self._ROUTES:
+                match = pattern.match(url.path)
+                if not match:
+                    continue
+                allowed = True
+                if route_method == method:
+                    with self.service.instrumentation.scope(f"http.{name}"):
+                        status, payload = getattr(self, name)(*(int(group) for group in match.groups()))
+                    break
+            else:
+                if allowed:
+                    raise APIError(HTTPStatus.METHOD_NOT_ALLOWED, "Метод не поддерживается")
+                raise APIError(HTTPStatus.NOT_FOUND, "Неизвестный путь")
+        except APIError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            logger.exception(f"Ошибка при обработке запроса {method} {self.path}: {e}")
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Внутренняя ошибка сервера"}
+        self.send_json(status, payload, conditional=(method == "GET" and status == HTTPStatus.OK))
+
+    def send_json(self, status: HTTPStatus, payload, conditional: bool = False):
+        """Отправка JSON с ETag и сжатием"""
+        body = json.dumps(_json_value(payload), ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json; charset=utf-8", "Vary": "Accept-Encoding"}
+        if conditional:
+            etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+            headers["ETag"] = etag
+            if etag in (self.headers.get("If-None-Match") or ""):
+                status, body = HTTPStatus.NOT_MODIFIED, b""
+        if len(body) >= GZIP_MIN_SIZE and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.wfile.write(body)
+
+    def read_json(self) -> dict:
+        """Тело запроса в JSON"""
+        try:
+            data = json.loads(self.body or b"{}")
+        except ValueError:
+            raise APIError(HTTPStatus.BAD_REQUEST, "Тело запроса не является JSON")
+        if not isinstance(data, dict):
+            raise APIError(HTTPStatus.BAD_REQUEST, "Ожидается объект JSON")
+        return data
+
+    def param(self, name: str, convert=str, default=None):
+        """Параметр строки запроса с преобразованием типа"""
+        value = self.query.get(name)
+        if value is None or value == "":
+            return default
+        try:
+            return convert(value)
+        except ValueError:
+            raise APIError(HTTPStatus.BAD_REQUEST, f"Некорректное значение параметра {name}")
+
+    def material_cursor(self):
+        """Курсор страницы материалов: JSON-массив [значение сортировки, id]"""
+        cursor = self.param("cursor", json.loads)
+        if cursor is None:
+            return None
+        valid = (isinstance(cursor, list) and len(cursor) == 2
+                 and isinstance(cursor[0], (str, int, float)) and not isinstance(cursor[0], bool)
+                 and isinstance(cursor[1], int) and not isinstance(cursor[1], bool))
+        if not valid:
+            raise APIError(HTTPStatus.BAD_REQUEST, "Некорректное значение параметра cursor")
+        return tuple(cursor)
+
+    def material_data(self) -> dict:
+        """Данные материала из тела запроса в формате MaterialService.add_material"""
+        data = self.read_json()
+        try:
+            material_data = {'type_name': data['type'], 'name': data['name'], 'unit': data['unit']}
+            for field in ('price', 'package_quantity', 'stock_quantity', 'min_quantity'):
+                material_data[field] = None if data.get(field) is None else float(data[field])
+        except KeyError as e:
+            raise APIError(HTTPStatus.BAD_REQUEST, f"Не указано поле {e.args[0]}")
+        except (TypeError, ValueError):
+            raise APIError(HTTPStatus.BAD_REQUEST, "Некорректное числовое значение")
+        return material_data
+
+    # Материалы
+
+    def list_materials(self):
+        order_by = self.param("order_by", default="id")
+        if order_by.lstrip("-") not in MATERIAL_SORT_KEYS:
+            raise APIError(HTTPStatus.BAD_REQUEST, f"Неизвестная сортировка {order_by}")
+        limit = self.param("limit", int, 100)
+        if limit < 1:
+            raise APIError(HTTPStatus.BAD_REQUEST, "Некорректное значение параметра limit")
+        page = self.service.search_materials(
+            name_substr=self.param("name"), type_name=self.param("type"),
+            min_stock=self.param("min_stock", float), max_stock=self.param("max_stock", float),
+            order_by=order_by, limit=min(limit, 1000),
+            cursor=self.material_cursor(), offset=self.param("offset", int, 0),
+            count_total=self.param("count", int, 1) != 0,
+        )
+        return HTTPStatus.OK, {
+            "materials": [material_to_dict(material) for material in page.materials],
+            "total": page.total,
+            "next_cursor": page.next_cursor,
+        }
+
+    def get_material(self, material_id):
+        material = self.service.get_material_by_id(material_id)
+        if material is None:
+            raise APIError(HTTPStatus.NOT_FOUND, "Материал не найден")
+        return HTTPStatus.OK, material_to_dict(material)
+
+    def create_material(self):
+        try:
+            material = self.service.add_material(self.material_data())
+        except ValueError as e:
+            raise APIError(HTTPStatus.BAD_REQUEST, str(e))
+        if material is None:
+            raise APIError(HTTPStatus.CONFLICT, "Материал не сохранен")
+        return HTTPStatus.CREATED, material_to_dict(self.service.get_material_by_id(material.id))
+
+    def update_material(self, material_id):
+        try:
+            material = self.service.update_material(material_id, self.material_data())
+        except ValueError as e:
+            raise APIError(HTTPStatus.BAD_REQUEST, str(e))
+        if material is None:
+            raise APIError(HTTPStatus.NOT_FOUND, "Материал не найден или не сохранен")
+        return HTTPStatus.OK, material_to_dict(self.service.get_material_by_id(material_id))
+
+    def list_material_types(self):
+        return HTTPStatus.OK, [{"id": material_type.id, "name": material_type.name}
+                               for material_type in self.service.get_all_material_types()]
+
+    # Связи с продукцией и расчеты
+
+    def material_products(self, material_id):
+        return HTTPStatus.OK, [usage._asdict() for usage in self.service.get_material_usage(material_id)]
+
+    def set_link(self, material_id, product_id):
+        quantity = self.read_json().get("quantity")
+        if quantity is not None and (not isinstance(quantity, (int, float)) or isinstance(quantity, bool)):
+            raise APIError(HTTPStatus.BAD_REQUEST, "Некорректное количество")
+        try:
+            saved = self.service.set_material_link(material_id, product_id, quantity)
+        except ValueError as e:
+            raise APIError(HTTPStatus.NOT_FOUND, str(e))
+        if not saved:
+            raise APIError(HTTPStatus.CONFLICT, "Связь не сохранена")
+        return HTTPStatus.OK, {"material_id": material_id, "product_id": product_id, "quantity": quantity}
+
+    def remove_link(self, material_id, product_id):
+        if not self.service.remove_material_link(material_id, product_id):
+            raise APIError(HTTPStatus.CONFLICT, "Связь не удалена")
+        return HTTPStatus.OK, {"material_id": material_id, "product_id": product_id}
+
+    def material_requirement(self, material_id):
+        requirement = self.service.get_material_requirement(material_id)
+        if requirement is None:
+            raise APIError(HTTPStatus.NOT_FOUND, "Материал не найден")
+        return HTTPStatus.OK, requirement._asdict()
+
+    def list_requirements(self):
+        ids = self.param("ids", lambda value: [int(item) for item in value.split(",") if item])
+        requirements = self.service.get_material_requirements(ids)
+        return HTTPStatus.OK, [requirement._asdict() for requirement in requirements.values()]
+
+    def search_products(self):
+        products = self.service.search_products(self.param("q", default=""),
+                                                limit=min(self.param("limit", int, 20), 1000),
+                                                prefix=self.param("prefix", int, 0) != 0)
+        return HTTPStatus.OK, [product_to_dict(product) for product in products]
+
+    def production_capacity(self):
+        capacity = self.service.get_production_capacity()
+        if capacity is None:
+            raise APIError(HTTPStatus.SERVICE_UNAVAILABLE, "Расчет выпуска недоступен")
+        return HTTPStatus.OK, [item._asdict() for item in capacity.capacities()]
+
+    def product_quantity(self):
+        arguments = [self.param(name, convert) for name, convert in (
+            ("product_type_id", int), ("material_quantity", float), ("param1", float), ("param2", float))]
+        if None in arguments:
+            raise APIError(HTTPStatus.BAD_REQUEST,
+                           "Нужны параметры product_type_id, material_quantity, param1, param2")
+        return HTTPStatus.OK, {"quantity": self.service.calculate_product_quantity(*arguments)}
+
+    def profile(self):
+        instrumentation = self.service.instrumentation
+        if not instrumentation.enabled:
+            raise APIError(HTTPStatus.NOT_FOUND, "Профилирование выключено (запустите сервер с --profile)")
+        return HTTPStatus.OK, instrumentation.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON API сервиса материалов")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=8, help="число потоков обработки запросов")
+    parser.add_argument("--db", default="sqlite:///materials.db", help="URL базы данных SQLAlchemy")
+    parser.add_argument("--log-level", default="INFO", help="уровень журнала (DEBUG выводит каждый запрос SQL)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="собирать профиль (доступен по GET /profile) и записать отчет при остановке")
+    args = parser.parse_args()
+    configure_logging(args.log_level.upper())
+
+    db = Database(args.db)
+    upgrade(db)  # Обновление схемы существующей базы данных
+    db.instrumentation.enabled = bool(args.profile)
+    server = WorkerPoolHTTPServer((args.host, args.port), MaterialService(db), workers=args.workers)
+    logger.info(f"Сервер запущен: http://{args.host}:{args.port} (потоков: {args.workers})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.profile:
+            db.instrumentation.export(args.profile)
+            logger.info(f"Профиль записан в {args.profile}")
+
+
+if __name__ == "__main__":
+    main()
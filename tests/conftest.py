@@ -0,0 +1,75 @@
+"""Общие фикстуры тестов: базы данных из генератора и подсчет SQL-запросов"""
+import shutil
+import sqlite3
+from collections import namedtuple
+
+import pytest
+
+from business.material_service import MaterialService
+from database.database import Database
+from database.instrumentation import SESSION
+from tools.generate_data import Scale, build_database, generate_frames
+
+# Две базы одной структуры: во второй больше материалов, продукции и связей на материал,
+# поэтому число запросов, растущее с числом строк, в ней будет другим
+FIXTURE_SCALES = {
+    "small": Scale(4, 50, 3, 40, 200),
+    "large": Scale(6, 200, 4, 200, 4000),
+}
+
+# База для теста: путь, материал с наибольшим числом связей и одна из его продукций
+FixtureDatabase = namedtuple('FixtureDatabase', ['name', 'path', 'material_id', 'product_id', 'links'])
+
+
+@pytest.fixture(scope="session")
+def fixture_databases(tmp_path_factory):
+    databases = {}
+    for name, scale in FIXTURE_SCALES.items():
+        path = str(tmp_path_factory.mktemp(name) / "materials.db")
+        build_database(generate_frames(scale, seed=1), path).engine.dispose()
+        with sqlite3.connect(path) as conn:
+            material_id, links = conn.execute(
+                "SELECT material_id, COUNT(*) FROM material_product "
+                "GROUP BY material_id ORDER BY COUNT(*) DESC, material_id LIMIT 1"
+            ).fetchone()
+            product_id = conn.execute("SELECT MIN(product_id) FROM material_product WHERE material_id = ?",
+                                      (material_id,)).fetchone()[0]
+        databases[name] = FixtureDatabase(name, path, material_id, product_id, links)
+    return databases
+
+
+@pytest.fixture(params=sorted(FIXTURE_SCALES))
+def fixture_database(request, fixture_databases):
+    return fixture_databases[request.param]
+
+
+def open_service(database: FixtureDatabase, tmp_path=None) -> MaterialService:
+    """Новый сервис с пустым кэшем; при tmp_path - над копией базы (для записи)"""
+    path = database.path
+    if tmp_path is not None:
+        path = str(tmp_path / f"{database.name}.db")
+        shutil.copyfile(database.path, path)
+    return MaterialService(Database(f"sqlite:///{path}"))
+
+
+def count_statements(service: MaterialService, call) -> int:
+    """Число SQL-запросов, выполненных при call()"""
+    instrumentation = service.db.instrumentation
+    instrumentation.reset()
+    instrumentation.enabled = True
+    try:
+        call()
+    finally:
+        instrumentation.enabled = False
+    return next(profile.statements for profile in instrumentation.scopes() if profile.name == SESSION)
+
+
+def required_quantities(path) -> dict:
+    """Потребность в материалах, посчитанная SQL по material_product и products"""
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("""
+            SELECT m.id, COALESCE(SUM(mp.quantity * p.quantity), 0) FROM materials m
+            LEFT JOIN material_product mp ON mp.material_id = m.id
+            LEFT JOIN products p ON p.id = mp.product_id
+            GROUP BY m.id
+        """).fetchall())
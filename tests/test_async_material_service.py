@@ -0,0 +1,75 @@
+"""Асинхронный сервис (business/async_material_service.py) при одновременных вызовах"""
+import asyncio
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+from business.async_material_service import AsyncMaterialService
+from business.bom_graph import BomGraph
+from database.async_database import AsyncDatabase
+from database.database import Database
+from tests.conftest import open_service, required_quantities
+
+pytest.importorskip("aiosqlite")
+
+
+async def _mixed_calls(service, material_ids, product_ids, type_name, rng):
+    """Чтения и записи, запущенные одновременно через asyncio.gather"""
+    calls = []
+    for step in range(200):
+        material_id, product_id = rng.choice(material_ids), rng.choice(product_ids)
+        action = rng.randrange(8)
+        if action == 0:
+            calls.append(service.set_material_link(material_id, product_id, rng.uniform(0.1, 20)))
+        elif action == 1:
+            calls.append(service.remove_material_link(material_id, product_id))
+        elif action == 2:
+            calls.append(service.add_material({
+                "name": f"Новый материал {step}", "type_name": type_name, "price": 1.0, "unit": "шт",
+                "package_quantity": 1.0, "stock_quantity": 0.0, "min_quantity": 0.0,
+            }))
+        elif action == 3:
+            calls.append(service.calculate_required_quantities())
+        elif action == 4:
+            calls.append(service.product_quantities())
+        elif action == 5:
+            calls.append(service.get_material_usage(material_id))
+        elif action == 6:
+            calls.append(service.calculate_product_quantities([1, 2], [100.0, 50.0], 1.5, 2.0))
+        else:
+            calls.append(service.get_products_for_material(material_id))
+    return await asyncio.gather(*calls)
+
+
+def test_concurrent_reads_and_writes_keep_graph_consistent(fixture_databases, tmp_path):
+    # Копия базы готовится синхронным сервисом
+    sync_service = open_service(fixture_databases["small"], tmp_path)
+    path = tmp_path / "small.db"
+    type_name = sync_service.get_all_material_types()[0].name
+    sync_service.db.engine.dispose()
+    with sqlite3.connect(path) as conn:
+        material_ids = [row[0] for row in conn.execute("SELECT id FROM materials")]
+        product_ids = [row[0] for row in conn.execute("SELECT id FROM products")]
+
+    async def run():
+        service = AsyncMaterialService(AsyncDatabase(f"sqlite+aiosqlite:///{path}"))
+        try:
+            graph = await service.bom_graph()
+            results = await _mixed_calls(service, material_ids, product_ids, type_name, random.Random(1))
+            assert await service.bom_graph() is graph
+            return results, await service.calculate_required_quantities(), graph
+        finally:
+            await service.close()
+
+    results, required, graph = asyncio.run(run())
+    assert all(result is not None for result in results)
+    expected = required_quantities(path)
+    assert required.keys() == expected.keys()
+    for material_id, quantity in expected.items():
+        assert required[material_id] == pytest.approx(quantity)
+
+    fresh = BomGraph.from_database(Database(f"sqlite:///{path}"))
+    for actual, rebuilt in zip(graph.links(), fresh.links()):
+        np.testing.assert_array_equal(actual, rebuilt)
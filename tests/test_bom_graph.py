@@ -0,0 +1,75 @@
+"""Спецификация в памяти (business/bom_graph.py) при изменениях через сервис"""
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+from business.bom_graph import BomGraph
+from tests.conftest import open_service, required_quantities
+
+# Маленький порог, чтобы список изменений вливался в массивы много раз за тест
+MERGE_THRESHOLD = 15
+MUTATIONS = 600
+CHECK_EVERY = 25
+
+
+def _links(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT material_id, product_id, quantity FROM material_product").fetchall()
+
+
+def _assert_neighbours(graph, path, material_id):
+    """products_of по массивам и списку изменений совпадает с material_product"""
+    expected = sorted((product_id, quantity) for m, product_id, quantity in _links(path) if m == material_id)
+    product_ids, quantities = graph.products_of(material_id)
+    assert product_ids.tolist() == [product_id for product_id, _ in expected]
+    np.testing.assert_array_equal(quantities, [np.nan if q is None else q for _, q in expected])
+
+
+def test_in_place_updates_match_database(fixture_databases, tmp_path, monkeypatch):
+    monkeypatch.setattr(BomGraph, "MERGE_THRESHOLD", MERGE_THRESHOLD)
+    service = open_service(fixture_databases["small"], tmp_path)
+    path = tmp_path / "small.db"
+    graph = service.bom_graph()
+    type_name = service.get_all_material_types()[0].name
+    with sqlite3.connect(path) as conn:
+        material_ids = [row[0] for row in conn.execute("SELECT id FROM materials")]
+        product_ids = [row[0] for row in conn.execute("SELECT id FROM products")]
+
+    rng = random.Random(1)
+    for step in range(MUTATIONS):
+        action = rng.random()
+        links = _links(path)
+        if action < 0.3 and links:
+            # Изменение количества существующей связи (на месте)
+            material_id, product_id, _ = rng.choice(links)
+            service.set_material_link(material_id, product_id, rng.choice([None, rng.uniform(0.1, 20)]))
+        elif action < 0.6:
+            service.set_material_link(rng.choice(material_ids), rng.choice(product_ids), rng.uniform(0.1, 20))
+        elif action < 0.9 and links:
+            material_id, product_id, _ = rng.choice(links)
+            service.remove_material_link(material_id, product_id)
+        else:
+            material = service.add_material({
+                "name": f"Новый материал {step}", "type_name": type_name, "price": 1.0, "unit": "шт",
+                "package_quantity": 1.0, "stock_quantity": 0.0, "min_quantity": 0.0,
+            })
+            material_ids.append(material.id)
+
+        assert len(graph._changes) <= MERGE_THRESHOLD
+        if step % CHECK_EVERY == CHECK_EVERY - 1:
+            _assert_neighbours(graph, path, rng.choice(material_ids))
+
+    # Граф не перестраивался: все изменения применены на месте
+    assert service.bom_graph() is graph
+    required = service.calculate_required_quantities()
+    expected = required_quantities(path)
+    assert required.keys() == expected.keys()
+    for material_id, quantity in expected.items():
+        assert required[material_id] == pytest.approx(quantity)
+
+    fresh = BomGraph.from_database(service.db)
+    np.testing.assert_array_equal(graph.material_ids, fresh.material_ids)
+    for actual, rebuilt in zip(graph.links(), fresh.links()):
+        np.testing.assert_array_equal(actual, rebuilt)
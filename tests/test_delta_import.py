@@ -0,0 +1,56 @@
+"""Инкрементальная загрузка (database/delta_import.py) из файлов генератора"""
+import sqlite3
+
+from database.database import Database
+from database.delta_import import incremental_import
+from database.load_data import MATERIAL_TYPES_FILE, MATERIALS_FILE, PRODUCT_TYPES_FILE, PRODUCTS_FILE
+from tools.generate_data import SCALES, generate_frames, write_workbooks
+
+
+def _counts(path):
+    with sqlite3.connect(path) as conn:
+        return tuple(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                     for table in ("materials", "products", "material_product"))
+
+
+def test_rows_skipped_for_unknown_type_load_when_type_appears(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    frames = generate_frames(SCALES["sample"], seed=1)
+    full = dict(frames)
+    # Первые типы материалов и продукции отсутствуют: их строки пропускаются
+    frames[MATERIAL_TYPES_FILE] = frames[MATERIAL_TYPES_FILE].iloc[1:]
+    frames[PRODUCT_TYPES_FILE] = frames[PRODUCT_TYPES_FILE].iloc[1:]
+    write_workbooks(frames, str(tmp_path))
+
+    path = str(tmp_path / "materials.db")
+    db = Database(f"sqlite:///{path}", config="incremental_import")
+    incremental_import(db)
+    materials, products, _ = _counts(path)
+    assert materials < len(full[MATERIALS_FILE])
+    assert products < len(full[PRODUCTS_FILE])
+
+    # Типы вернулись, файлы материалов и продукции не изменились
+    write_workbooks({name: full[name] for name in (MATERIAL_TYPES_FILE, PRODUCT_TYPES_FILE)}, str(tmp_path))
+    incremental_import(db)
+    complete = Database(f"sqlite:///{tmp_path / 'complete.db'}", config="bulk_import")
+    # Эталон: полная загрузка тех же данных в новую базу
+    write_workbooks(full, str(tmp_path))
+    incremental_import(complete)
+    assert _counts(path) == _counts(str(tmp_path / "complete.db"))
+    assert _counts(path)[:2] == (len(full[MATERIALS_FILE]), len(full[PRODUCTS_FILE]))
+
+
+def test_default_database_commits_durably(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_workbooks(generate_frames(SCALES["sample"], seed=1), str(tmp_path))
+    databases = []
+
+    def open_database(**kwargs):
+        databases.append(Database(**kwargs))
+        return databases[-1]
+
+    monkeypatch.setattr("database.delta_import.Database", open_database)
+    incremental_import()
+    with databases[0].engine.connect() as conn:
+        # 0 - OFF, 1 - NORMAL, 2 - FULL
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() >= 1
@@ -0,0 +1,46 @@
+"""Загрузчики Excel (database/load_data.py) на файлах генератора"""
+import os
+import sqlite3
+
+import pytest
+
+from database.load_data import (
+    MATERIAL_TYPES_FILE, MATERIALS_FILE, PRODUCT_TYPES_FILE, PRODUCTS_FILE, MATERIAL_PRODUCTS_FILE,
+    load_material_product_relations, load_material_product_relations_staged, load_material_types, load_streaming
+)
+from tools.generate_data import SCALES, build_database, generate_frames, write_workbooks
+
+
+@pytest.fixture
+def workbooks(tmp_path):
+    frames = generate_frames(SCALES["sample"], seed=1)
+    write_workbooks(frames, str(tmp_path))
+    db = build_database(frames, str(tmp_path / "materials.db"),
+                        (MATERIAL_TYPES_FILE, MATERIALS_FILE, PRODUCT_TYPES_FILE, PRODUCTS_FILE))
+    return frames, db, tmp_path
+
+
+def test_streaming_relations_keep_every_chunk(workbooks):
+    frames, db, directory = workbooks
+    load_streaming(db, os.path.join(directory, MATERIAL_PRODUCTS_FILE), load_material_product_relations,
+                   chunk_size=10)
+    with sqlite3.connect(directory / "materials.db") as conn:
+        links = conn.execute("SELECT COUNT(*) FROM material_product").fetchone()[0]
+    assert links == len(frames[MATERIAL_PRODUCTS_FILE])
+
+
+def test_streaming_rejects_other_loaders(workbooks):
+    _, db, directory = workbooks
+    with pytest.raises(ValueError):
+        load_streaming(db, os.path.join(directory, MATERIAL_TYPES_FILE), load_material_types, chunk_size=10)
+
+
+@pytest.mark.parametrize("loader", [load_material_product_relations, load_material_product_relations_staged])
+def test_relation_loaders_keep_caller_frame(workbooks, loader):
+    frames, db, directory = workbooks
+    df = frames[MATERIAL_PRODUCTS_FILE]
+    columns = df.columns.tolist()
+    loader(db, os.path.join(directory, MATERIAL_PRODUCTS_FILE), df=df)
+    assert df.columns.tolist() == columns
+    with sqlite3.connect(directory / "materials.db") as conn:
+        assert conn.execute("SELECT COUNT(*) FROM material_product").fetchone()[0] == len(df)
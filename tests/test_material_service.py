@@ -0,0 +1,63 @@
+"""Методы MaterialService на базах из генератора"""
+import sqlite3
+
+import numpy as np
+import pytest
+
+from business.material_service import product_quantity
+from tests.conftest import open_service
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_search_materials_rejects_non_positive_limit(fixture_databases, limit):
+    service = open_service(fixture_databases["small"])
+    with pytest.raises(ValueError):
+        service.search_materials(limit=limit)
+
+
+def test_search_materials_last_page_has_no_cursor(fixture_databases):
+    service = open_service(fixture_databases["small"])
+    page = service.search_materials(limit=1000)
+    assert page.next_cursor is None
+    assert len(page.materials) == page.total
+
+
+def test_link_to_missing_material_or_product_is_not_written(fixture_databases, tmp_path):
+    database = fixture_databases["small"]
+    service = open_service(database, tmp_path)
+    with pytest.raises(ValueError):
+        service.set_material_link(99999, database.product_id, 2.0)
+    with pytest.raises(ValueError):
+        service.set_material_link(database.material_id, 99999, 2.0)
+    with sqlite3.connect(tmp_path / "small.db") as conn:
+        orphans = conn.execute("SELECT COUNT(*) FROM material_product WHERE material_id = 99999 "
+                               "OR product_id = 99999").fetchone()[0]
+    assert orphans == 0
+    assert service.calculate_required_quantity(99999) == 0
+    assert service.set_material_link(database.material_id, database.product_id, 2.0)
+
+
+def test_product_quantities_match_scalar_calculation(fixture_databases):
+    service = open_service(fixture_databases["small"])
+    rng = np.random.default_rng(1)
+    size = 500
+    type_count = len(service.product_type_coefficients())
+    # Неизвестные типы (в том числе отрицательные ID), неположительный расход и NaN
+    type_ids = rng.integers(-2, type_count + 3, size)
+    quantities = rng.choice([np.nan, 0.0, -5.0, 1.0, 250.5, 1e6], size)
+    param1 = rng.choice([np.nan, -1.0, 0.0, 0.5, 3.0], size)
+    param2 = rng.choice([np.nan, 0.0, 1.0, 2.5], size)
+
+    vector = service.calculate_product_quantities(type_ids, quantities, param1, param2)
+    scalar = [service.calculate_product_quantity(int(type_id), quantity, p1, p2)
+              for type_id, quantity, p1, p2 in zip(type_ids, quantities, param1, param2)]
+    np.testing.assert_array_equal(vector, np.array(scalar, dtype=float))
+    assert (vector == -1).any() and (vector > 0).any()
+
+
+@pytest.mark.parametrize("arguments", [
+    (None, 100.0, 1, 1), (1.0, None, 1, 1), (1.0, float("nan"), 1, 1), (1.0, 100.0, float("nan"), 1),
+    (1.0, 100.0, 0, 1), (1.0, 100.0, -1, 1), (0.0, 100.0, 1, 1),
+])
+def test_product_quantity_sentinel(arguments):
+    assert product_quantity(*arguments) == -1
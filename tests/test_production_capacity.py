@@ -0,0 +1,93 @@
+"""Расчет выпуска продукции (business/production_capacity.py) на небольших спецификациях"""
+import math
+
+import numpy as np
+import pytest
+
+from business.production_capacity import ProductionCapacity
+
+
+def capacity(stock: dict, links: list, product_ids=None) -> ProductionCapacity:
+    """stock - {ID материала: остаток}, links - [(ID материала, ID продукции, количество)]"""
+    if product_ids is None:
+        product_ids = sorted({product_id for _, product_id, _ in links})
+    return ProductionCapacity(list(stock), list(stock.values()), product_ids,
+                              [link[0] for link in links], [link[1] for link in links], [link[2] for link in links])
+
+
+def by_product(capacity: ProductionCapacity) -> dict:
+    return {item.product_id: item for item in capacity.capacities()}
+
+
+def test_bottleneck_is_the_scarcest_material():
+    # 10 / 2 = 5 единиц по материалу 1, 3 / 1 = 3 по материалу 2
+    result = by_product(capacity({1: 10.0, 2: 3.0}, [(1, 100, 2.0), (2, 100, 1.0)]))
+    assert result[100].quantity == 3
+    assert result[100].bottleneck_material_id == 2
+
+
+def test_floor_tolerates_rounding_error():
+    # 0.3 / 0.1 = 2.9999999999999996 в двоичной арифметике
+    result = by_product(capacity({1: 0.3}, [(1, 100, 0.1)]))
+    assert result[100].quantity == 3
+    assert capacity({1: 0.3}, [(1, 100, 0.1)]).allocate([(100, None)])[0].allocated == 3
+
+
+def test_partial_units_are_rounded_down():
+    assert by_product(capacity({1: 1.9}, [(1, 100, 1.0)]))[100].quantity == 1
+    assert by_product(capacity({1: 0.5}, [(1, 100, 1.0)]))[100].quantity == 0
+
+
+def test_products_without_links_are_unlimited():
+    # Связь с нулевым количеством не расходует материал
+    result = by_product(capacity({1: 5.0}, [(1, 100, 0.0)], product_ids=[100, 200]))
+    for product_id in (100, 200):
+        assert math.isinf(result[product_id].quantity)
+        assert result[product_id].bottleneck_material_id is None
+    allocation = capacity({1: 5.0}, [], product_ids=[200]).allocate([(200, None), (200, 7)])
+    assert [item.allocated for item in allocation] == [math.inf, 7.0]
+
+
+def test_unknown_and_missing_stock():
+    # Неизвестный или отрицательный остаток - ноль
+    result = by_product(capacity({1: None, 2: -4.0}, [(1, 100, 1.0), (2, 200, 1.0)]))
+    assert result[100].quantity == 0 and result[200].quantity == 0
+
+
+def test_allocate_unknown_product():
+    allocation = capacity({1: 10.0}, [(1, 100, 1.0)]).allocate([(999, 5), (100, None)])
+    assert allocation[0].allocated == 0 and allocation[0].bottleneck_material_id is None
+    assert allocation[1].allocated == 10
+
+
+def test_allocate_repeated_products_share_stock():
+    source = capacity({1: 10.0, 2: 100.0}, [(1, 100, 2.0), (2, 100, 1.0), (1, 200, 1.0)])
+    allocation = source.allocate([(100, 3), (100, None), (200, None), (100, None)])
+    # 3 единицы расходуют 6 из 10; остаток 4 дает еще 2 единицы; на 200 и третий запрос не остается
+    assert [item.allocated for item in allocation] == [3, 2, 0, 0]
+    assert allocation[1].bottleneck_material_id == 1
+    # Склад объекта не изменяется
+    assert source.allocate([(200, None)])[0].allocated == 10
+
+
+@pytest.mark.parametrize("requested", [-1, -0.5, float("nan")])
+def test_allocate_rejects_invalid_request(requested):
+    with pytest.raises(ValueError):
+        capacity({1: 10.0}, [(1, 100, 1.0)]).allocate([(100, 1), (100, requested)])
+
+
+def test_vector_limits_match_allocation():
+    rng = np.random.default_rng(1)
+    materials, products = 30, 40
+    links = {(int(m), int(p)): float(q) for m, p, q in zip(
+        rng.integers(1, materials + 1, 300), rng.integers(1, products + 1, 300),
+        rng.choice([0.0, 0.1, 0.25, 1.0, 3.0, 7.5], 300))}
+    stock = {material_id: float(value) for material_id, value in
+             zip(range(1, materials + 1), rng.choice([0.0, 0.3, 1.0, 12.5, 100.0], materials))}
+    source = capacity(stock, [(m, p, q) for (m, p), q in links.items()], product_ids=range(1, products + 1))
+    for item in source.capacities():
+        single = source.allocate([(item.product_id, None)])[0]
+        assert single.allocated == item.quantity
+        if math.isfinite(item.quantity):
+            # Ограничивающий материал - с минимальным отношением остаток / расход
+            assert single.bottleneck_material_id == item.bottleneck_material_id
@@ -0,0 +1,81 @@
+"""Бюджеты числа SQL-запросов для методов MaterialService и загрузки окон
+
+Каждый вызов выполняется на свежем сервисе (кэш пуст) над двумя базами
+разного размера. Тест падает, если запросов больше заявленного бюджета или
+если их число зависит от размера базы (признак N+1: запрос на строку).
+"""
+import pytest
+
+from tests.conftest import count_statements, open_service
+
+MATERIAL = {'type_name': "Дерево", 'name': "Проверка бюджета", 'price': 10.0, 'unit': "шт",
+            'package_quantity': 1.0, 'stock_quantity': 5.0, 'min_quantity': 1.0}
+
+
+def _next_page(service):
+    first = service.search_materials(order_by="price", limit=10)
+    return service.search_materials(order_by="price", cursor=first.next_cursor, limit=10)
+
+
+# (вызов, бюджет запросов, функция call(сервис, база))
+READ_BUDGETS = [
+    ("get_all_material_types", 1, lambda s, db: s.get_all_material_types()),
+    ("get_all_materials", 1, lambda s, db: s.get_all_materials()),
+    # Страница и общее число
+    ("search_materials", 2, lambda s, db: s.search_materials(limit=20)),
+    ("search_materials[name]", 3, lambda s, db: s.search_materials(name_substr="Материал", limit=20)),
+    ("search_materials[filters]", 2, lambda s, db: s.search_materials(type_name="Дерево", min_stock=10,
+                                                                     order_by="-price", limit=20)),
+    # Две страницы по курсору
+    ("search_materials[cursor]", 4, lambda s, db: _next_page(s)),
+    ("search_material_names", 2, lambda s, db: s.search_material_names("Материал")),
+    ("search_products", 2, lambda s, db: s.search_products("модель")),
+    ("get_material_by_id", 1, lambda s, db: s.get_material_by_id(db.material_id)),
+    # Граф связей (3 запроса) и количество продукции
+    ("calculate_required_quantity", 4, lambda s, db: s.calculate_required_quantity(db.material_id)),
+    ("calculate_required_quantities", 4, lambda s, db: s.calculate_required_quantities()),
+    ("get_material_requirement", 1, lambda s, db: s.get_material_requirement(db.material_id)),
+    ("get_material_requirements", 1, lambda s, db: s.get_material_requirements()),
+    ("get_products_for_material", 4, lambda s, db: s.get_products_for_material(db.material_id)),
+    ("get_material_usage", 1, lambda s, db: s.get_material_usage(db.material_id)),
+    ("product_type_coefficients", 1, lambda s, db: s.product_type_coefficients()),
+    ("calculate_product_quantity", 1, lambda s, db: s.calculate_product_quantity(1, 100.0, 2.0, 3.0)),
+    ("get_production_capacity", 4, lambda s, db: s.get_production_capacity()),
+    ("bom_graph", 3, lambda s, db: s.bom_graph()),
+]
+
+WRITE_BUDGETS = [
+    ("add_material", 3, lambda s, db: s.add_material(MATERIAL)),
+    ("update_material", 3, lambda s, db: s.update_material(db.material_id, MATERIAL)),
+    ("set_material_link", 1, lambda s, db: s.set_material_link(db.material_id, db.product_id, 2.5)),
+    ("remove_material_link", 1, lambda s, db: s.remove_material_link(db.material_id, db.product_id)),
+]
+
+
+def _ids(budgets):
+    return [name for name, _, _ in budgets]
+
+
+@pytest.mark.parametrize("name, budget, call", READ_BUDGETS, ids=_ids(READ_BUDGETS))
+def test_read_budget(fixture_database, name, budget, call):
+    service = open_service(fixture_database)
+    statements = count_statements(service, lambda: call(service, fixture_database))
+    assert statements <= budget, f"{name}: {statements} запросов при бюджете {budget}"
+
+
+@pytest.mark.parametrize("name, budget, call", WRITE_BUDGETS, ids=_ids(WRITE_BUDGETS))
+def test_write_budget(fixture_database, tmp_path, name, budget, call):
+    service = open_service(fixture_database, tmp_path)
+    statements = count_statements(service, lambda: call(service, fixture_database))
+    assert statements <= budget, f"{name}: {statements} запросов при бюджете {budget}"
+
+
+@pytest.mark.parametrize("name, budget, call", READ_BUDGETS + WRITE_BUDGETS,
+                         ids=_ids(READ_BUDGETS + WRITE_BUDGETS))
+def test_statements_do_not_grow_with_rows(fixture_databases, tmp_path, name, budget, call):
+    counts = {}
+    for database in fixture_databases.values():
+        service = open_service(database, tmp_path)
+        counts[database.name] = count_statements(service, lambda: call(service, database))
+    assert fixture_databases["large"].links > fixture_databases["small"].links
+    assert len(set(counts.values())) == 1, f"{name}: число запросов зависит от размера базы {counts}"
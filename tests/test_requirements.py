@@ -0,0 +1,118 @@
+"""Триггеры material_requirements (database/requirements.py) при случайных изменениях"""
+import random
+
+from database.database import Database
+from database.requirements import check_material_requirements, install_material_requirements, suspended_requirements
+from tests.conftest import open_service
+
+# Число случайных изменений и как часто сверять таблицу с пересчетом с нуля
+MUTATIONS = 3000
+CHECK_EVERY = 50
+
+
+def _ids(conn, sql):
+    return [row[0] for row in conn.exec_driver_sql(sql)]
+
+
+def _quantity(rng):
+    # NULL и ноль тоже встречаются в данных
+    return rng.choice([None, 0.0, round(rng.uniform(0.1, 50.0), 3)])
+
+
+def _insert_link(conn, rng, serial):
+    materials = _ids(conn, "SELECT id FROM materials")
+    products = _ids(conn, "SELECT id FROM products")
+    conn.exec_driver_sql("INSERT OR IGNORE INTO material_product (material_id, product_id, quantity) VALUES (?, ?, ?)",
+                         (rng.choice(materials), rng.choice(products), _quantity(rng)))
+
+
+def _link(conn, rng):
+    links = conn.exec_driver_sql("SELECT material_id, product_id FROM material_product").fetchall()
+    return tuple(rng.choice(links)) if links else None
+
+
+def _update_link_quantity(conn, rng, serial):
+    link = _link(conn, rng)
+    if link:
+        conn.exec_driver_sql("UPDATE material_product SET quantity = ? WHERE material_id = ? AND product_id = ?",
+                             (_quantity(rng), *link))
+
+
+def _move_link(conn, rng, serial):
+    # Смена материала связи: вклад переходит от одного материала к другому
+    link = _link(conn, rng)
+    if link:
+        conn.exec_driver_sql("UPDATE OR IGNORE material_product SET material_id = ? "
+                             "WHERE material_id = ? AND product_id = ?",
+                             (rng.choice(_ids(conn, "SELECT id FROM materials")), *link))
+
+
+def _delete_link(conn, rng, serial):
+    link = _link(conn, rng)
+    if link:
+        conn.exec_driver_sql("DELETE FROM material_product WHERE material_id = ? AND product_id = ?", link)
+
+
+def _update_product_quantity(conn, rng, serial):
+    conn.exec_driver_sql("UPDATE products SET quantity = ? WHERE id = ?",
+                         (_quantity(rng), rng.choice(_ids(conn, "SELECT id FROM products"))))
+
+
+def _insert_product(conn, rng, serial):
+    conn.exec_driver_sql("INSERT INTO products (name, article, quantity) VALUES (?, ?, ?)",
+                         (f"Продукция {serial}", f"T-{serial}", _quantity(rng)))
+
+
+def _delete_product(conn, rng, serial):
+    product_id = rng.choice(_ids(conn, "SELECT id FROM products"))
+    conn.exec_driver_sql("DELETE FROM material_product WHERE product_id = ?", (product_id,))
+    conn.exec_driver_sql("DELETE FROM products WHERE id = ?", (product_id,))
+
+
+def _update_stock(conn, rng, serial):
+    conn.exec_driver_sql("UPDATE materials SET stock_quantity = ? WHERE id = ?",
+                         (_quantity(rng), rng.choice(_ids(conn, "SELECT id FROM materials"))))
+
+
+def _insert_material(conn, rng, serial):
+    conn.exec_driver_sql("INSERT INTO materials (name, stock_quantity) VALUES (?, ?)",
+                         (f"Материал {serial}", _quantity(rng)))
+
+
+def _delete_material(conn, rng, serial):
+    material_id = rng.choice(_ids(conn, "SELECT id FROM materials"))
+    conn.exec_driver_sql("DELETE FROM material_product WHERE material_id = ?", (material_id,))
+    conn.exec_driver_sql("DELETE FROM materials WHERE id = ?", (material_id,))
+
+
+def _bulk_replace_links(conn, rng, serial):
+    # Массовая замена связей продукции с приостановленными триггерами, как при импорте
+    product_id = rng.choice(_ids(conn, "SELECT id FROM products"))
+    materials = rng.sample(_ids(conn, "SELECT id FROM materials"), 3)
+    with suspended_requirements(conn, "test"):
+        conn.exec_driver_sql("DELETE FROM material_product WHERE product_id = ?", (product_id,))
+        conn.exec_driver_sql("INSERT INTO material_product (material_id, product_id, quantity) VALUES (?, ?, ?)",
+                             [(material_id, product_id, _quantity(rng)) for material_id in materials])
+        conn.exec_driver_sql("UPDATE products SET quantity = ? WHERE id = ?", (_quantity(rng), product_id))
+
+
+MUTATORS = [
+    _insert_link, _insert_link, _update_link_quantity, _move_link, _delete_link, _update_product_quantity,
+    _insert_product, _delete_product, _update_stock, _insert_material, _delete_material, _bulk_replace_links,
+]
+
+
+def test_triggers_match_full_recalculation(fixture_databases, tmp_path):
+    service = open_service(fixture_databases["small"], tmp_path)
+    db: Database = service.db
+    install_material_requirements(db)
+    rng = random.Random(1)
+    with db.engine.connect() as conn:
+        assert check_material_requirements(conn) == []
+    for serial in range(MUTATIONS):
+        mutate = rng.choice(MUTATORS)
+        with db.engine.begin() as conn:
+            mutate(conn, rng, serial)
+        if serial % CHECK_EVERY == CHECK_EVERY - 1:
+            with db.engine.connect() as conn:
+                assert check_material_requirements(conn) == [], f"после {serial + 1} изменений ({mutate.__name__})"
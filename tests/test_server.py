@@ -0,0 +1,91 @@
+"""HTTP/JSON API (server.py) на базе из генератора"""
+import http.client
+import json
+import threading
+import time
+from urllib.parse import quote
+
+import pytest
+
+from server import APIRequestHandler, WorkerPoolHTTPServer
+from tests.conftest import open_service
+
+
+@pytest.fixture
+def server(fixture_databases, tmp_path):
+    service = open_service(fixture_databases["small"], tmp_path)
+    server = WorkerPoolHTTPServer(("127.0.0.1", 0), service, workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request(server, path, method="GET", body=None):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=60)
+    connection.request(method, path, body=None if body is None else json.dumps(body))
+    response = connection.getresponse()
+    return connection, response.status, response.read()
+
+
+def test_idle_keep_alive_clients_do_not_block_workers(server):
+    # Постоянные соединения, которые после ответа простаивают, по одному на поток пула
+    idle = [request(server, "/material-types")[0] for _ in range(2)]
+    try:
+        start = time.perf_counter()
+        connection, status, _ = request(server, "/material-types")
+        connection.close()
+        assert status == 200
+        assert time.perf_counter() - start < APIRequestHandler.IDLE_TIMEOUT + 2
+    finally:
+        for connection in idle:
+            connection.close()
+
+
+@pytest.mark.parametrize("cursor", ["5", "[1]", "[1,2,3]", '{"a":1}', '[[1],2]', '[1,"2"]', "[true,1]", "oops"])
+def test_malformed_cursor_is_bad_request(server, cursor):
+    connection, status, _ = request(server, f"/materials?order_by=price&cursor={cursor}")
+    connection.close()
+    assert status == 400
+
+
+@pytest.mark.parametrize("limit", ["0", "-1", "x"])
+def test_invalid_limit_is_bad_request(server, limit):
+    connection, status, _ = request(server, f"/materials?limit={limit}")
+    connection.close()
+    assert status == 400
+
+
+def test_limit_above_cap_is_accepted(server):
+    connection, status, body = request(server, "/materials?limit=5000")
+    connection.close()
+    assert status == 200
+    assert len(json.loads(body)["materials"]) == json.loads(body)["total"]
+
+
+def test_cursor_from_previous_page(server):
+    connection, status, body = request(server, "/materials?order_by=price&limit=5")
+    connection.close()
+    assert status == 200
+    cursor = json.loads(body)["next_cursor"]
+    connection, status, body = request(server, f"/materials?order_by=price&limit=5&cursor={quote(json.dumps(cursor))}")
+    connection.close()
+    assert status == 200
+    assert len(json.loads(body)["materials"]) == 5
+
+
+@pytest.mark.parametrize("path", ["/materials/99999/products/1", "/materials/1/products/99999"])
+def test_link_to_missing_material_or_product_is_not_found(server, path):
+    connection, status, _ = request(server, path, "PUT", {"quantity": 2.0})
+    connection.close()
+    assert status == 404
+
+
+@pytest.mark.parametrize("quantity", [True, False, "2", [2]])
+def test_link_quantity_must_be_number(server, fixture_databases, quantity):
+    database = fixture_databases["small"]
+    path = f"/materials/{database.material_id}/products/{database.product_id}"
+    connection, status, _ = request(server, path, "PUT", {"quantity": quantity})
+    connection.close()
+    assert status == 400
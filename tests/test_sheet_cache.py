@@ -0,0 +1,82 @@
+"""Кэш разобранных листов Excel (database/sheet_cache.py)"""
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from database import sheet_cache
+from database.sheet_cache import CACHE_DIR_NAME, read_excel_cached
+
+
+def sheet(rows: int = 20, offset: int = 0) -> pd.DataFrame:
+    """Лист со столбцами всех поддерживаемых видов: целые, дробные с пропусками, строки с пропусками"""
+    return pd.DataFrame({
+        "Артикул": np.arange(offset, offset + rows, dtype=np.int64),
+        "Цена": [np.nan if i % 4 == 0 else i * 1.25 for i in range(rows)],
+        "Наименование": [f"Материал {offset + i}" for i in range(rows)],
+        "Примечание": [None if i % 3 == 0 else f"прим. {i}" for i in range(rows)],
+    })
+
+
+def cache_entries(directory) -> list:
+    return sorted(glob.glob(os.path.join(directory, CACHE_DIR_NAME, "*.npz")))
+
+
+@pytest.fixture
+def no_excel(monkeypatch):
+    """Запрет разбора Excel: чтение должно обслуживаться кэшем"""
+    def read_excel(*args, **kwargs):
+        raise AssertionError("файл разобран повторно")
+
+    def disable():
+        monkeypatch.setattr(sheet_cache.pd, "read_excel", read_excel)
+    return disable
+
+
+def test_round_trip_matches_read_excel(tmp_path, no_excel):
+    path = str(tmp_path / "Материалы.xlsx")
+    sheet().to_excel(path, index=False)
+    expected = pd.read_excel(path)
+
+    first = read_excel_cached(path)
+    assert len(cache_entries(tmp_path)) == 1
+    no_excel()
+    cached = read_excel_cached(path)
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(cached, expected)
+
+
+def test_changed_content_invalidates_entry(tmp_path):
+    path = str(tmp_path / "Материалы.xlsx")
+    sheet().to_excel(path, index=False)
+    read_excel_cached(path)
+    old_entry = cache_entries(tmp_path)
+
+    sheet(offset=100).to_excel(path, index=False)
+    df = read_excel_cached(path)
+    assert df["Артикул"].iloc[0] == 100
+    # Запись прежней версии файла заменена новой
+    entries = cache_entries(tmp_path)
+    assert len(entries) == 1 and entries != old_entry
+
+
+def test_eviction_keeps_recently_used_entries(tmp_path):
+    paths = [str(tmp_path / f"Лист{i}.xlsx") for i in range(3)]
+    for i, path in enumerate(paths):
+        sheet(offset=i * 1000).to_excel(path, index=False)
+
+    read_excel_cached(paths[0])
+    read_excel_cached(paths[1])
+    first, second = cache_entries(tmp_path)
+    os.utime(first, (1000, 1000))
+    os.utime(second, (2000, 2000))
+    entry_size = max(os.path.getsize(first), os.path.getsize(second))
+
+    # Места хватает на две записи из трех: вытесняется давно не использованная
+    read_excel_cached(paths[2], max_bytes=int(entry_size * 2.5))
+    entries = cache_entries(tmp_path)
+    assert len(entries) == 2
+    assert first not in entries and second in entries
+    assert sum(os.path.getsize(entry) for entry in entries) <= entry_size * 2.5
@@ -0,0 +1,92 @@
+"""Бюджеты числа SQL-запросов для загрузки окон (без отображения)
+
+Окна создаются без __init__, виджеты заменены заглушками: проверяются
+только запросы, которые выполняют процедуры загрузки.
+"""
+import pytest
+
+from tests.conftest import count_statements, open_service
+
+pytest.importorskip("tkinter")
+from gui.main_window import MainWindow  # noqa: E402
+from gui.products_window import ProductsWindow  # noqa: E402
+
+
+class FakeTree:
+    """Заглушка ttk.Treeview: хранит вставленные строки"""
+
+    def __init__(self):
+        self.rows = []
+
+    def get_children(self):
+        return list(range(len(self.rows)))
+
+    def delete(self, item):
+        pass
+
+    def insert(self, parent, index, values):
+        self.rows.append(values)
+
+
+class FakeCombo(dict):
+    """Заглушка ttk.Combobox"""
+
+    def current(self, index):
+        pass
+
+
+def main_window(service):
+    window = MainWindow.__new__(MainWindow)
+    window.material_service = service
+    window.instrumentation = service.instrumentation
+    window.filters, window.order_by = {}, "id"
+    window.type_combo = FakeCombo()
+    return window
+
+
+def products_window(service, material):
+    window = ProductsWindow.__new__(ProductsWindow)
+    window.material_service = service
+    window.instrumentation = service.instrumentation
+    window.material = material
+    window.tree = FakeTree()
+    return window
+
+
+def _products(service, database):
+    material = service.get_material_by_id(database.material_id)
+    window = products_window(service, material)
+    return lambda: window.load_products()
+
+
+# (процедура, бюджет запросов, функция prepare(сервис, база) -> вызов)
+WINDOW_BUDGETS = [
+    ("ProductsWindow.load_products", 1, _products),
+    # Первая страница с общим числом и потребностью
+    ("MainWindow.load_materials", 3, lambda s, db: lambda: main_window(s).query_material_rows(
+        {}, "id", 0, MainWindow.PAGE_SIZE, None, True)),
+    # Непустая страница при прокрутке без курсора: поиск позиции смещения, страница, потребность
+    ("MainWindow.fetch_material_rows", 3, lambda s, db: lambda: main_window(s).fetch_material_rows(
+        20, 20, None, False)),
+    ("MainWindow.load_material_types", 1, lambda s, db: lambda: main_window(s).load_material_types()),
+]
+
+
+@pytest.mark.parametrize("name, budget, prepare", WINDOW_BUDGETS, ids=[name for name, _, _ in WINDOW_BUDGETS])
+def test_window_budget(fixture_databases, name, budget, prepare):
+    counts = {}
+    for database in fixture_databases.values():
+        service = open_service(database)
+        counts[database.name] = count_statements(service, prepare(service, database))
+        assert counts[database.name] <= budget, \
+            f"{name}: {counts[database.name]} запросов при бюджете {budget} ({database.name})"
+    assert len(set(counts.values())) == 1, f"{name}: число запросов зависит от размера базы {counts}"
+
+
+def test_products_window_shows_all_links(fixture_databases):
+    database = fixture_databases["large"]
+    service = open_service(database)
+    material = service.get_material_by_id(database.material_id)
+    window = products_window(service, material)
+    window.load_products()
+    assert len(window.tree.rows) == database.links
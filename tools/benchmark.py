@@ -0,0 +1,302 @@
+"""Замеры загрузчиков и методов MaterialService на синтетических данных
+
+    python -m tools.benchmark --scale small                  # замер и сравнение с эталоном
+    python -m tools.benchmark --scale small --save-baseline  # обновить эталон
+    python -m tools.benchmark --scale production --only service
+
+Набор данных (tools/generate_data.py) создается в --data при первом запуске.
+Каждый замер повторяется --repeat раз на свежем экземпляре сервиса (кэши
+пустые), варианты [warm] - на прогретом. Результаты пишутся в JSON;
+медиана сравнивается с эталоном benchmark_baseline.json для того же
+масштаба, и замедление больше допуска считается регрессией (код выхода 1).
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from business.material_service import MaterialService
+from database.database import Database
+from database.instrumentation import configure_logging
+from database.sheet_cache import CACHE_DIR_NAME
+from database.load_data import (
+    MATERIAL_TYPES_FILE, MATERIALS_FILE, PRODUCT_TYPES_FILE, PRODUCTS_FILE, MATERIAL_PRODUCTS_FILE,
+    load_material_types, load_materials, load_materials_bulk, load_product_types, load_products,
+    load_products_bulk, load_material_product_relations, load_material_product_relations_staged, load_all_data
+)
+from tools.generate_data import SCALES, build_database, generate_frames, write_workbooks
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Замер: имя, подготовка (вызывается перед каждым повтором) и замеряемая функция run(состояние)
+Case = namedtuple('Case', ['name', 'setup', 'run', 'repeat'])
+
+# Загрузчик, таблицы, которые нужны в базе до него, и файл, который он читает
+IMPORTERS = (
+    ("load_material_types", load_material_types, (), MATERIAL_TYPES_FILE),
+    ("load_materials", load_materials, (MATERIAL_TYPES_FILE,), MATERIALS_FILE),
+    ("load_materials_bulk", load_materials_bulk, (MATERIAL_TYPES_FILE,), MATERIALS_FILE),
+    ("load_product_types", load_product_types, (), PRODUCT_TYPES_FILE),
+    ("load_products", load_products, (PRODUCT_TYPES_FILE,), PRODUCTS_FILE),
+    ("load_products_bulk", load_products_bulk, (PRODUCT_TYPES_FILE,), PRODUCTS_FILE),
+    ("load_material_product_relations", load_material_product_relations,
+     (MATERIAL_TYPES_FILE, MATERIALS_FILE, PRODUCT_TYPES_FILE, PRODUCTS_FILE), MATERIAL_PRODUCTS_FILE),
+    ("load_material_product_relations_staged", load_material_product_relations_staged,
+     (MATERIAL_TYPES_FILE, MATERIALS_FILE, PRODUCT_TYPES_FILE, PRODUCTS_FILE), MATERIAL_PRODUCTS_FILE),
+)
+
+
+def prepare_dataset(scale_name: str, directory: str, seed: int = 0):
+    """Таблицы набора данных и пути к файлам .xlsx и materials.db (создаются при отсутствии)"""
+    frames = generate_frames(SCALES[scale_name], seed)
+    db_path = os.path.join(directory, "materials.db")
+    if not os.path.exists(os.path.join(directory, MATERIAL_PRODUCTS_FILE)):
+        print(f"Запись файлов Excel в {directory}...")
+        write_workbooks(frames, directory)
+    if not os.path.exists(db_path):
+        print(f"Создание базы данных {db_path}...")
+        build_database(frames, db_path).engine.dispose()
+    return frames, db_path
+
+
+def importer_cases(frames: dict, directory: str, workdir: str, repeat: int):
+    """Замеры загрузчиков: база с нужными таблицами создается заново перед каждым повтором"""
+    cases = []
+    for name, loader, parts, file_name in IMPORTERS:
+        # Связи читаются в нижнем регистре заголовков прямо в переданном DataFrame, поэтому копия
+        def setup(parts=parts, file_name=file_name):
+            db = build_database(frames, os.path.join(workdir, "import.db"), parts)
+            return db, frames[file_name].copy()
+
+        def run(state, loader=loader, file_name=file_name):
+            db, df = state
+            loader(db, os.path.join(directory, file_name), df=df)
+
+        # Построчные загрузчики на больших данных работают минутами - один повтор
+        slow = not name.endswith(("_bulk", "_staged", "_types"))
+        cases.append(Case(f"import.{name}", setup, run, 1 if slow else repeat))
+
+    for file_name in (MATERIALS_FILE, MATERIAL_PRODUCTS_FILE):
+        path = os.path.join(directory, file_name)
+        cases.append(Case(f"import.read_excel[{os.path.basename(file_name)}]",
+                          lambda: None, lambda state, path=path: pd.read_excel(path), 1))
+
+    def setup_all(cached=False):
+        # Без cached кэш прочитанных листов удаляется, и файлы Excel читаются заново
+        resources = os.path.abspath(os.path.join(directory, "resources"))
+        if not cached:
+            shutil.rmtree(os.path.join(resources, CACHE_DIR_NAME), ignore_errors=True)
+        run_dir = os.path.join(workdir, "load_all_data")
+        shutil.rmtree(run_dir, ignore_errors=True)
+        os.makedirs(run_dir)
+        os.symlink(resources, os.path.join(run_dir, "resources"))
+        return run_dir
+
+    def run_all(run_dir, **options):
+        # load_all_data читает resources/ и пишет materials.db относительно текущего каталога
+        previous = os.getcwd()
+        os.chdir(run_dir)
+        try:
+            load_all_data(**options)
+        finally:
+            os.chdir(previous)
+
+    cases.append(Case("import.load_all_data[bulk]", setup_all, lambda d: run_all(d, bulk=True), 1))
+    cases.append(Case("import.load_all_data[parallel]", setup_all, lambda d: run_all(d, parallel=True), 1))
+    cases.append(Case("import.load_all_data[bulk, cached sheets]", lambda: setup_all(cached=True),
+                      lambda d: run_all(d, bulk=True), 1))
+    return cases
+
+
+def service_cases(db_path: str, workdir: str, repeat: int):
+    """Замеры методов MaterialService на готовой базе"""
+    with sqlite3.connect(db_path) as conn:
+        materials = conn.execute("SELECT COUNT(*) FROM materials").fetchone()[0]
+        busiest = conn.execute("SELECT material_id FROM material_product GROUP BY material_id "
+                               "ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+        material_type = conn.execute("SELECT name FROM material_types ORDER BY id LIMIT 1").fetchone()[0]
+    url = f"sqlite:///{db_path}"
+
+    def fresh():
+        return MaterialService(Database(url))
+
+    def warm(method, *args, **kwargs):
+        def setup():
+            service = fresh()
+            getattr(service, method)(*args, **kwargs)
+            return service
+        return setup
+
+    def scratch():
+        # Запись выполняется в копию базы, чтобы не менять набор данных
+        path = os.path.join(workdir, "scratch.db")
+        shutil.copyfile(db_path, path)
+        return MaterialService(Database(f"sqlite:///{path}"))
+
+    material_data = {'type_name': material_type, 'name': "Замер", 'price': 1.0, 'unit': "шт",
+                     'package_quantity': 1.0, 'stock_quantity': 1.0, 'min_quantity': 1.0}
+    vector = 1_000_000
+    type_ids = np.arange(vector) % 8 + 1
+    quantities = np.linspace(0, 1000, vector)
+
+    cases = [
+        Case("service.get_all_material_types", fresh, lambda s: s.get_all_material_types(), repeat),
+        Case("service.get_all_materials", fresh, lambda s: s.get_all_materials(), repeat),
+        Case("service.get_all_materials[warm]", warm("get_all_materials"), lambda s: s.get_all_materials(), repeat),
+        Case("service.search_materials[first_page]", fresh, lambda s: s.search_materials(limit=200), repeat),
+        Case("service.search_materials[-price]", fresh,
+             lambda s: s.search_materials(order_by="-price", limit=200), repeat),
+        Case("service.search_materials[deep_offset]", fresh,
+             lambda s: s.search_materials(order_by="price", offset=materials // 2, limit=200), repeat),
+        Case("service.search_materials[name]", fresh,
+             lambda s: s.search_materials(name_substr="0001", limit=200), repeat),
+        Case("service.search_material_names", fresh, lambda s: s.search_material_names("0001"), repeat),
+        Case("service.search_products", fresh, lambda s: s.search_products("модель 1"), repeat),
+        Case("service.get_material_by_id", fresh, lambda s: s.get_material_by_id(busiest), repeat),
+        Case("service.bom_graph", fresh, lambda s: s.bom_graph(), repeat),
+        Case("service.calculate_required_quantity", fresh,
+             lambda s: s.calculate_required_quantity(busiest), repeat),
+        Case("service.calculate_required_quantity[warm]", warm("calculate_required_quantity", busiest),
+             lambda s: s.calculate_required_quantity(busiest), repeat),
+        Case("service.calculate_required_quantities", fresh, lambda s: s.calculate_required_quantities(), repeat),
+        Case("service.get_material_requirements", fresh, lambda s: s.get_material_requirements(), repeat),
+        # Запрос окна продукции (ProductsWindow.load_products) без интерфейса Tk
+        Case("service.get_material_usage", fresh, lambda s: s.get_material_usage(busiest), repeat),
+        Case("service.get_products_for_material", fresh, lambda s: s.get_products_for_material(busiest), repeat),
+        Case("service.calculate_product_quantity", fresh,
+             lambda s: s.calculate_product_quantity(1, 100.0, 2.0, 3.0), repeat),
+        Case(f"service.calculate_product_quantities[{vector}]", warm("product_type_coefficients"),
+             lambda s: s.calculate_product_quantities(type_ids, quantities, 2.0, 3.0), repeat),
+        Case("service.get_production_capacity", fresh, lambda s: s.get_production_capacity(), repeat),
+        Case("service.add_material", scratch, lambda s: s.add_material(material_data), repeat),
+        Case("service.update_material", scratch, lambda s: s.update_material(busiest, material_data), repeat),
+        Case("service.set_material_link[warm]", lambda: _warmed(scratch(), "bom_graph"),
+             lambda s: s.set_material_link(busiest, 1, 2.5), repeat),
+    ]
+    return cases
+
+
+def _warmed(service, method):
+    getattr(service, method)()
+    return service
+
+
+def run_cases(cases, pattern: str = None) -> dict:
+    """Выполнение замеров; возвращает имя -> {median, min, runs} (секунды)"""
+    results = {}
+    for case in cases:
+        if pattern and not re.search(pattern, case.name):
+            continue
+        timings = []
+        for _ in range(case.repeat):
+            # Ход загрузки и миграций пишется в журнал (INFO) - на время замера он отключается
+            logging.disable(logging.INFO)
+            try:
+                state = case.setup()
+                start = time.perf_counter()
+                case.run(state)
+                timings.append(time.perf_counter() - start)
+                if isinstance(state, MaterialService):
+                    state.cache.close()
+                    state.db.engine.dispose()
+            finally:
+                logging.disable(logging.NOTSET)
+        results[case.name] = {"median": statistics.median(timings), "min": min(timings), "runs": len(timings)}
+        print(f"{case.name:<60} {results[case.name]['median'] * 1000:>12.2f} мс")
+    return results
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta: float) -> list:
+    """Сравнение медиан с эталоном; возвращает имена замеров с регрессией"""
+    regressions = []
+    print(f"\n{'замер':<60} {'эталон, мс':>12} {'сейчас, мс':>12} {'отношение':>10}")
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:<60} {'-':>12} {result['median'] * 1000:>12.2f} {'новый':>10}")
+            continue
+        ratio = result["median"] / max(reference["median"], 1e-9)
+        slower = ratio > 1 + tolerance and result["median"] - reference["median"] > min_delta
+        if slower:
+            regressions.append(name)
+        print(f"{name:<60} {reference['median'] * 1000:>12.2f} {result['median'] * 1000:>12.2f} "
+              f"{ratio:>9.2f}x{' РЕГРЕССИЯ' if slower else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры загрузчиков и методов сервиса материалов")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", help="каталог набора данных (по умолчанию data/<scale>)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", help="регулярное выражение для имен замеров (import, service, ...)")
+    parser.add_argument("--output", help="файл результатов JSON")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="записать результаты как эталон масштаба")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимое замедление (доля)")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="игнорируемое замедление, с")
+    args = parser.parse_args()
+    configure_logging("INFO")
+
+    directory = args.data or os.path.join("data", args.scale)
+    os.makedirs(directory, exist_ok=True)
+    frames, db_path = prepare_dataset(args.scale, directory, args.seed)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cases = service_cases(db_path, workdir, args.repeat) + importer_cases(frames, directory, workdir, args.repeat)
+        results = run_cases(cases, args.only)
+
+    report = {"scale": args.scale, "seed": args.seed, "sizes": SCALES[args.scale]._asdict(),
+              "environment": environment(), "results": results}
+    output = args.output or os.path.join(directory, f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты записаны в {output}")
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baselines = json.load(f)
+    if args.save_baseline:
+        saved = baselines.get(args.scale, {}).get("results", {})
+        saved.update(results)
+        baselines[args.scale] = {"environment": report["environment"], "results": saved}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"Эталон для масштаба {args.scale} записан в {args.baseline}")
+        return
+
+    if args.scale not in baselines:
+        print(f"Эталона для масштаба {args.scale} нет, сравнение пропущено")
+        return
+    regressions = compare(results, baselines[args.scale]["results"], args.tolerance, args.min_delta)
+    if regressions:
+        print(f"\nРегрессии: {len(regressions)}")
+        sys.exit(1)
+    print("\nРегрессий нет")
+
+
+if __name__ == "__main__":
+    main()
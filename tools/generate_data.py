@@ -0,0 +1,214 @@
+"""Генератор синтетических данных в формате файлов импорта из resources/
+
+Создает воспроизводимые (при одинаковом seed) наборы данных заданного
+масштаба: файлы .xlsx с теми же листами и столбцами, что и исходные, и/или
+готовую базу materials.db.
+
+    python -m tools.generate_data --scale production --out data/production --xlsx --db
+
+Лист Excel вмещает не больше 1 048 575 строк данных, поэтому файл связей
+при большем числе связей обрезается; база данных строится без этого
+ограничения напрямую, минуя чтение Excel.
+"""
+import argparse
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from database.database import Database
+from database.load_data import (
+    MATERIAL_TYPES_FILE, MATERIALS_FILE, PRODUCT_TYPES_FILE, PRODUCTS_FILE, MATERIAL_PRODUCTS_FILE
+)
+from database.requirements import suspended_requirements
+
+# Размер набора данных: число типов, материалов, продукции и связей
+Scale = namedtuple('Scale', ['material_types', 'materials', 'product_types', 'products', 'links'])
+
+SCALES = {
+    "sample": Scale(6, 20, 6, 20, 83),
+    "small": Scale(12, 10_000, 8, 5_000, 100_000),
+    "medium": Scale(20, 50_000, 10, 25_000, 1_000_000),
+    "production": Scale(30, 100_000, 12, 50_000, 5_000_000),
+}
+
+# Строк данных на листе Excel (без строки заголовков)
+EXCEL_MAX_ROWS = 1_048_575
+
+MATERIAL_TYPE_NAMES = ("Дерево", "Древесная плита", "Текстиль", "Стекло", "Металл", "Пластик",
+                       "Фурнитура", "Лакокрасочные", "Клей", "Утеплитель", "Камень", "Кожа")
+PRODUCT_TYPE_NAMES = ("Кресла", "Полки", "Стеллажи", "Столы", "Тумбы", "Шкафы",
+                      "Диваны", "Кровати", "Стулья", "Комоды", "Зеркала", "Пуфы")
+UNITS = ("м²", "м", "шт", "кг", "л", "м³")
+
+
+def _names(base, count: int):
+    """Уникальные наименования: базовые, затем базовые с номером серии"""
+    return [base[i % len(base)] + ("" if i < len(base) else f" {i // len(base) + 1}") for i in range(count)]
+
+
+def generate_frames(scale: Scale, seed: int = 0) -> dict:
+    """Таблицы импорта (имя файла -> DataFrame) со столбцами файлов из resources/"""
+    rng = np.random.default_rng(seed)
+    material_types = _names(MATERIAL_TYPE_NAMES, scale.material_types)
+    product_types = _names(PRODUCT_TYPE_NAMES, scale.product_types)
+
+    material_names = np.char.add("Материал ", np.char.zfill(np.arange(1, scale.materials + 1).astype(str), 7))
+    material_type_of = rng.integers(0, len(material_types), scale.materials)
+    materials = pd.DataFrame({
+        'Наименование материала': np.char.add(
+            np.char.add(material_names, " "), np.array(material_types, dtype=str)[material_type_of]),
+        'Тип материала': np.array(material_types, dtype=object)[material_type_of],
+        'Цена единицы материала': np.round(rng.uniform(10, 10_000, scale.materials), 2),
+        'Количество на складе': rng.integers(0, 5_000, scale.materials),
+        'Минимальное количество': rng.integers(0, 2_000, scale.materials),
+        'Количество в упаковке': np.round(rng.uniform(1, 50, scale.materials), 1),
+        'Единица измерения': np.array(UNITS, dtype=object)[rng.integers(0, len(UNITS), scale.materials)],
+    })
+
+    product_type_of = rng.integers(0, len(product_types), scale.products)
+    product_names = np.char.add(np.array(product_types, dtype=str)[product_type_of],
+                                np.char.add(" модель ", np.arange(1, scale.products + 1).astype(str)))
+    products = pd.DataFrame({
+        'Тип продукции': np.array(product_types, dtype=object)[product_type_of],
+        'Наименование продукции': product_names,
+        'Артикул': 1_000_000 + rng.permutation(scale.products * 10)[:scale.products],
+        'Минимальная стоимость для партнера': np.round(rng.uniform(500, 100_000, scale.products), 2),
+    })
+
+    # Связи: уникальные пары (материал, продукция), с запасом на совпадения
+    links = min(scale.links, scale.materials * scale.products)
+    pairs = np.empty(0, dtype=np.int64)
+    while len(pairs) < links:
+        extra = int((links - len(pairs)) * 1.05) + 16
+        candidates = rng.integers(0, scale.products, extra) * scale.materials + rng.integers(0, scale.materials, extra)
+        pairs = np.concatenate((pairs, candidates))
+        _, first = np.unique(pairs, return_index=True)
+        pairs = pairs[np.sort(first)]
+    pairs = pairs[:links]
+    relations = pd.DataFrame({
+        'Наименование материала': materials['Наименование материала'].to_numpy()[pairs % scale.materials],
+        'Продукция': product_names[pairs // scale.materials],
+        'Необходимое количество материала': np.round(rng.uniform(0.05, 10, links), 2),
+    })
+
+    return {
+        MATERIAL_TYPES_FILE: pd.DataFrame({
+            'Тип материала': material_types,
+            'Процент потерь сырья ': np.round(rng.uniform(0.001, 0.01, len(material_types)), 4),
+        }),
+        MATERIALS_FILE: materials,
+        PRODUCT_TYPES_FILE: pd.DataFrame({
+            'Тип продукции': product_types,
+            'Коэффициент типа продукции': np.round(rng.uniform(1, 6, len(product_types)), 2),
+        }),
+        PRODUCTS_FILE: products,
+        MATERIAL_PRODUCTS_FILE: relations,
+    }
+
+
+def write_workbooks(frames: dict, directory: str) -> dict:
+    """Запись таблиц в .xlsx (режим write_only); возвращает имя файла -> путь"""
+    paths = {}
+    for name, df in frames.items():
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if len(df) > EXCEL_MAX_ROWS:
+            print(f"{name}: {len(df)} строк не помещается на лист Excel, записано {EXCEL_MAX_ROWS}")
+            df = df.iloc[:EXCEL_MAX_ROWS]
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(list(df.columns))
+        for row in df.itertuples(index=False, name=None):
+            sheet.append([value.item() if isinstance(value, np.generic) else value for value in row])
+        workbook.save(path)
+        paths[name] = path
+    return paths
+
+
+def build_database(frames: dict, path: str, parts=None) -> Database:
+    """Создание базы данных из таблиц без чтения Excel
+
+    parts - какие таблицы заполнить (по умолчанию все): подмножество
+    имен файлов импорта; используется, чтобы подготовить базу для замера
+    отдельного загрузчика.
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db = Database(f"sqlite:///{path}", config="bulk_import")
+    db.create_tables()
+    parts = set(frames) if parts is None else set(parts)
+
+    with db.engine.begin() as conn, suspended_requirements(conn, "generate"):
+        if MATERIAL_TYPES_FILE in parts:
+            conn.exec_driver_sql("INSERT INTO material_types (name) VALUES (?)",
+                                 [(name,) for name in frames[MATERIAL_TYPES_FILE]['Тип материала']])
+        if PRODUCT_TYPES_FILE in parts:
+            conn.exec_driver_sql("INSERT INTO product_types (name, coefficient) VALUES (?, ?)",
+                                 list(frames[PRODUCT_TYPES_FILE].itertuples(index=False, name=None)))
+        if MATERIALS_FILE in parts:
+            df = frames[MATERIALS_FILE]
+            conn.exec_driver_sql(
+                "INSERT INTO materials (type_id, name, price, unit, package_quantity, stock_quantity, min_quantity) "
+                "SELECT (SELECT id FROM material_types WHERE name = ?), ?, ?, ?, ?, ?, ?",
+                list(zip(df['Тип материала'], df['Наименование материала'], df['Цена единицы материала'].tolist(),
+                         df['Единица измерения'], df['Количество в упаковке'].tolist(),
+                         df['Количество на складе'].tolist(), df['Минимальное количество'].tolist()))
+            )
+        if PRODUCTS_FILE in parts:
+            df = frames[PRODUCTS_FILE]
+            conn.exec_driver_sql(
+                "INSERT INTO products (type_id, name, article, min_partner_price, quantity) "
+                "SELECT (SELECT id FROM product_types WHERE name = ?), ?, ?, ?, 0.0",
+                list(zip(df['Тип продукции'], df['Наименование продукции'], df['Артикул'].astype(str),
+                         df['Минимальная стоимость для партнера'].tolist()))
+            )
+        if MATERIAL_PRODUCTS_FILE in parts:
+            # Наименования в таблицах генератора уникальны и совпадают с порядком вставки (id = номер + 1)
+            material_ids = pd.Series(np.arange(1, len(frames[MATERIALS_FILE]) + 1),
+                                     index=frames[MATERIALS_FILE]['Наименование материала'])
+            product_ids = pd.Series(np.arange(1, len(frames[PRODUCTS_FILE]) + 1),
+                                    index=frames[PRODUCTS_FILE]['Наименование продукции'])
+            df = frames[MATERIAL_PRODUCTS_FILE]
+            conn.exec_driver_sql(
+                "INSERT INTO material_product (material_id, product_id, quantity) VALUES (?, ?, ?)",
+                list(zip(material_ids[df['Наименование материала']].tolist(),
+                         product_ids[df['Продукция']].tolist(),
+                         df['Необходимое количество материала'].tolist()))
+            )
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерация синтетических данных для импорта и замеров")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="data", help="каталог результата")
+    parser.add_argument("--xlsx", action="store_true", help="записать файлы .xlsx (как в resources/)")
+    parser.add_argument("--db", action="store_true", help="создать materials.db")
+    args = parser.parse_args()
+    if not (args.xlsx or args.db):
+        parser.error("укажите --xlsx и/или --db")
+
+    scale = SCALES[args.scale]
+    start = time.perf_counter()
+    frames = generate_frames(scale, args.seed)
+    print(f"Сгенерировано ({args.scale}: {scale}) за {time.perf_counter() - start:.1f} с")
+    if args.xlsx:
+        start = time.perf_counter()
+        write_workbooks(frames, args.out)
+        print(f"Файлы Excel записаны в {args.out} за {time.perf_counter() - start:.1f} с")
+    if args.db:
+        start = time.perf_counter()
+        path = os.path.join(args.out, "materials.db")
+        os.makedirs(args.out, exist_ok=True)
+        build_database(frames, path)
+        print(f"База данных {path} создана за {time.perf_counter() - start:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Нагрузочный тест HTTP/JSON API (server.py)
+
+Запуск против локального сервера:
+    python server.py --port 8000 &
+    python tools/load_test.py --url http://127.0.0.1:8000 --clients 8 --duration 10
+
+Каждый клиент - отдельный поток с постоянным соединением, запросы идут по
+кругу из набора путей. В конце выводится число запросов в секунду и
+задержки (p50, p90, p99) по каждому пути и в целом.
+"""
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+# Набор запросов по умолчанию: списки, карточки и расчеты
+DEFAULT_PATHS = (
+    "/materials?limit=100",
+    "/materials?order_by=-price&limit=100",
+    "/materials?name=дер&limit=50",
+    "/materials/1",
+    "/materials/1/products",
+    "/material-types",
+    "/requirements",
+    "/products?q=стол",
+    "/product-quantity?product_type_id=1&material_quantity=100&param1=2&param2=3",
+)
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Перцентиль отсортированного списка (ближайший ранг)"""
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_client(host, port, paths, deadline, conditional, results, errors):
+    """Цикл одного клиента до deadline; задержки пишутся в results[путь]"""
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    etags = {}
+    latencies = {path: [] for path in paths}
+    failures = 0
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        headers = {"Accept-Encoding": "gzip"}
+        if conditional and path in etags:
+            headers["If-None-Match"] = etags[path]
+        start = time.perf_counter()
+        try:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            failures += 1
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies[path].append(time.perf_counter() - start)
+        if response.status >= 400:
+            failures += 1
+        elif response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+    connection.close()
+    results.append(latencies)
+    errors.append(failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест HTTP/JSON API сервиса материалов")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=8, help="число одновременных клиентов")
+    parser.add_argument("--duration", type=float, default=10.0, help="длительность, с")
+    parser.add_argument("--conditional", action="store_true",
+                        help="повторные запросы с If-None-Match (проверка ответов 304)")
+    parser.add_argument("--path", action="append", dest="paths", help="путь запроса (можно несколько)")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    # Кириллица и пробелы в строке запроса кодируются, http.client принимает только ASCII
+    paths = tuple(quote(path, safe="/?&=:,-[]") for path in args.paths or DEFAULT_PATHS)
+    deadline = time.perf_counter() + args.duration
+    results, errors = [], []
+    threads = [
+        threading.Thread(target=run_client,
+                         args=(url.hostname, url.port or 80, paths, deadline, args.conditional, results, errors))
+        for _ in range(args.clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"{'путь':<60} {'запросов':>9} {'p50, мс':>9} {'p90, мс':>9} {'p99, мс':>9}")
+    everything = []
+    for path in paths:
+        latencies = sorted(value for result in results for value in result[path])
+        everything.extend(latencies)
+        print(f"{path[:60]:<60} {len(latencies):>9} {percentile(latencies, 0.5) * 1000:>9.2f} "
+              f"{percentile(latencies, 0.9) * 1000:>9.2f} {percentile(latencies, 0.99) * 1000:>9.2f}")
+    everything.sort()
+    print(f"Всего запросов: {len(everything)}, ошибок: {sum(errors)}, за {elapsed:.1f} с")
+    print(f"Запросов в секунду: {len(everything) / elapsed:.1f}")
+    print(f"Задержка p50: {percentile(everything, 0.5) * 1000:.2f} мс, "
+          f"p99: {percentile(everything, 0.99) * 1000:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()